@@ -0,0 +1,52 @@
+class ModuleDocFragment:
+	# Client options shared by the modules reconciling a whole account (users, domains, routing_rules)
+	DOCUMENTATION = r"""
+options:
+  max_retries:
+    description:
+      - How many times a failed idempotent read (V(listUser), V(getUser), V(listDomains), V(listRoutingRules), V(listPasswordReset), V(checkAccountCredit)) is retried.
+      - Only transient failures are retried (connection errors, HTTP 429/502/503/504, throttling error codes), writes never are.
+      - Retries wait with decorrelated-jitter backoff, or as long as the server's C(Retry-After) asks (up to 30s).
+      - V(0) disables retries.
+    type: int
+    required: false
+    default: 3
+  deadline:
+    description:
+      - Time budget in seconds for the whole module run, every API call (retries included) must start and end within it.
+      - Each call is also bound by 10s connect and 60s read timeouts.
+      - Once expired the module stops without starting any other call and fails, reporting under RV(completed) and RV(pending)
+        which of the planned changes were applied and which weren't.
+      - Unset means no deadline.
+    type: float
+    required: false
+  apply_concurrency:
+    description:
+      - How many changes are applied in parallel.
+      - Changes to the same object (user, domain, routing rules of a domain) always run one after the other, in order.
+      - Once a change fails no other one is started (unless O(on_error=continue)), the ones in flight are left to finish.
+    type: int
+    required: false
+    default: 1
+  max_api_calls:
+    description:
+      - Budget of API calls for the run, e.g. to guard against accidental mass churn or throttling.
+      - Once the changes are planned, the module fails without applying any of them if the calls made to read the account (retries included)
+        plus the planned writes exceed it. In check mode too, so that a dry run tells whether the real one would fit.
+      - Either way the calls are reported under RV(stats.api_calls), along with the estimated duration of the writes.
+      - Unset means no budget.
+    type: int
+    required: false
+  on_error:
+    description:
+      - What to do once a change fails.
+      - V(abort) starts no other change, the module fails reporting what was applied and what wasn't.
+      - V(continue) still attempts every change to other objects, only the later changes to an object a change failed on are skipped
+        (e.g. setting the recovery methods of a user that couldn't be created). The module then fails reporting every failure under RV(failed).
+      - Either way RV(retry_scope) (when the module has O(scope)) limits a rerun to what wasn't applied, and with O(journal) a rerun of the same task
+        only runs the failed and skipped changes again.
+    type: str
+    required: false
+    default: abort
+    choices: [abort, continue]
+"""
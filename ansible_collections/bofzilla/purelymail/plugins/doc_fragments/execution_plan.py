@@ -0,0 +1,21 @@
+class ModuleDocFragment:
+	# Plan/apply split shared by the modules reconciling a whole account (users, domains, routing_rules)
+	DOCUMENTATION = r"""
+options:
+  plan_out:
+    description:
+      - Check mode only. Writes the planned operations to this file, along with a fingerprint of the account state they were computed from
+        and what the module returns about the account, e.g. to review the plan before applying it with O(plan_in).
+      - Passwords are never written to the file.
+    type: path
+    required: false
+  plan_in:
+    description:
+      - Applies the operations of a file written by O(plan_out) as they are, instead of computing them again.
+      - The account is only listed to check that nothing changed since the plan was computed, a stale plan is refused without making any change.
+        Settings that only a per-object read returns (e.g. a user's recovery methods) aren't part of that check.
+      - The options describing the desired state are ignored, except the passwords of the users the plan creates or changes the password of,
+        which must be given again.
+    type: path
+    required: false
+"""
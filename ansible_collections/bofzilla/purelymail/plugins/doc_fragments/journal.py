@@ -0,0 +1,20 @@
+class ModuleDocFragment:
+	# Write-ahead journal shared by the modules reconciling a whole account (users, domains, routing_rules)
+	DOCUMENTATION = r"""
+options:
+  journal:
+    description:
+      - Write-ahead journal of the apply. The planned operations are written to this file before any of them runs,
+        and every operation is recorded when it starts and when it completes. The file is removed once the whole plan is applied.
+      - When a run is interrupted (network outage, killed fork, API error...), the next run of the same task (same module, account and desired state)
+        resumes its plan instead of listing the account and computing a new one. Completed operations aren't run again, and the ones whose
+        outcome is unknown are verified with targeted reads (e.g. one C(listUser) call) before being run again or skipped.
+      - Options about how the run goes rather than the state to converge to (e.g. O(deadline), O(max_retries), O(apply_concurrency), O(on_error),
+        O(max_api_calls), O(refresh_after_apply)) can change between the two runs, e.g. to resume with a longer O(deadline).
+        A task with other options (desired state, O(scope), O(canonical)...) starts a new journal, replacing the unfinished one.
+        Delete the file to plan from scratch anyway.
+      - Passwords are never written to the file, a resumed run takes them from its task.
+      - Ignored in check mode.
+    type: path
+    required: false
+"""
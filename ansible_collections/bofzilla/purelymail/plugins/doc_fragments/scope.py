@@ -0,0 +1,31 @@
+class ModuleDocFragment:
+	# Scope selectors shared by the modules reconciling a whole account (users, domains)
+	DOCUMENTATION = r"""
+options:
+  scope:
+    description:
+      - Restricts the run to a slice of the account, e.g. to reconcile a huge account from several hosts (or forks) at once, each owning a slice.
+      - Objects outside the scope are neither fetched, diffed, returned nor deleted by canonical mode,
+        entries outside of it in the desired list are ignored (so every slice can be given the same list).
+      - Every selector set must match, unset means the whole account.
+    type: dict
+    required: false
+    suboptions:
+      domains:
+        description: Only these domains (users whose address is on one of them).
+        type: list
+        elements: str
+        required: false
+      patterns:
+        description: Only names matching one of these case-sensitive shell-style globs (full user address, or domain name), e.g. C(*@example.com), C(support-*).
+        type: list
+        elements: str
+        required: false
+      shard:
+        description:
+          - C(i/N), only the i-th (1-based) of N slices partitioning names by a stable hash,
+            running C(1/N) to C(N/N) covers every name exactly once.
+          - Each shard is an even and stable share of the names, a given name always lands in the same shard for a given N.
+        type: str
+        required: false
+"""
@@ -67,3 +67,5 @@ class LookupModule(LookupBase):
 			raise AnsibleError(f"Purelymail API error: {err}") from err
 		except Exception as err:  # pragma: no cover
 			raise AnsibleError(f"{type(err).__name__}: {err}") from err
+		finally:
+			api.close()
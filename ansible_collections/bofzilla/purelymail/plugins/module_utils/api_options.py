@@ -0,0 +1,40 @@
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.retry import RetryPolicy
+
+# Documented by the `bofzilla.purelymail.api_options` doc fragment
+API_OPTIONS_SPEC = dict(
+	max_retries=dict(type="int", required=False, default=3),
+	deadline=dict(type="float", required=False),
+	apply_concurrency=dict(type="int", required=False, default=1),
+	max_api_calls=dict(type="int", required=False),
+	on_error=dict(type="str", required=False, default="abort", choices=["abort", "continue"]),
+)
+
+
+def build_api(module: AnsibleModule, **kwargs) -> PurelymailAPI:
+	"""`PurelymailAPI` configured from the module's `api_token` and `API_OPTIONS_SPEC` params."""
+	max_retries: int = module.params["max_retries"]
+	if max_retries < 0:
+		module.fail_json(msg=f"max_retries must be >= 0, got {max_retries}")
+	deadline: float | None = module.params["deadline"]
+	if deadline is not None and deadline <= 0:
+		module.fail_json(msg=f"deadline must be > 0, got {deadline}")
+	apply_concurrency: int = module.params["apply_concurrency"]
+	if apply_concurrency < 1:
+		module.fail_json(msg=f"apply_concurrency must be >= 1, got {apply_concurrency}")
+	max_api_calls: int | None = module.params["max_api_calls"]
+	if max_api_calls is not None and max_api_calls < 1:
+		module.fail_json(msg=f"max_api_calls must be >= 1, got {max_api_calls}")
+	# One pooled connection per worker, whichever phase has the most.
+	kwargs["pool_size"] = max(kwargs.get("pool_size", 1), apply_concurrency)
+
+	return PurelymailAPI(
+		module.params["api_token"],
+		retry=RetryPolicy(max_retries=max_retries),
+		deadline=None if deadline is None else time.monotonic() + deadline,
+		**kwargs,
+	)
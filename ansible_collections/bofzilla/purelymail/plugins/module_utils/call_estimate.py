@@ -0,0 +1,73 @@
+from collections import Counter
+from collections.abc import Collection, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import ApiStats
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation
+
+# Seconds per call assumed when the run observed no call at all (e.g. a resumed journal)
+DEFAULT_LATENCY = 0.3
+# Endpoint called by each operation method
+ENDPOINTS = {
+	"create_user": "createUser",
+	"delete_user": "deleteUser",
+	"modify_user": "modifyUser",
+	"upsert_password_reset": "upsertPasswordReset",
+	"delete_password_reset": "deletePasswordReset",
+	"add_domain": "addDomain",
+	"update_domain_settings": "updateDomainSettings",
+	"delete_domain": "deleteDomain",
+	"create_routing_rule": "createRoutingRule",
+	"delete_routing_rule": "deleteRoutingRule",
+}
+
+
+@dataclass()
+class CallEstimate:
+	"""
+	Per-endpoint API calls of a run: made while reading the account (`read`), about to be made by the planned writes (`write`).
+	`write_seconds` estimates the write phase from the latency observed so far: per endpoint when it was called already,
+	the mean of every call otherwise. Writes to one key run in sequence, so the longest chain bounds it from below.
+	"""
+
+	read: dict[str, int]
+	write: dict[str, int]
+	write_seconds: float
+
+	@classmethod
+	def build(cls, stats: ApiStats, operations: Sequence[Operation], completed: Collection[int] = (), concurrency: int = 1) -> "CallEstimate":
+		calls, seconds = stats.latencies()
+		mean = sum(seconds.values()) / sum(calls.values()) if calls else DEFAULT_LATENCY
+
+		write: Counter[str] = Counter()
+		chains: dict[str, float] = {}
+		for idx, op in enumerate(operations):
+			if idx in completed:
+				continue
+			endpoint = ENDPOINTS[op.method]
+			write[endpoint] += 1
+			chains[op.key] = chains.get(op.key, 0.0) + (seconds[endpoint] / calls[endpoint] if endpoint in calls else mean)
+
+		write_seconds = max(sum(chains.values()) / min(concurrency, len(chains)), max(chains.values())) if chains else 0.0
+		return cls(dict(sorted(calls.items())), dict(sorted(write.items())), write_seconds)
+
+	@property
+	def total(self) -> int:
+		return sum(self.read.values()) + sum(self.write.values())
+
+	def as_dict(self) -> dict[str, Any]:
+		return {"read": self.read, "write": self.write, "total": self.total, "estimated_write_seconds": round(self.write_seconds, 3)}
+
+
+def check_call_budget(module: AnsibleModule, estimate: CallEstimate) -> None:
+	"""Fails the module, before any write, when the run would make more than `max_api_calls` calls."""
+	budget: int | None = module.params["max_api_calls"]
+	if budget is not None and estimate.total > budget:
+		module.fail_json(
+			msg=f"The run needs {estimate.total} API calls ({sum(estimate.read.values())} made reading, {sum(estimate.write.values())} planned writes), "
+			f"over max_api_calls={budget}, no change was made",
+			stats={"api_calls": estimate.as_dict()},
+		)
@@ -1,56 +1,285 @@
+import asyncio
+import math
 import os
+import socket
+import threading
+import time
+import traceback
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import TypeVar
+from typing import Any, TypeVar
 
 import requests
-from pydantic import TypeAdapter
+from pydantic import ValidationError
+from requests.adapters import HTTPAdapter
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiSuccess, parse_api_response
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.retry import RetryPolicy
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import (
+	ApiError,
+	ApiSuccess,
+	is_invalid_json,
+	parse_api_response_json,
+	warm_api_responses,
+)
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.pydantic import ADAPTERS
+
+try:
+	import httpx
+
+	HAS_HTTPX = True
+	HTTPX_IMPORT_ERROR = None
+except ImportError:  # pragma: no cover
+	HAS_HTTPX = False
+	HTTPX_IMPORT_ERROR = traceback.format_exc()
 
 Rep = TypeVar("Rep")
 Req = TypeVar("Req")
 
 
+class DeadlineExceeded(TimeoutError):
+	"""The API instance's `deadline` passed, no further call is attempted."""
+
+
 def _default_tls_verify() -> bool:
 	return os.environ.get("PURELYMAIL_API_TLS_VERIFY", "true") == "true"
 
 
+def _serialize(payload: Any) -> Any:
+	# Use pydantic to serialize: respects Field(exclude=...), recurses into
+	# nested dataclasses, and emits field names (which match the API's
+	# camelCase contract — aliases are for input only).
+	return ADAPTERS.get(type(payload)).dump_python(payload, mode="json")
+
+
+def _unwrap(resp: Any, response_model: type[Rep]) -> Rep:
+	"""`resp` is either a `requests.Response` or an `httpx.Response`, both expose `content` and `raise_for_status()`."""
+	# Parse the body first: the Purelymail API can return structured errors
+	# under non-2xx as well as 200 OK, and we want the typed ApiError instead
+	# of a bare HTTPError when possible.
+	# The raw bytes go straight to pydantic-core, no intermediate `resp.json()` dict.
+	try:
+		data = parse_api_response_json(resp.content, response_model)
+	except ValidationError as err:
+		if not is_invalid_json(err):
+			raise
+		resp.raise_for_status()
+		raise  # response wasn't JSON but was 2xx
+
+	match data:
+		case ApiSuccess():
+			return data.result
+		case err:
+			raise err
+
+
+def _next_delay(policy: RetryPolicy, endpoint: str, attempt: int, previous: float, err: Exception, resp: Any) -> float | None:
+	"""`resp` is None when the request failed before any response (connection error, timeout)."""
+	return policy.next_delay(
+		endpoint,
+		attempt,
+		previous,
+		status=None if resp is None else resp.status_code,
+		code=err.code if isinstance(err, ApiError) else None,
+		retry_after=None if resp is None else resp.headers.get("Retry-After"),
+	)
+
+
+def _time_left(deadline: float | None) -> float:
+	return math.inf if deadline is None else deadline - time.monotonic()
+
+
+def _retry_delay(policy: RetryPolicy, deadline: float | None, endpoint: str, attempt: int, previous: float, err: Exception, resp: Any) -> float:
+	"""
+	After a failed call, shared by the sync and async clients: the delay before retrying it.
+	Re-raises `err` when it isn't retried (deadline passed or not, it's the actual failure),
+	raises `DeadlineExceeded` only when a retry was possible but wouldn't fit before the deadline.
+	"""
+	retry_in = _next_delay(policy, endpoint, attempt, previous, err, resp)
+	if retry_in is None:
+		raise err
+	if retry_in >= _time_left(deadline):
+		raise DeadlineExceeded(f"Deadline exceeded while calling {endpoint}") from err
+	return retry_in
+
+
+def _call_timeout(timeout: tuple[float, float], left: float, endpoint: str) -> tuple[float, float]:
+	"""(connect, read) timeouts of the next call, shortened to fit the time `left` before the deadline."""
+	if left <= 0:
+		raise DeadlineExceeded(f"Deadline exceeded, {endpoint} not called")
+	return (min(timeout[0], left), min(timeout[1], left))
+
+
+@dataclass()
+class ApiStats:
+	"""
+	Per-endpoint counters of an API instance, locked since its clients may be shared by a worker pool.
+	`calls` counts every attempt (retries included, failed ones too), `seconds` the time they took.
+	"""
+
+	retries: Counter[str] = field(default_factory=Counter)
+	calls: Counter[str] = field(default_factory=Counter)
+	seconds: dict[str, float] = field(default_factory=dict)
+	_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+	def retried(self, endpoint: str) -> None:
+		with self._lock:
+			self.retries[endpoint] += 1
+
+	def called(self, endpoint: str, seconds: float) -> None:
+		with self._lock:
+			self.calls[endpoint] += 1
+			self.seconds[endpoint] = self.seconds.get(endpoint, 0.0) + seconds
+
+	def latencies(self) -> tuple[dict[str, int], dict[str, float]]:
+		"""Consistent copies of (`calls`, `seconds`)."""
+		with self._lock:
+			return dict(self.calls), dict(self.seconds)
+
+	def as_dict(self) -> dict[str, Any]:
+		with self._lock:
+			return {"retries": dict(sorted(self.retries.items()))}
+
+
 @dataclass()
 class PurelymailAPI:
+	"""
+	Thin wrapper around a pooled, keep-alive `requests.Session`.
+	Every client built on the same instance shares its connections, call `close()`
+	(or use it as a context manager) once done.
+	"""
+
 	api_token: str
 	base_url: str = "https://purelymail.com/api"
 	api_version: str = "v0"
 	tls_verify: bool = field(default_factory=_default_tls_verify)
+	pool_size: int = 10
+	# (connect, read), the read timeout bounds each socket read rather than the whole response
+	timeout: tuple[float, float] = (10.0, 60.0)
+	# `time.monotonic()` timestamp after which no call is started, in-flight ones are cut short
+	deadline: float | None = None
+	retry: RetryPolicy = field(default_factory=RetryPolicy)
+	stats: ApiStats = field(default_factory=ApiStats, repr=False)
+	session: requests.Session = field(default_factory=requests.Session, repr=False)
+
+	def __post_init__(self):
+		if self.pool_size < 1:
+			raise ValueError(f"PurelymailAPI: pool_size must be >= 1, got {self.pool_size}")
+		# Single host, so a single pool sized for the number of concurrent callers.
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+		self.session.mount("https://", adapter)
+		self.session.mount("http://", adapter)
+		self.session.headers.update({"Purelymail-Api-Token": self.api_token, "Connection": "keep-alive"})
+		self.session.verify = self.tls_verify
+
+	def __enter__(self) -> "PurelymailAPI":
+		return self
+
+	def __exit__(self, *_) -> None:
+		self.close()
 
 	@property
 	def url(self):
 		return f"{self.base_url}/{self.api_version}"
 
+	def warm_up(self, *endpoints: tuple[type, type]) -> None:
+		"""Pre-build the (request, response) adapters of the endpoints about to be called."""
+		ADAPTERS.warm(*(req for req, _ in endpoints))
+		warm_api_responses(*(rep for _, rep in endpoints))
+
+	def close(self) -> None:
+		self.session.close()
+
 	def post(self, endpoint: str, payload: Req, response_model: type[Rep]) -> Rep:
-		# Use pydantic to serialize: respects Field(exclude=...), recurses into
-		# nested dataclasses, and emits field names (which match the API's
-		# camelCase contract — aliases are for input only).
-		body = TypeAdapter(type(payload)).dump_python(payload, mode="json")
-
-		resp = requests.post(
-			f"{self.url}/{endpoint.lstrip('/')}",
-			headers={"Purelymail-Api-Token": self.api_token},
-			json=body,
-			verify=self.tls_verify,
-		)
-
-		# Parse the body first: the Purelymail API can return structured errors
-		# under non-2xx as well as 200 OK, and we want the typed ApiError instead
-		# of a bare HTTPError when possible.
-		try:
-			payload_json = resp.json()
-		except ValueError:
-			resp.raise_for_status()
-			raise  # pragma: no cover  # response wasn't JSON but was 2xx
-
-		data = parse_api_response(payload_json, response_model)
-		match data:
-			case ApiSuccess():
-				return data.result
-			case err:
-				raise err
+		name = endpoint.lstrip("/")
+		body = _serialize(payload)
+		attempt, delay = 0, 0.0
+		while True:
+			connect, read = _call_timeout(self.timeout, _time_left(self.deadline), name)
+			resp = None
+			started = time.perf_counter()
+			try:
+				resp = self.session.post(f"{self.url}/{name}", json=body, timeout=(connect, read))
+				return _unwrap(resp, response_model)
+			except (ApiError, requests.HTTPError, requests.ConnectionError, requests.Timeout) as err:
+				delay = _retry_delay(self.retry, self.deadline, name, attempt, delay, err, resp)
+			finally:
+				self.stats.called(name, time.perf_counter() - started)
+			self.stats.retried(name)
+			time.sleep(delay)
+			attempt += 1
+
+
+@dataclass()
+class AsyncPurelymailAPI:
+	"""
+	asyncio counterpart of `PurelymailAPI`, backed by a pooled `httpx.AsyncClient`.
+	Requires the optional `httpx` dependency, use `async with` (or `await aclose()`) once done.
+	"""
+
+	api_token: str
+	base_url: str = "https://purelymail.com/api"
+	api_version: str = "v0"
+	tls_verify: bool = field(default_factory=_default_tls_verify)
+	pool_size: int = 100
+	timeout: tuple[float, float] = (10.0, 60.0)
+	deadline: float | None = None
+	retry: RetryPolicy = field(default_factory=RetryPolicy)
+	stats: ApiStats = field(default_factory=ApiStats, repr=False)
+	client: "httpx.AsyncClient | None" = field(default=None, repr=False)
+
+	def __post_init__(self):
+		if not HAS_HTTPX:  # pragma: no cover
+			raise ImportError(f"AsyncPurelymailAPI requires the `httpx` python library\n{HTTPX_IMPORT_ERROR}")
+		if self.pool_size < 1:
+			raise ValueError(f"AsyncPurelymailAPI: pool_size must be >= 1, got {self.pool_size}")
+		if self.client is None:
+			limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+			# Like urllib3 does for `requests`: headers and body are separate writes, without
+			# TCP_NODELAY Nagle + delayed ACK stalls every keep-alive request by ~40ms.
+			transport = httpx.AsyncHTTPTransport(verify=self.tls_verify, limits=limits, socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)])
+			# Per-call timeouts are set by `post`. With hundreds of calls queued on the pool,
+			# httpx's default 5s pool timeout would fail requests that are merely waiting.
+			self.client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(None))
+		self.client.headers.update({"Purelymail-Api-Token": self.api_token})
+
+	async def __aenter__(self) -> "AsyncPurelymailAPI":
+		return self
+
+	async def __aexit__(self, *_) -> None:
+		await self.aclose()
+
+	@property
+	def url(self):
+		return f"{self.base_url}/{self.api_version}"
+
+	def warm_up(self, *endpoints: tuple[type, type]) -> None:
+		"""Pre-build the (request, response) adapters of the endpoints about to be called."""
+		ADAPTERS.warm(*(req for req, _ in endpoints))
+		warm_api_responses(*(rep for _, rep in endpoints))
+
+	async def aclose(self) -> None:
+		assert self.client is not None
+		await self.client.aclose()
+
+	async def post(self, endpoint: str, payload: Req, response_model: type[Rep]) -> Rep:
+		assert self.client is not None
+		name = endpoint.lstrip("/")
+		body = _serialize(payload)
+		attempt, delay = 0, 0.0
+		while True:
+			left = _time_left(self.deadline)
+			connect, read = _call_timeout(self.timeout, left, name)
+			# Waiting for a pooled connection only counts against the deadline.
+			timeout = httpx.Timeout(connect=connect, read=read, write=read, pool=None if math.isinf(left) else left)
+			resp = None
+			started = time.perf_counter()
+			try:
+				resp = await self.client.post(f"{self.url}/{name}", json=body, timeout=timeout)
+				return _unwrap(resp, response_model)
+			except (ApiError, httpx.HTTPStatusError, httpx.TransportError) as err:
+				delay = _retry_delay(self.retry, self.deadline, name, attempt, delay, err, resp)
+			finally:
+				self.stats.called(name, time.perf_counter() - started)
+			self.stats.retried(name)
+			await asyncio.sleep(delay)
+			attempt += 1
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import AsyncPurelymailAPI, PurelymailAPI
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import EmptyRequest
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import CheckCreditResponse
 
@@ -11,3 +11,11 @@ class BillingClient:
 
 	def check_account_credit(self, req: EmptyRequest = EmptyRequest()) -> CheckCreditResponse:  # noqa: B008
 		return self.api.post("/checkAccountCredit", req, CheckCreditResponse)
+
+
+@dataclass()
+class AsyncBillingClient:
+	api: AsyncPurelymailAPI
+
+	async def check_account_credit(self, req: EmptyRequest = EmptyRequest()) -> CheckCreditResponse:  # noqa: B008
+		return await self.api.post("/checkAccountCredit", req, CheckCreditResponse)
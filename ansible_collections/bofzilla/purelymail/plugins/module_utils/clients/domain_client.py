@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import AsyncPurelymailAPI, PurelymailAPI
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import (
 	AddDomainRequest,
 	DeleteDomainRequest,
@@ -15,6 +15,14 @@ from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.
 )
 
 
+def _check_shared(req: ListDomainsRequest, res: ListDomainsResponse) -> ListDomainsResponse:
+	if not req.includeShared:
+		shared = [d.name for d in res.domains if d.isShared]
+		if shared:  # pragma: no cover
+			raise RuntimeError(f"[Purelymail error]: API returned shared domains despite includeShared=False ({shared})")
+	return res
+
+
 @dataclass()
 class DomainClient:
 	api: PurelymailAPI
@@ -26,15 +34,30 @@ class DomainClient:
 		return self.api.post("/getOwnershipCode", req, GetOwnershipCodeResponse)
 
 	def list_domains(self, req: ListDomainsRequest) -> ListDomainsResponse:
-		res = self.api.post("/listDomains", req, ListDomainsResponse)
-		if not req.includeShared:
-			shared = [d.name for d in res.domains if d.isShared]
-			if shared:  # pragma: no cover
-				raise RuntimeError(f"[Purelymail error]: API returned shared domains despite includeShared=False ({shared})")
-		return res
+		return _check_shared(req, self.api.post("/listDomains", req, ListDomainsResponse))
 
 	def update_domain_settings(self, req: UpdateDomainSettingsRequest) -> EmptyResponse:
 		return self.api.post("/updateDomainSettings", req, EmptyResponse)
 
 	def delete_domain(self, req: DeleteDomainRequest) -> EmptyResponse:
 		return self.api.post("/deleteDomain", req, EmptyResponse)
+
+
+@dataclass()
+class AsyncDomainClient:
+	api: AsyncPurelymailAPI
+
+	async def add_domain(self, req: AddDomainRequest) -> EmptyResponse:
+		return await self.api.post("/addDomain", req, EmptyResponse)
+
+	async def get_ownership_code(self, req: EmptyRequest = EmptyRequest()) -> GetOwnershipCodeResponse:  # noqa: B008
+		return await self.api.post("/getOwnershipCode", req, GetOwnershipCodeResponse)
+
+	async def list_domains(self, req: ListDomainsRequest) -> ListDomainsResponse:
+		return _check_shared(req, await self.api.post("/listDomains", req, ListDomainsResponse))
+
+	async def update_domain_settings(self, req: UpdateDomainSettingsRequest) -> EmptyResponse:
+		return await self.api.post("/updateDomainSettings", req, EmptyResponse)
+
+	async def delete_domain(self, req: DeleteDomainRequest) -> EmptyResponse:
+		return await self.api.post("/deleteDomain", req, EmptyResponse)
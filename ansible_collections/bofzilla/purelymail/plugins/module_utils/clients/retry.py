@@ -0,0 +1,71 @@
+import random
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+# Reads only: replaying a write whose response got lost could apply it twice.
+IDEMPOTENT_ENDPOINTS = frozenset({"listUser", "getUser", "listDomains", "listRoutingRules", "listPasswordReset", "checkAccountCredit"})
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+# The API spec doesn't enumerate its error codes, these are the throttling / unavailability ones.
+# Anything else (`internalError`, validation errors, unknown users...) is deterministic and fails straight away.
+RETRYABLE_CODES = frozenset({"rateLimited", "tooManyRequests", "serviceUnavailable"})
+
+
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+	"""`Retry-After` is either a number of seconds or an HTTP-date, returns the seconds to wait (None if absent or malformed)."""
+	if value is None:
+		return None
+	value = value.strip()
+	if value.isdigit():
+		return float(value)
+	try:
+		when = parsedate_to_datetime(value)
+	except (TypeError, ValueError):
+		return None
+	if when.tzinfo is None:  # pragma: no cover
+		when = when.replace(tzinfo=UTC)
+	return max(0.0, (when - (now or datetime.now(UTC))).total_seconds())
+
+
+@dataclass()
+class RetryPolicy:
+	"""
+	Decides whether a failed call is retried and how long to wait before the next attempt.
+	`max_retries` applies to `IDEMPOTENT_ENDPOINTS`, every other endpoint isn't retried unless
+	listed in `per_endpoint` (endpoint name → max retries, 0 disables).
+	"""
+
+	max_retries: int = 3
+	base_delay: float = 0.5
+	max_delay: float = 30.0
+	per_endpoint: dict[str, int] = field(default_factory=dict)
+	retryable_statuses: frozenset[int] = RETRYABLE_STATUSES
+	retryable_codes: frozenset[str] = RETRYABLE_CODES
+	rng: random.Random = field(default_factory=random.Random, repr=False)
+
+	def __post_init__(self):
+		if self.max_retries < 0 or any(n < 0 for n in self.per_endpoint.values()):
+			raise ValueError("RetryPolicy: retry counts must be >= 0")
+		if not 0 < self.base_delay <= self.max_delay:
+			raise ValueError(f"RetryPolicy: expected 0 < base_delay <= max_delay, got {self.base_delay} and {self.max_delay}")
+
+	def retries_for(self, endpoint: str) -> int:
+		return self.per_endpoint.get(endpoint, self.max_retries if endpoint in IDEMPOTENT_ENDPOINTS else 0)
+
+	def is_retryable(self, status: int | None, code: str | None) -> bool:
+		"""`status` is None when no response came back at all (connection reset, timeout...), which is always transient."""
+		return status is None or status in self.retryable_statuses or code in self.retryable_codes
+
+	def backoff(self, previous: float) -> float:
+		"""Decorrelated jitter, `previous` is the last delay (0 before the first retry)."""
+		return min(self.max_delay, self.rng.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+	def next_delay(self, endpoint: str, attempt: int, previous: float, *, status: int | None, code: str | None, retry_after: str | None) -> float | None:
+		"""Seconds to sleep before retrying failed `attempt` (0-based), None if the failure should be raised."""
+		if attempt >= self.retries_for(endpoint) or not self.is_retryable(status, code):
+			return None
+		requested = parse_retry_after(retry_after)
+		if requested is None:
+			return self.backoff(previous)
+		# The server said when to come back, don't come back earlier nor wait past our own cap.
+		return requested if requested <= self.max_delay else None
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import AsyncPurelymailAPI, PurelymailAPI
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import CreateRoutingRequest, DeleteRoutingRequest, EmptyRequest
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import EmptyResponse, ListRoutingResponse
 
@@ -17,3 +17,17 @@ class RoutingClient:
 
 	def create_routing_rule(self, req: CreateRoutingRequest) -> EmptyResponse:
 		return self.api.post("/createRoutingRule", req, EmptyResponse)
+
+
+@dataclass()
+class AsyncRoutingClient:
+	api: AsyncPurelymailAPI
+
+	async def list_routing_rules(self, req: EmptyRequest = EmptyRequest()) -> ListRoutingResponse:  # noqa: B008
+		return await self.api.post("/listRoutingRules", req, ListRoutingResponse)
+
+	async def delete_routing_rule(self, req: DeleteRoutingRequest) -> EmptyResponse:
+		return await self.api.post("/deleteRoutingRule", req, EmptyResponse)
+
+	async def create_routing_rule(self, req: CreateRoutingRequest) -> EmptyResponse:
+		return await self.api.post("/createRoutingRule", req, EmptyResponse)
@@ -14,6 +14,23 @@ PRESET_MAP: dict[PresetType, dict] = {
 }
 
 
+def _first_preset(values: dict[str, Any]) -> PresetType | None:
+	for preset, expected in PRESET_MAP.items():
+		if all(values[field] == v for field, v in expected.items()):
+			return preset
+	return None
+
+
+# `PRESET_MAP` only ever pins `matchUser` to "", so a rule's preset only depends on
+# (matchUser is empty, prefix, catchall): resolve the 8 shapes once instead of per read.
+_PRESET_BY_SHAPE: dict[tuple[bool, bool, bool], PresetType | None] = {
+	(empty, prefix, catchall): _first_preset({"matchUser": "" if empty else "user", "prefix": prefix, "catchall": catchall})
+	for empty in (True, False)
+	for prefix in (True, False)
+	for catchall in (True, False)
+}
+
+
 @dataclass(config=ConfigDict(**DEFAULT_CFG, validate_by_name=True, validate_by_alias=True))
 class RoutingRule:
 	_adapter: ClassVar[TypeAdapter["RoutingRule"]]
@@ -25,6 +42,10 @@ class RoutingRule:
 	targetAddresses: list[str] = Field(..., alias="target_addresses")
 	id: int = Field(..., gt=0)
 
+	def identity(self) -> tuple[str, str, bool, bool, tuple[str, ...]]:
+		"""Everything but the `id`, two rules with the same identity route the same way."""
+		return (self.domainName, self.matchUser, self.prefix, self.catchall, tuple(self.targetAddresses))
+
 	def as_display(self):
 		return RoutingRule._adapter.dump_python(self, exclude={"id"})
 
@@ -40,10 +61,7 @@ class RoutingRule:
 	@computed_field(return_type=PresetType | None)
 	@property
 	def preset(self) -> PresetType | None:
-		for preset, values in PRESET_MAP.items():
-			if all(getattr(self, field) == expected for field, expected in values.items()):
-				return preset
-		return None
+		return _PRESET_BY_SHAPE[(self.matchUser == "", self.prefix, self.catchall)]
 
 
 RoutingRule._adapter = TypeAdapter(RoutingRule)
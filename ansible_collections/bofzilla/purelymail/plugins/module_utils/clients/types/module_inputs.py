@@ -15,6 +15,7 @@ class UserInput(CreateUserRequest):
 	requireTwoFactorAuthentication: bool = Field(default=False, alias="require_two_factor_authentication", exclude=True)
 	recoveryEmailAllowMfaReset: bool = Field(default=True, alias="recovery_email_allow_mfa_reset", exclude=True)
 	recoveryPhoneAllowMfaReset: bool = Field(default=True, alias="recovery_phone_allow_mfa_reset", exclude=True)
+	previousNames: list[str] = Field(default_factory=list, alias="previous_names", exclude=True)
 
 	@model_validator(mode="before")
 	@classmethod
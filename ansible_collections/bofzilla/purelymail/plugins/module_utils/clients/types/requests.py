@@ -18,17 +18,13 @@ class CreateRoutingRequest(RoutingRule):
 	_preset: PresetType | None = Field(default=None, exclude=True, alias="preset")
 
 	def eq(self, rule: RoutingRule) -> bool:
-		return (
-			self.prefix == rule.prefix
-			and self.catchall == rule.catchall
-			and self.domainName == rule.domainName
-			and self.matchUser == rule.matchUser
-			and self.targetAddresses == rule.targetAddresses
-		)
+		return self.identity() == rule.identity()
 
 	@model_validator(mode="before")
 	@classmethod
-	def apply_preset(cls, data: ArgsKwargs) -> ArgsKwargs:
+	def apply_preset(cls, data: ArgsKwargs | dict) -> ArgsKwargs | dict:
+		if isinstance(data, dict):  # validated from a dump (e.g. a saved plan), fields are already resolved
+			return data
 		if data.args:
 			raise TypeError("apply_preset only supports kwargs.")
 		if not data.kwargs:  # pragma: no cover
@@ -1,9 +1,9 @@
-from typing import Annotated, Literal, TypeVar
+from typing import Annotated, Any, Literal, TypeVar
 
-from pydantic import ConfigDict, Field, TypeAdapter
+from pydantic import ConfigDict, Field, TypeAdapter, ValidationError
 from pydantic.dataclasses import dataclass
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.pydantic import DEFAULT_CFG
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.pydantic import ADAPTERS, DEFAULT_CFG
 
 T = TypeVar("T")
 
@@ -27,6 +27,24 @@ class ApiError(Exception):
 type ApiResponse[T] = Annotated[ApiSuccess[T] | ApiError, Field(..., discriminator="type")]
 
 
+def api_response_adapter(response_model: type[T]) -> TypeAdapter[ApiSuccess[T] | ApiError]:
+	return ADAPTERS.get(ApiResponse[response_model])  # ty:ignore[invalid-type-form]
+
+
+def warm_api_responses(*response_models: type[Any]) -> None:
+	ADAPTERS.warm(*(ApiResponse[m] for m in response_models))  # ty:ignore[invalid-type-form]
+
+
 def parse_api_response(data: dict, response_model: type[T]) -> ApiSuccess[T] | ApiError:
 	# strict=False because we input a dict for parsing, the method still returns an instance
-	return TypeAdapter(ApiResponse[response_model]).validate_python(data, strict=False, extra="forbid")  # ty:ignore[invalid-type-form]
+	return api_response_adapter(response_model).validate_python(data, strict=False, extra="forbid")
+
+
+def parse_api_response_json(raw: bytes, response_model: type[T]) -> ApiSuccess[T] | ApiError:
+	"""Same as `parse_api_response` but validates the raw body directly, without building an intermediate dict tree."""
+	return api_response_adapter(response_model).validate_json(raw, strict=False, extra="forbid")
+
+
+def is_invalid_json(err: ValidationError) -> bool:
+	"""True when validation failed because the body isn't JSON at all (vs JSON not matching the model)."""
+	return any(e["type"] == "json_invalid" for e in err.errors(include_url=False))
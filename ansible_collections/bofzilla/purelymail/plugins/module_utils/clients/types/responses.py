@@ -116,18 +116,10 @@ class GetUserResponse:
 		user["name"] = name
 		return user
 
-	def update(self, req: ModifyUserRequest, resetMethods: list[GetUserPasswordResetMethod] | None = None) -> "GetUserResponse":
-		return GetUserResponse(
-			enableSearchIndexing=req.enableSearchIndexing if req.enableSearchIndexing is not None else self.enableSearchIndexing,
-			recoveryEnabled=req.enablePasswordReset if req.enablePasswordReset is not None else self.recoveryEnabled,
-			requireTwoFactorAuthentication=req.requireTwoFactorAuthentication if req.requireTwoFactorAuthentication is not None else self.requireTwoFactorAuthentication,
-			enableSpamFiltering=self.enableSpamFiltering,
-			resetMethods=resetMethods if resetMethods is not None else self.resetMethods,
-		)
-
-	def modify_request(self, user_name: str, expected: "GetUserResponse", *, new_password: str | None = None) -> ModifyUserRequest:
+	def modify_request(self, user_name: str, expected: "GetUserResponse", *, new_password: str | None = None, new_user_name: str | None = None) -> ModifyUserRequest:
 		return ModifyUserRequest(
 			user_name=user_name,
+			new_user_name=new_user_name,
 			new_password=new_password,
 			enable_search_indexing=(expected.enableSearchIndexing if expected.enableSearchIndexing != self.enableSearchIndexing else None),
 			enable_password_reset=(expected.recoveryEnabled if expected.recoveryEnabled != self.recoveryEnabled else None),
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import AsyncPurelymailAPI, PurelymailAPI
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import (
 	CreateAppPasswordRequest,
 	CreateUserRequest,
@@ -55,3 +55,38 @@ class UserClient:
 
 	def delete_app_password(self, req: DeleteAppPasswordRequest) -> EmptyResponse:
 		return self.api.post("/deleteAppPassword", req, EmptyResponse)
+
+
+@dataclass()
+class AsyncUserClient:
+	api: AsyncPurelymailAPI
+
+	async def create_user(self, req: CreateUserRequest) -> EmptyResponse:
+		return await self.api.post("/createUser", req, EmptyResponse)
+
+	async def delete_user(self, req: DeleteUserRequest) -> EmptyResponse:
+		return await self.api.post("/deleteUser", req, EmptyResponse)
+
+	async def list_users(self, req: EmptyRequest = EmptyRequest()) -> ListUsersResponse:  # noqa: B008
+		return await self.api.post("/listUser", req, ListUsersResponse)
+
+	async def modify_user(self, req: ModifyUserRequest) -> EmptyResponse:
+		return await self.api.post("/modifyUser", req, EmptyResponse)
+
+	async def get_user(self, req: GetUserRequest) -> GetUserResponse:
+		return await self.api.post("/getUser", req, GetUserResponse)
+
+	async def upsert_password_reset(self, req: UpsertPasswordResetRequest) -> EmptyResponse:
+		return await self.api.post("/upsertPasswordReset", req, EmptyResponse)
+
+	async def delete_password_reset(self, req: DeletePasswordResetRequest) -> EmptyResponse:
+		return await self.api.post("/deletePasswordReset", req, EmptyResponse)
+
+	async def list_password_reset(self, req: ListPasswordResetRequest) -> ListPasswordResetResponse:
+		return await self.api.post("/listPasswordReset", req, ListPasswordResetResponse)
+
+	async def create_app_password(self, req: CreateAppPasswordRequest) -> CreateAppPasswordResponse:
+		return await self.api.post("/createAppPassword", req, CreateAppPasswordResponse)
+
+	async def delete_app_password(self, req: DeleteAppPasswordRequest) -> EmptyResponse:
+		return await self.api.post("/deleteAppPassword", req, EmptyResponse)
@@ -0,0 +1,86 @@
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+def fetch_all(fetch: Callable[[K], V], keys: Sequence[K], concurrency: int = 1) -> dict[K, V]:
+	"""
+	Calls `fetch` for every key through a pool of at most `concurrency` workers.
+	The returned dict follows the order of `keys` whatever the completion order.
+	Fail-fast: the first exception cancels every call not started yet and is re-raised
+	(calls already in flight can't be interrupted and are left to finish).
+	"""
+	if concurrency < 1:
+		raise ValueError(f"fetch_all: concurrency must be >= 1, got {concurrency}")
+	if concurrency == 1 or len(keys) <= 1:
+		return {key: fetch(key) for key in keys}
+
+	with ThreadPoolExecutor(max_workers=min(concurrency, len(keys))) as pool:
+		futures = [pool.submit(fetch, key) for key in keys]
+		done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+		failed = next((f for f in futures if f in done and f.exception() is not None), None)
+		if failed is not None:
+			pool.shutdown(wait=True, cancel_futures=True)
+			raise failed.exception()  # ty:ignore[invalid-raise]
+
+	return {key: future.result() for key, future in zip(keys, futures, strict=True)}
+
+
+@dataclass()
+class Prefetcher(Generic[K, V]):
+	"""
+	`fetch_all` whose keys can be guessed before they are known: `speculate` starts fetching likely keys
+	in the background (at most `concurrency` at once) while the caller works out the real ones, then
+	`fetch_all(keys)` reuses the speculative calls it needs, fetches the leftovers and discards the rest,
+	errors included (e.g. a guessed key that turned out not to exist). Same ordering and fail-fast rules as `fetch_all`.
+
+	with Prefetcher(fetch, 4) as prefetch:
+		prefetch.speculate(likely_keys)
+		keys = list_keys()  # runs meanwhile
+		values = prefetch.fetch_all(keys)
+	"""
+
+	fetch: Callable[[K], V]
+	concurrency: int = 1
+	# speculative calls that ran but weren't needed
+	wasted: int = field(default=0, init=False)
+	_futures: dict[K, Future[V]] = field(default_factory=dict, init=False, repr=False)
+	_pool: ThreadPoolExecutor | None = field(default=None, init=False, repr=False)
+
+	def __post_init__(self):
+		if self.concurrency < 1:
+			raise ValueError(f"Prefetcher: concurrency must be >= 1, got {self.concurrency}")
+
+	def __enter__(self) -> "Prefetcher[K, V]":
+		self._pool = ThreadPoolExecutor(max_workers=self.concurrency)
+		return self
+
+	def __exit__(self, *_) -> None:
+		assert self._pool is not None
+		self._pool.shutdown(wait=True, cancel_futures=True)
+
+	def speculate(self, keys: Iterable[K]) -> None:
+		assert self._pool is not None, "Prefetcher must be used as a context manager"
+		for key in keys:
+			if key not in self._futures:
+				self._futures[key] = self._pool.submit(self.fetch, key)
+
+	def fetch_all(self, keys: Sequence[K]) -> dict[K, V]:
+		wanted = set(keys)
+		for key in [k for k in self._futures if k not in wanted]:
+			if not self._futures.pop(key).cancel():
+				self.wasted += 1
+		self.speculate(keys)
+
+		futures = [self._futures[key] for key in keys]
+		done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+		failed = next((f for f in futures if f in done and f.exception() is not None), None)
+		if failed is not None:
+			for future in futures:
+				_ = future.cancel()
+			raise failed.exception()  # ty:ignore[invalid-raise]
+		return {key: future.result() for key, future in zip(keys, futures, strict=True)}
@@ -0,0 +1,147 @@
+import hashlib
+import json
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import (
+	AddDomainRequest,
+	CreateRoutingRequest,
+	CreateUserRequest,
+	DeleteDomainRequest,
+	DeletePasswordResetRequest,
+	DeleteRoutingRequest,
+	DeleteUserRequest,
+	ModifyUserRequest,
+	UpdateDomainSettingsRequest,
+	UpsertPasswordResetRequest,
+)
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.local_store import LocalStore, account_key
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.pydantic import ADAPTERS
+
+# Documented by the `bofzilla.purelymail.execution_plan` doc fragment
+PLAN_SPEC = dict(
+	plan_out=dict(type="path", required=False),
+	plan_in=dict(type="path", required=False),
+)
+
+PLAN_VERSION = 1
+REDACTED = "<redacted>"
+# Request fields holding a password: never written to a plan file, `plan_in` takes them from the task again.
+SECRET_FIELDS = ("password", "newPassword")
+REQUEST_TYPES: dict[str, type] = {
+	"create_user": CreateUserRequest,
+	"delete_user": DeleteUserRequest,
+	"modify_user": ModifyUserRequest,
+	"delete_password_reset": DeletePasswordResetRequest,
+	"upsert_password_reset": UpsertPasswordResetRequest,
+	"add_domain": AddDomainRequest,
+	"update_domain_settings": UpdateDomainSettingsRequest,
+	"delete_domain": DeleteDomainRequest,
+	"create_routing_rule": CreateRoutingRequest,
+	"delete_routing_rule": DeleteRoutingRequest,
+}
+
+
+class PlanFileError(Exception):
+	"""A `plan_in` file can't be applied: stale, computed for another module or account, unreadable..."""
+
+
+def state_fingerprint(state: Any) -> str:
+	"""Digest of a JSON-serializable account state, independent of dict key order."""
+	return hashlib.sha256(json.dumps(state, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _dump_operation(op: Operation) -> dict[str, Any]:
+	request = ADAPTERS.get(type(op.request)).dump_python(op.request, mode="json")
+	for name in SECRET_FIELDS:
+		if request.get(name) is not None:
+			request[name] = REDACTED
+	return {"method": op.method, "key": op.key, "label": op.label, "request": request}
+
+
+def _load_operation(data: dict[str, Any], secrets: Mapping[str, str], source: str) -> Operation:
+	request = dict(data["request"])
+	for name in (n for n in SECRET_FIELDS if request.get(n) == REDACTED):
+		if data["key"] not in secrets:
+			raise PlanFileError(f"{source}: {data['method']} of {data['key']} sets a password, provide it again in the task")
+		request[name] = secrets[data["key"]]
+	request_type = REQUEST_TYPES[data["method"]]
+	return Operation(data["method"], data["key"], ADAPTERS.get(request_type).validate_python(request, by_name=True, strict=False), data["label"])
+
+
+@dataclass()
+class ExecutionPlan:
+	"""
+	Operations computed by a check mode run (`plan_out`), applied as they are by a later run (`plan_in`).
+	- `fingerprint` digests the list-level state the plan was computed from.
+	- A later run only lists the account to validate the plan, and refuses it if anything listed changed since.
+	- `result` holds what the planning run returned about the account (after-state, diff), returned again when applied.
+	- Passwords are redacted, the applying run takes them from its own parameters (`secrets`, keyed by operation key).
+	"""
+
+	module: str
+	account: str
+	fingerprint: str
+	operations: list[Operation]
+	result: dict[str, Any]
+
+	@classmethod
+	def build(cls, module: str, api_token: str, state: Any, operations: Sequence[Operation], result: dict[str, Any]) -> "ExecutionPlan":
+		return cls(module, account_key(api_token), state_fingerprint(state), list(operations), result)
+
+	def dump(self) -> dict[str, Any]:
+		"""JSON-serializable form of the plan, passwords redacted."""
+		return {
+			"version": PLAN_VERSION,
+			"module": self.module,
+			"account": self.account,
+			"fingerprint": self.fingerprint,
+			"operations": [_dump_operation(op) for op in self.operations],
+			"result": self.result,
+		}
+
+	@classmethod
+	def parse(cls, data: dict[str, Any], secrets: Mapping[str, str] | None = None, source: str = "plan_in") -> "ExecutionPlan":
+		"""Counterpart of `dump`, redacted passwords are taken from `secrets` (keyed by operation key), `source` names the file in errors."""
+		operations = [_load_operation(op, secrets or {}, source) for op in data["operations"]]
+		return cls(data["module"], data["account"], data["fingerprint"], operations, data["result"])
+
+	def save(self, path: str) -> None:
+		try:
+			LocalStore(path).write(self.dump())
+		except OSError as err:
+			raise PlanFileError(f"plan_out: can't write {path}: {err}") from err
+
+	@classmethod
+	def load(cls, path: str, module: str, api_token: str, state: Any, secrets: Mapping[str, str] | None = None) -> "ExecutionPlan":
+		"""The plan saved at `path`, raises `PlanFileError` unless it was computed by `module`, on this account, from `state`."""
+		try:
+			data = LocalStore(path).read()
+		except (OSError, ValueError) as err:
+			raise PlanFileError(f"plan_in: can't read {path}: {err}") from err
+		if not data:
+			raise PlanFileError(f"plan_in: {path} does not exist or is empty")
+		if data.get("version") != PLAN_VERSION:
+			raise PlanFileError(f"plan_in: unsupported plan version {data.get('version')!r}, expected {PLAN_VERSION}")
+		if data["module"] != module:
+			raise PlanFileError(f"plan_in: the plan was computed by {data['module']}, not {module}")
+		if data["account"] != account_key(api_token):
+			raise PlanFileError("plan_in: the plan was computed for another account")
+		if data["fingerprint"] != state_fingerprint(state):
+			raise PlanFileError("plan_in: the account changed since the plan was computed, compute a new one")
+		return cls.parse(data, secrets)
+
+
+def plan_paths(module: AnsibleModule) -> tuple[str | None, str | None]:
+	"""The module's (`plan_out`, `plan_in`) params, fails the module if they can't be used together."""
+	plan_out: str | None = module.params["plan_out"]
+	plan_in: str | None = module.params["plan_in"]
+	if plan_out and plan_in:
+		module.fail_json(msg="plan_out and plan_in are mutually exclusive")
+	if plan_out and not module.check_mode:
+		module.fail_json(msg="plan_out requires check mode, the plan would be applied right away otherwise")
+	return plan_out, plan_in
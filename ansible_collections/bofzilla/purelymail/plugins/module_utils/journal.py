@@ -0,0 +1,200 @@
+import contextlib
+import json
+import os
+import threading
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.api_options import API_OPTIONS_SPEC
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import ListDomainsRequest, ListPasswordResetRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.execution_plan import PLAN_SPEC, ExecutionPlan, state_fingerprint
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.local_store import account_key
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation
+
+# Documented by the `bofzilla.purelymail.journal` doc fragment
+JOURNAL_SPEC = dict(
+	journal=dict(type="path", required=False),
+)
+
+JOURNAL_VERSION = 1
+# Parameters about how a run goes rather than the state it converges to, left out of the task fingerprint:
+# an interrupted run is resumed when rerun with e.g. a longer `deadline`.
+RUN_SETTINGS = frozenset(
+	(
+		*API_OPTIONS_SPEC,
+		*PLAN_SPEC,
+		*JOURNAL_SPEC,
+		"refresh_after_apply",
+		"diff_detail",
+		"check_fidelity",
+		"fetch_concurrency",
+		"speculative_prefetch",
+		"state_cache",
+		"max_state_age",
+	)
+)
+
+
+def task_fingerprint(params: Mapping[str, Any]) -> str:
+	"""
+	Digest of a module's parameters describing the state to converge to, `RUN_SETTINGS` left out.
+	The API token and passwords are left out too, they are never written to disk, even hashed.
+	"""
+
+	def public(value: Any) -> Any:
+		if isinstance(value, Mapping):
+			return {k: public(v) for k, v in value.items() if k not in ("api_token", "password")}
+		if isinstance(value, list):
+			return [public(v) for v in value]
+		return value
+
+	return state_fingerprint(public({k: v for k, v in params.items() if k not in RUN_SETTINGS}))
+
+
+def _reads() -> Callable[[str, Callable[[], Any]], Any]:
+	"""Memoizes the reads of one `settle`, an endpoint is called once whatever the number of operations to verify."""
+	cache: dict[str, Any] = {}
+
+	def read(name: str, fetch: Callable[[], Any]) -> Any:
+		if name not in cache:
+			cache[name] = fetch()
+		return cache[name]
+
+	return read
+
+
+def _applied(client: Any, op: Operation, read: Callable[[str, Callable[[], Any]], Any]) -> bool:
+	"""
+	Whether `op`, started by a run that died before recording its outcome, took effect.
+	False when running it again is harmless (e.g. settings updates): it is run again rather than verified.
+	"""
+	req = op.request
+
+	def users() -> list[str]:
+		return read("listUser", lambda: client.list_users().users)
+
+	def reset_targets(user: str) -> list[str]:
+		return [m.target for m in read(f"listPasswordResetMethods:{user}", lambda: client.list_password_reset(ListPasswordResetRequest(user)).users)]
+
+	def domains() -> list[str]:
+		return [d.name for d in read("listDomains", lambda: client.list_domains(ListDomainsRequest(True)).domains)]
+
+	def rules() -> list[Any]:
+		return read("listRoutingRules", lambda: client.list_routing_rules().rules)
+
+	if op.method == "create_user":
+		return op.key in users()
+	if op.method == "delete_user":
+		return op.key not in users()
+	if op.method == "modify_user":
+		return req.newUserName is not None and req.newUserName in users()
+	if op.method == "upsert_password_reset":
+		# replacing a method in place fails once the previous target is gone
+		return req.existingTarget is not None and req.target in reset_targets(req.userName) and req.existingTarget not in reset_targets(req.userName)
+	if op.method == "delete_password_reset":
+		targets = reset_targets(req.userName)
+		return not targets if req.target is None else req.target not in targets
+	if op.method == "add_domain":
+		return req.domainName in domains()
+	if op.method == "delete_domain":
+		return req.domainName not in domains()
+	if op.method == "create_routing_rule":
+		return any(req.eq(rule) for rule in rules())
+	if op.method == "delete_routing_rule":
+		return all(rule.id != req.routingRuleId for rule in rules())
+	return False  # update_domain_settings
+
+
+@dataclass()
+class OperationJournal:
+	"""
+	Write-ahead log of an apply, so that a run interrupted midway (network outage, killed fork...) is resumed by the next one.
+	- JSON Lines file: the plan first (`ExecutionPlan.dump`, passwords redacted), then one `start` and one `done` line per operation.
+	- Every line is flushed and fsynced before the operation it announces runs (or after it returned), the file is removed once the plan is applied.
+	- A later run of the same task (same module, account and parameters) resumes the plan instead of computing a new one.
+	- When resuming, operations `done` are not run again, the ones `start`ed but not `done` are verified with targeted reads (`settle`).
+	"""
+
+	path: str
+	plan: ExecutionPlan
+	started: set[int] = field(default_factory=set)
+	done: set[int] = field(default_factory=set)
+	_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+	@property
+	def operations(self) -> list[Operation]:
+		return self.plan.operations
+
+	@property
+	def result(self) -> dict[str, Any]:
+		return self.plan.result
+
+	@classmethod
+	def start(cls, path: str, module: str, params: Mapping[str, Any], operations: Sequence[Operation], result: dict[str, Any]) -> "OperationJournal":
+		"""A new journal of `operations`, replacing whatever `path` held."""
+		# fingerprinted by the task, not the account state: the state changes as the plan is applied
+		plan = ExecutionPlan(module, account_key(params["api_token"]), task_fingerprint(params), list(operations), result)
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, mode=0o700, exist_ok=True)
+		with open(path, "w", encoding="utf-8") as file:
+			os.fchmod(file.fileno(), 0o600)
+			file.write(json.dumps({"journal": JOURNAL_VERSION, "plan": plan.dump()}, sort_keys=True) + "\n")
+			file.flush()
+			os.fsync(file.fileno())
+		return cls(path, plan)
+
+	@classmethod
+	def resume(cls, path: str, module: str, params: Mapping[str, Any], secrets: Mapping[str, str] | None = None) -> "OperationJournal | None":
+		"""The unfinished journal of this same task, None when there is none (a journal of another task is left for `start` to replace)."""
+		try:
+			with open(path, encoding="utf-8") as file:
+				lines = file.read().splitlines()
+		except FileNotFoundError:
+			return None
+		try:
+			header = json.loads(lines[0])
+		except (IndexError, ValueError):
+			return None  # died while writing the plan: no operation ran
+		plan = header.get("plan", {})
+		if header.get("journal") != JOURNAL_VERSION or plan.get("module") != module:
+			return None
+		if plan.get("account") != account_key(params["api_token"]) or plan.get("fingerprint") != task_fingerprint(params):
+			return None
+
+		journal = cls(path, ExecutionPlan.parse(plan, secrets, source="journal"))
+		for line in lines[1:]:
+			try:
+				entry = json.loads(line)
+			except ValueError:
+				break  # died while writing this line
+			(journal.started if entry["event"] == "start" else journal.done).add(entry["op"])
+		return journal
+
+	def record(self, idx: int, event: Literal["start", "done"]) -> None:
+		"""`apply_operations` hook: durably appends `event` for the operation at `idx` before returning."""
+		with self._lock, open(self.path, "a", encoding="utf-8") as file:
+			file.write(json.dumps({"op": idx, "event": event}) + "\n")
+			file.flush()
+			os.fsync(file.fileno())
+		(self.started if event == "start" else self.done).add(idx)
+
+	def unsettled(self) -> list[int]:
+		"""Operations started but never recorded as done: the run died (or failed) during their call."""
+		return sorted(self.started - self.done)
+
+	def settle(self, client: Any) -> set[int]:
+		"""
+		Verifies the `unsettled` operations with targeted reads (each list read once, never a fetch of the whole account),
+		records the ones that took effect as done and returns every operation not to run again.
+		"""
+		read = _reads()
+		for idx in self.unsettled():
+			if _applied(client, self.operations[idx], read):
+				self.record(idx, "done")
+		return set(self.done)
+
+	def close(self) -> None:
+		"""The plan is fully applied: nothing left to resume."""
+		with contextlib.suppress(FileNotFoundError):
+			os.unlink(self.path)
@@ -0,0 +1,76 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+
+def account_key(api_token: str) -> str:
+	"""Identifies the account an API token belongs to without ever writing the token to disk."""
+	return hashlib.sha256(f"purelymail:{api_token}".encode()).hexdigest()
+
+
+@dataclass()
+class LocalStore:
+	"""
+	JSON document persisted on the host running the module, shared by every run (and fork) using the same `path`.
+	- Readers and writers serialize on an `flock` of the `<path>.lock` sidecar (the document itself is replaced, never locked).
+	- Writes go to a temporary file in the same directory which atomically replaces `path`: a crash never leaves a truncated document.
+	- `update` is a locked read-modify-write, so concurrent runs merge their changes instead of overwriting each other's.
+	"""
+
+	path: str
+
+	@contextmanager
+	def _locked(self, exclusive: bool) -> Iterator[None]:
+		directory = os.path.dirname(os.path.abspath(self.path))
+		os.makedirs(directory, mode=0o700, exist_ok=True)
+		fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+		try:
+			fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+			yield
+		finally:
+			os.close(fd)  # releases the lock
+
+	def _load(self) -> dict[str, Any]:
+		try:
+			with open(self.path, encoding="utf-8") as file:
+				data = json.load(file)
+		except FileNotFoundError:
+			return {}
+		if not isinstance(data, dict):
+			raise ValueError(f"{self.path}: expected a JSON object, got {type(data).__name__}")
+		return data
+
+	def read(self) -> dict[str, Any]:
+		with self._locked(exclusive=False):
+			return self._load()
+
+	def _write(self, data: dict[str, Any]) -> None:
+		fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix=".", suffix=".tmp")
+		try:
+			with os.fdopen(fd, "w", encoding="utf-8") as file:
+				json.dump(data, file, sort_keys=True)
+				file.flush()
+				os.fsync(file.fileno())
+			os.replace(tmp, self.path)
+		except BaseException:
+			os.unlink(tmp)
+			raise
+
+	def write(self, data: dict[str, Any]) -> None:
+		"""Replaces the whole document."""
+		with self._locked(exclusive=True):
+			self._write(data)
+
+	def update(self, change: Callable[[dict[str, Any]], None]) -> dict[str, Any]:
+		"""Applies `change` in place to the current document and persists it, returns the new document."""
+		with self._locked(exclusive=True):
+			data = self._load()
+			change(data)
+			self._write(data)
+			return data
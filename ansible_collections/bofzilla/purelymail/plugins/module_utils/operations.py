@@ -0,0 +1,157 @@
+import threading
+import time
+from collections.abc import Callable, Collection, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
+
+
+@dataclass()
+class Operation:
+	"""
+	One planned write, `client.<method>(request)`.
+	`key` is the object it touches (user email, domain name...), `label` what's displayed when it differs.
+	"""
+
+	method: str
+	key: str
+	request: Any
+	label: str | None = None
+
+	def run(self, client: Any) -> Any:
+		return getattr(client, self.method)(self.request)
+
+	def as_display(self) -> dict[str, str]:
+		# Never the request itself, it may hold a password.
+		return {"method": self.method, "target": self.label or self.key}
+
+
+@dataclass()
+class OperationResult:
+	"""
+	Outcome of an `Operation`: "planned" in check mode, "skipped" when an earlier failure stopped the run (or its key),
+	"resumed" when an earlier, interrupted run already applied it (see `journal.OperationJournal`).
+	"""
+
+	operation: Operation
+	status: Literal["planned", "ok", "resumed", "failed", "skipped"]
+	duration: float | None = None
+	error: Exception | None = field(default=None, repr=False)
+
+	def as_display(self) -> dict[str, Any]:
+		return self.operation.as_display() | {"status": self.status, "duration": None if self.duration is None else round(self.duration, 4)}
+
+
+def _error_message(err: Exception) -> str:
+	return f"Purelymail API error: {err}" if isinstance(err, ApiError) else f"{type(err).__name__}: {err}"
+
+
+class ApplyInterrupted(Exception):
+	"""
+	An operation failed (API error, deadline...): no operation was started after it,
+	or with `on_error="continue"` none touching the same key as a failed one.
+	`cause` is the first failure in plan order.
+	"""
+
+	def __init__(self, cause: Exception, results: Sequence[OperationResult]):
+		super().__init__(str(cause))
+		self.cause = cause
+		self.results = list(results)
+
+	@property
+	def failed(self) -> list[OperationResult]:
+		return [r for r in self.results if r.status == "failed"]
+
+	@property
+	def msg(self) -> str:
+		count = len(self.failed)
+		return _error_message(self.cause) if count <= 1 else f"{count} operations failed, the first one with {_error_message(self.cause)}"
+
+	def as_result(self) -> dict[str, Any]:
+		"""`fail_json` kwargs reporting what was applied and what wasn't (failed operations included)."""
+		return {
+			"changed": bool(touched_keys(self.results)),
+			"completed": [r.operation.as_display() for r in self.results if r.status in ("ok", "resumed")],
+			"pending": [r.operation.as_display() for r in self.results if r.status not in ("ok", "resumed")],
+			"operations": [r.as_display() for r in self.results],
+			"failed": [r.operation.as_display() | {"error": _error_message(r.error)} for r in self.failed if r.error is not None],
+		}
+
+
+def touched_keys(results: Iterable[OperationResult]) -> set[str]:
+	"""Keys of the objects applied operations wrote to, an earlier interrupted run's included."""
+	return {r.operation.key for r in results if r.status in ("ok", "resumed")}
+
+
+def plan_operations(operations: Sequence[Operation]) -> list[OperationResult]:
+	"""Check mode counterpart of `apply_operations`."""
+	return [OperationResult(op, "planned") for op in operations]
+
+
+def apply_operations(
+	client: Any,
+	operations: Sequence[Operation],
+	concurrency: int = 1,
+	*,
+	completed: Collection[int] = (),
+	record: Callable[[int, Literal["start", "done"]], None] | None = None,
+	on_error: Literal["abort", "continue"] = "abort",
+) -> list[OperationResult]:
+	"""
+	Runs `operations` through at most `concurrency` workers, results follow the plan order.
+	Operations sharing a `key` run one after the other in plan order, different keys proceed in parallel
+	(with `concurrency=1` the whole plan runs serially, in order).
+	Fail-fast: once an operation fails no other one is started, operations in flight are left to finish,
+	then `ApplyInterrupted` is raised for the first failure in plan order.
+	- `on_error="continue"`: a failure only skips the later operations sharing its key, every other one is still attempted.
+	- `ApplyInterrupted` is then raised once they all ran, reporting every failure.
+	- `completed`: indexes of the operations an earlier run already applied, reported as "resumed" without running them.
+	- `record(index, event)` is called before ("start") and after ("done") each operation runs, e.g. to journal them.
+	- An error raised by `record` fails the operation like an API error would.
+	"""
+	if concurrency < 1:
+		raise ValueError(f"apply_operations: concurrency must be >= 1, got {concurrency}")
+
+	results = [OperationResult(op, "resumed" if idx in completed else "skipped") for idx, op in enumerate(operations)]
+	stop = threading.Event()
+	# only written to by the worker running the key's chain
+	failed_keys: set[str] = set()
+
+	def run_chain(indexes: Iterable[int]) -> None:
+		for idx in indexes:
+			if stop.is_set():
+				return
+			if idx in completed or operations[idx].key in failed_keys:
+				continue
+			start = time.perf_counter()
+			try:
+				if record is not None:
+					record(idx, "start")
+				operations[idx].run(client)
+				if record is not None:
+					record(idx, "done")
+			except Exception as err:
+				results[idx] = OperationResult(operations[idx], "failed", time.perf_counter() - start, err)
+				failed_keys.add(operations[idx].key)
+				if on_error == "abort":
+					stop.set()
+				continue
+			results[idx] = OperationResult(operations[idx], "ok", time.perf_counter() - start)
+
+	chains: dict[str, list[int]] = {}
+	for idx, op in enumerate(operations):
+		chains.setdefault(op.key, []).append(idx)
+
+	if concurrency == 1 or len(chains) <= 1:
+		run_chain(range(len(operations)))
+	else:
+		with ThreadPoolExecutor(max_workers=min(concurrency, len(chains))) as pool:
+			_ = list(pool.map(run_chain, chains.values()))
+
+	failed = next((r for r in results if r.status == "failed"), None)
+	if failed is not None:
+		assert failed.error is not None
+		raise ApplyInterrupted(failed.error, results) from failed.error
+	return results
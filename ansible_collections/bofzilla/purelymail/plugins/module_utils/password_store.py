@@ -0,0 +1,87 @@
+import hashlib
+import hmac
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.concurrency import fetch_all
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.local_store import LocalStore, account_key
+
+# scrypt (RFC 7914) costs ~16 MiB and a few tens of ms per hash; pbkdf2 where OpenSSL lacks scrypt.
+SCRYPT_PARAMS = dict(n=2**14, r=8, p=1)
+PBKDF2_ITERATIONS = 600_000
+
+
+def fingerprint(password: str, salt: bytes, alg: str) -> str:
+	if alg == "scrypt":
+		return hashlib.scrypt(password.encode(), salt=salt, **SCRYPT_PARAMS).hex()
+	if alg == "pbkdf2_sha256":
+		return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PBKDF2_ITERATIONS).hex()
+	raise ValueError(f"Unknown password fingerprint algorithm {alg!r}")
+
+
+DEFAULT_ALG = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+
+
+def _section(data: dict[str, Any], account: str) -> dict[str, dict[str, str]]:
+	return data.setdefault("passwords", {}).setdefault(account, {})
+
+
+@dataclass()
+class PasswordFingerprints:
+	"""
+	Salted slow hashes of the last password this collection set for each user, stored under
+	`passwords.<account key>.<user name>` of a `LocalStore`. The API can't verify a password,
+	this tells whether re-sending it would change anything. Passwords changed outside the module aren't detected.
+	"""
+
+	store: LocalStore
+	account: str
+	entries: dict[str, dict[str, str]] = field(default_factory=dict, repr=False)
+	_recorded: dict[str, dict[str, str] | None] = field(default_factory=dict, init=False, repr=False)
+
+	@classmethod
+	def load(cls, path: str, api_token: str) -> "PasswordFingerprints":
+		store, account = LocalStore(path), account_key(api_token)
+		return cls(store, account, dict(_section(store.read(), account)))
+
+	def matches(self, user_name: str, password: str) -> bool:
+		entry = self.entries.get(user_name)
+		if entry is None:
+			return False
+		return hmac.compare_digest(entry["hash"], fingerprint(password, bytes.fromhex(entry["salt"]), entry["alg"]))
+
+	def matching(self, passwords: dict[str, str], concurrency: int = 1) -> set[str]:
+		"""User names whose password matches its recorded hash, hashed by up to `concurrency` workers (scrypt releases the GIL)."""
+		checked = fetch_all(lambda user_name: self.matches(user_name, passwords[user_name]), [name for name in passwords if name in self.entries], concurrency)
+		return {user_name for user_name, same in checked.items() if same}
+
+	def record(self, user_name: str, password: str) -> None:
+		salt = os.urandom(16)
+		self._recorded[user_name] = self.entries[user_name] = {"alg": DEFAULT_ALG, "salt": salt.hex(), "hash": fingerprint(password, salt, DEFAULT_ALG)}
+
+	def rename(self, user_name: str, new_user_name: str) -> None:
+		entry = self.entries.pop(user_name, None)
+		self._recorded[user_name] = None
+		if entry is not None:
+			self._recorded[new_user_name] = self.entries[new_user_name] = entry
+
+	def forget(self, user_name: str) -> None:
+		self.entries.pop(user_name, None)
+		self._recorded[user_name] = None
+
+	def save(self) -> None:
+		"""Merges this run's changes into the store, entries other runs recorded meanwhile are kept."""
+		if not self._recorded:
+			return
+
+		def change(data: dict[str, Any]) -> None:
+			section = _section(data, self.account)
+			for user_name, entry in self._recorded.items():
+				if entry is None:
+					section.pop(user_name, None)
+				else:
+					section[user_name] = entry
+
+		self.store.update(change)
+		self._recorded.clear()
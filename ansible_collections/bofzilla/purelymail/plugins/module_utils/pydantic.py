@@ -1,4 +1,7 @@
-from pydantic import ConfigDict
+import threading
+from typing import Any
+
+from pydantic import ConfigDict, TypeAdapter
 
 DEFAULT_CFG = ConfigDict(
 	extra="forbid",
@@ -9,3 +12,42 @@ DEFAULT_CFG = ConfigDict(
 	validate_return=True,
 	validation_error_cause=True,
 )
+
+
+class AdapterRegistry:
+	"""
+	Process-wide `TypeAdapter` cache keyed by type.
+	Building an adapter builds a full pydantic-core schema, which costs more than
+	the (de)serialization itself, so it must only happen once per type.
+	"""
+
+	def __init__(self):
+		self._adapters: dict[Any, TypeAdapter] = {}
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, tp: Any) -> TypeAdapter:
+		# Counters included: worker pools share the registry.
+		with self._lock:
+			adapter = self._adapters.get(tp)
+			if adapter is not None:
+				self.hits += 1
+				return adapter
+			self.misses += 1
+			adapter = self._adapters[tp] = TypeAdapter(tp)
+			return adapter
+
+	def warm(self, *types: Any) -> None:
+		"""Build adapters ahead of time, doesn't count as hits or misses."""
+		with self._lock:
+			for tp in types:
+				if tp not in self._adapters:
+					self._adapters[tp] = TypeAdapter(tp)
+
+	def stats(self) -> dict[str, int]:
+		with self._lock:
+			return {"size": len(self._adapters), "hits": self.hits, "misses": self.misses}
+
+
+ADAPTERS = AdapterRegistry()
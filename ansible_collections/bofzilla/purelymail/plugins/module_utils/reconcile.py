@@ -0,0 +1,56 @@
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+D = TypeVar("D")
+E = TypeVar("E")
+
+
+@dataclass()
+class Reconciliation(Generic[D, E]):
+	"""What to do to turn the existing entries into the desired ones, every list follows its input order."""
+
+	create: list[D] = field(default_factory=list)
+	update: list[tuple[D, E]] = field(default_factory=list)
+	unchanged: list[tuple[D, E]] = field(default_factory=list)
+	delete: list[E] = field(default_factory=list)
+
+
+def reconcile(
+	desired: Iterable[D],
+	existing: Iterable[E],
+	*,
+	key: Callable[[D], Hashable],
+	existing_key: Callable[[E], Hashable] | None = None,
+	differs: Callable[[D, E], bool] | None = None,
+	prune: Callable[[E], bool] | bool = True,
+) -> Reconciliation[D, E]:
+	"""
+	Matches `desired` and `existing` entries by key in linear time (one hash index per side).
+	- `existing_key` defaults to `key`, for when both sides share a type.
+	- A matched pair lands in `update` when `differs(desired, existing)`, `unchanged` otherwise (no `differs`: always unchanged).
+	- When several existing entries share a key, the first one is the match.
+	- An unmatched existing entry is only deleted if `prune` (or `prune(entry)`) is true.
+	"""
+	get_key: Callable[[E], Hashable] = existing_key or key  # ty:ignore[invalid-assignment]
+	should_prune = prune if callable(prune) else (lambda _: prune)
+
+	existing = list(existing)
+	index: dict[Hashable, E] = {}
+	for entry in existing:
+		index.setdefault(get_key(entry), entry)
+
+	res: Reconciliation[D, E] = Reconciliation()
+	desired_keys: set[Hashable] = set()
+	for entry in desired:
+		k = key(entry)
+		desired_keys.add(k)
+		if k not in index:
+			res.create.append(entry)
+		elif differs is not None and differs(entry, index[k]):
+			res.update.append((entry, index[k]))
+		else:
+			res.unchanged.append((entry, index[k]))
+
+	res.delete = [entry for entry in existing if get_key(entry) not in desired_keys and should_prune(entry)]
+	return res
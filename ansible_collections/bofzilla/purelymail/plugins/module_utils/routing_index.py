@@ -0,0 +1,35 @@
+from collections.abc import Iterable
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import PresetType, RoutingRule
+
+MatchKey = tuple[str, str, bool, bool]
+# At most one of these per domain, the API rejects the second one.
+EXCLUSIVE_PRESETS: tuple[PresetType, ...] = ("any_address", "catchall_except_valid")
+
+
+def match_key(rule: RoutingRule) -> MatchKey:
+	"""What a rule matches, regardless of where it routes to."""
+	return (rule.domainName, rule.matchUser, rule.prefix, rule.catchall)
+
+
+class RoutingRuleIndex:
+	"""
+	Rules bucketed by domain and by `match_key`, each rule's preset computed once.
+	Buckets hold positions in `rules` so duplicated rules stay distinct.
+	"""
+
+	def __init__(self, rules: Iterable[RoutingRule]):
+		self.rules = list(rules)
+		self.presets: list[PresetType | None] = [rule.preset for rule in self.rules]
+		self.by_domain: dict[str, list[int]] = {}
+		self.by_match: dict[MatchKey, list[int]] = {}
+		self._exclusive: dict[str, list[int]] = {}
+		for idx, rule in enumerate(self.rules):
+			self.by_domain.setdefault(rule.domainName, []).append(idx)
+			self.by_match.setdefault(match_key(rule), []).append(idx)
+			if self.presets[idx] in EXCLUSIVE_PRESETS:
+				self._exclusive.setdefault(rule.domainName, []).append(idx)
+
+	def exclusive(self, domain: str) -> list[int]:
+		"""Positions of the `EXCLUSIVE_PRESETS` rules of `domain`."""
+		return self._exclusive.get(domain, [])
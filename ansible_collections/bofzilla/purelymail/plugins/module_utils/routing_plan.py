@@ -0,0 +1,62 @@
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Literal
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.reconcile import reconcile
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.routing_index import MatchKey, match_key
+
+NormalizedRule = tuple[MatchKey, frozenset[str]]
+
+
+def normalized(rule: RoutingRule) -> NormalizedRule:
+	"""Targets as a set: a rule routes the same whatever the order they're listed in."""
+	return (match_key(rule), frozenset(rule.targetAddresses))
+
+
+@dataclass()
+class RoutingPlan:
+	"""
+	Routing rules can't be updated, only deleted and recreated.
+	`steps` orders each delete right before the create replacing it (same match key),
+	keeping the window without routing for that address short.
+	"""
+
+	delete: list[RoutingRule] = field(default_factory=list)
+	create: list[RoutingRule] = field(default_factory=list)
+	steps: list[tuple[Literal["delete", "create"], RoutingRule]] = field(default_factory=list)
+	# calls saved per endpoint compared to comparing rules with ordered targets (and no de-duplication)
+	avoided_calls: dict[str, int] = field(default_factory=dict)
+
+
+def plan_routing(desired: Sequence[RoutingRule], existing: Sequence[RoutingRule], prune: Callable[[RoutingRule], bool]) -> RoutingPlan:
+	naive = reconcile(desired, existing, key=RoutingRule.identity, prune=prune)
+	sets = reconcile(desired, existing, key=normalized, prune=prune)
+
+	# The same rule listed twice (targets order aside) is only created once.
+	create: list[RoutingRule] = []
+	seen: set[NormalizedRule] = set()
+	for rule in sets.create:
+		if normalized(rule) not in seen:
+			seen.add(normalized(rule))
+			create.append(rule)
+
+	replacements: dict[MatchKey, list[RoutingRule]] = {}
+	for rule in create:
+		replacements.setdefault(match_key(rule), []).append(rule)
+
+	plan = RoutingPlan(delete=sets.delete, create=create)
+	paired: set[int] = set()
+	for rule in sets.delete:
+		plan.steps.append(("delete", rule))
+		if replacements.get(match_key(rule)):
+			replacement = replacements[match_key(rule)].pop(0)
+			paired.add(id(replacement))
+			plan.steps.append(("create", replacement))
+	plan.steps += [("create", rule) for rule in create if id(rule) not in paired]
+
+	plan.avoided_calls = {
+		"deleteRoutingRule": len(naive.delete) - len(plan.delete),
+		"createRoutingRule": len(naive.create) - len(plan.create),
+	}
+	return plan
@@ -0,0 +1,86 @@
+import glob
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import OperationResult
+
+# Documented by the `bofzilla.purelymail.scope` doc fragment
+SCOPE_SPEC = dict(
+	scope=dict(
+		type="dict",
+		required=False,
+		options=dict(
+			domains=dict(type="list", elements="str", required=False),
+			patterns=dict(type="list", elements="str", required=False),
+			shard=dict(type="str", required=False),
+		),
+	),
+)
+
+
+def shard_of(name: str, count: int) -> int:
+	"""1-based shard `name` belongs to out of `count`, the same on every host and Python run (unlike `hash()`)."""
+	return 1 + int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big") % count
+
+
+@dataclass(frozen=True)
+class Scope:
+	"""
+	The slice of the account a module run owns: objects outside of it are neither fetched, diffed nor deleted.
+	Every selector set must match (`domains` by domain name, `patterns` globs by full name, `shard` by hash of the full name).
+	"""
+
+	domains: frozenset[str] | None = None
+	patterns: tuple[str, ...] = ()
+	shard: tuple[int, int] | None = None
+
+	@classmethod
+	def from_params(cls, params: dict[str, Any] | None) -> "Scope":
+		params = params or {}
+		shard = None
+		if params.get("shard") is not None:
+			index, sep, count = params["shard"].partition("/")
+			if not (sep and index.isdigit() and count.isdigit() and 1 <= int(index) <= int(count)):
+				raise ValueError(f"scope.shard must be 'i/N' with 1 <= i <= N, got {params['shard']!r}")
+			shard = (int(index), int(count))
+		return cls(
+			domains=None if params.get("domains") is None else frozenset(params["domains"]),
+			patterns=tuple(params.get("patterns") or ()),
+			shard=shard,
+		)
+
+	def contains(self, name: str) -> bool:
+		"""`name` is a user name (`user@domain`) or a domain name."""
+		if self.domains is not None and name.rsplit("@", 1)[-1] not in self.domains:
+			return False
+		if self.patterns and not any(fnmatchcase(name, pattern) for pattern in self.patterns):
+			return False
+		return self.shard is None or shard_of(name, self.shard[1]) == self.shard[0]
+
+
+def build_scope(module: AnsibleModule) -> Scope:
+	"""`Scope` from the module's `SCOPE_SPEC` params."""
+	try:
+		return Scope.from_params(module.params["scope"])
+	except ValueError as err:
+		module.fail_json(msg=str(err))
+		raise  # pragma: no cover
+
+
+def retry_scope(results: Iterable[OperationResult]) -> dict[str, list[str]]:
+	"""
+	`scope` param of a rerun limited to the objects of the operations not applied (failed or skipped).
+	Patterns are escaped full names, a renamed user's previous name included (the rename needs it in scope).
+	"""
+	names = set()
+	for r in results:
+		if r.status in ("failed", "skipped"):
+			names.add(r.operation.key)
+			if r.operation.method == "modify_user":
+				names.add(r.operation.request.userName)
+	return {"patterns": sorted(glob.escape(name) for name in names)}
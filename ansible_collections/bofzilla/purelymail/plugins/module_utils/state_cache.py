@@ -0,0 +1,80 @@
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.local_store import LocalStore, account_key
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.pydantic import ADAPTERS
+
+T = TypeVar("T")
+
+
+def _section(data: dict[str, Any], kind: str, account: str) -> dict[str, dict[str, Any]]:
+	return data.setdefault("snapshots", {}).setdefault(kind, {}).setdefault(account, {})
+
+
+@dataclass()
+class StateSnapshots(Generic[T]):
+	"""
+	Per-object API responses (`kind` e.g. "getUser") kept in a `LocalStore` under `snapshots.<kind>.<account key>.<name>`,
+	with the wall-clock time they were fetched at. `get` only returns snapshots younger than `max_age` seconds.
+	Snapshots are stored as the response JSON and read back through the same validation as API responses.
+	"""
+
+	store: LocalStore
+	kind: str
+	account: str
+	response_type: type[T]
+	max_age: float
+	entries: dict[str, dict[str, Any]] = field(default_factory=dict, repr=False)
+	hits: int = 0
+	misses: int = 0
+	_changes: dict[str, dict[str, Any] | None] = field(default_factory=dict, init=False, repr=False)
+
+	@classmethod
+	def load(cls, path: str, kind: str, api_token: str, response_type: type[T], max_age: float) -> "StateSnapshots[T]":
+		store, account = LocalStore(path), account_key(api_token)
+		return cls(store, kind, account, response_type, max_age, dict(_section(store.read(), kind, account)))
+
+	def fresh(self, name: str, now: float | None = None) -> bool:
+		entry = self.entries.get(name)
+		return entry is not None and (now if now is not None else time.time()) - entry["at"] <= self.max_age
+
+	def get(self, name: str, now: float | None = None) -> T | None:
+		"""The snapshot of `name` if fresh, counted as a hit or a miss."""
+		if not self.fresh(name, now):
+			self.misses += 1
+			return None
+		self.hits += 1
+		return ADAPTERS.get(self.response_type).validate_json(self.entries[name]["state"])
+
+	def remember(self, name: str, state: T, at: float) -> None:
+		self._changes[name] = self.entries[name] = {"at": at, "state": ADAPTERS.get(self.response_type).dump_json(state).decode()}
+
+	def invalidate(self, name: str) -> None:
+		self.entries.pop(name, None)
+		self._changes[name] = None
+
+	def prune(self, gone: Callable[[str], bool]) -> None:
+		"""Invalidates the snapshots of every object `gone` says no longer exists."""
+		for name in [n for n in self.entries if gone(n)]:
+			self.invalidate(name)
+
+	def hit_rate(self) -> float | None:
+		return None if not self.hits + self.misses else round(self.hits / (self.hits + self.misses), 4)
+
+	def save(self) -> None:
+		"""Merges this run's changes into the store, snapshots other runs (e.g. other scopes) wrote meanwhile are kept."""
+		if not self._changes:
+			return
+
+		def change(data: dict[str, Any]) -> None:
+			section = _section(data, self.kind, self.account)
+			for name, entry in self._changes.items():
+				if entry is None:
+					section.pop(name, None)
+				else:
+					section[name] = entry
+
+		self.store.update(change)
+		self._changes.clear()
@@ -0,0 +1,347 @@
+import copy
+import json
+import secrets
+import threading
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.billing_client import BillingClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.domain_client import DomainClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.retry import RetryPolicy
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.routing_client import RoutingClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import ApiDomainInfo, RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import GetUserResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.user_client import UserClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import ApplyInterrupted, Operation, apply_operations
+
+# State of users seeded without one (e.g. users about to be deleted that were never fetched).
+_PLACEHOLDER_USER = GetUserResponse(
+	enableSearchIndexing=True,
+	recoveryEnabled=True,
+	requireTwoFactorAuthentication=False,
+	enableSpamFiltering=True,
+	resetMethods=[],
+)
+
+
+class TwinError(Exception):
+	"""Error the twin answers with, sent back as the API's `{"type": "error"}` envelope."""
+
+	def __init__(self, code: str, message: str):
+		super().__init__(message)
+		self.code = code
+		self.message = message
+
+
+class PlanRejected(Exception):
+	"""Replaying the planned operations on the twin failed: applying them for real would fail the same way."""
+
+
+@dataclass()
+class AccountClient(UserClient, DomainClient, RoutingClient, BillingClient):
+	"""Every endpoint on a single client, lets `Operation`s of any module run against the same API."""
+
+
+@dataclass()
+class TwinResponse:
+	"""The part of `requests.Response` `PurelymailAPI` reads."""
+
+	status_code: int
+	content: bytes
+	headers: dict[str, str] = field(default_factory=dict)
+
+	def raise_for_status(self) -> None:
+		if self.status_code >= 400:  # pragma: no cover
+			raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+
+class TwinSession(requests.Session):
+	"""`requests.Session` answering every POST from a twin instead of the network."""
+
+	def __init__(self, twin: "PurelymailTwin"):
+		super().__init__()
+		self.twin = twin
+
+	def post(self, url, data=None, json=None, **_) -> TwinResponse:  # ty:ignore[invalid-method-override]
+		return self.twin.respond(url, json)
+
+
+@dataclass()
+class PurelymailTwin:
+	"""
+	In-memory model of a Purelymail account implementing the 19 endpoints of the API spec, on wire (JSON) payloads.
+	- Objects keep the order the API lists them in: creations are appended, renames and updates stay in place.
+	- Creating a user or domain that exists is an error, so is touching a user, domain or rule that doesn't. Rules have no uniqueness constraint.
+	- With `enforce_domains=False` users and rules may reference domains the twin doesn't know, for a twin seeded with a single kind of object.
+	- `addDomain` skips the DNS checks, every added domain passes them.
+	Calls are serialized on a lock: the twin can back the worker pools of `apply_operations`.
+	"""
+
+	users: dict[str, dict[str, Any]] = field(default_factory=dict)
+	domains: dict[str, dict[str, Any]] = field(default_factory=dict)
+	rules: dict[int, dict[str, Any]] = field(default_factory=dict)
+	app_passwords: dict[str, dict[str, str]] = field(default_factory=dict)
+	credit: str = "0"
+	ownership_code: str = "twin"
+	enforce_domains: bool = True
+	calls: list[str] = field(default_factory=list, repr=False)
+	_next_rule_id: int = field(default=1, init=False, repr=False)
+	_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+	@classmethod
+	def seeded(
+		cls,
+		*,
+		users: Mapping[str, GetUserResponse | None] | None = None,
+		domains: Iterable[ApiDomainInfo] = (),
+		rules: Iterable[RoutingRule] = (),
+		enforce_domains: bool = True,
+	) -> "PurelymailTwin":
+		"""A twin holding typed API responses, users without a known state get a placeholder one."""
+		twin = cls(enforce_domains=enforce_domains)
+		for name, state in (users or {}).items():
+			twin.users[name] = (state or _PLACEHOLDER_USER).as_api_response()
+		for domain in domains:
+			twin.domains[domain.name] = domain.as_api_response()
+		for rule in rules:
+			twin.rules[rule.id] = rule.as_api_response()
+		twin._next_rule_id = max(twin.rules, default=0) + 1
+		return twin
+
+	def api(self) -> PurelymailAPI:
+		"""A `PurelymailAPI` backed by the twin, without retries: its answers don't change when asked again."""
+		return PurelymailAPI("twin", session=TwinSession(self), retry=RetryPolicy(max_retries=0))
+
+	def client(self) -> AccountClient:
+		return AccountClient(self.api())
+
+	def replay(self, operations: Sequence[Operation]) -> AccountClient:
+		"""
+		Applies `operations` in order, returns a client to read the resulting state with.
+		Raises `PlanRejected` on the first operation the twin refuses, the following ones aren't applied.
+		"""
+		client = self.client()
+		try:
+			apply_operations(client, operations)
+		except ApplyInterrupted as err:
+			failed = next(r for r in err.results if r.status == "failed")
+			target = failed.operation.label or failed.operation.key
+			raise PlanRejected(f"Planned {failed.operation.method} of {target} would fail: {err.cause}") from err.cause
+		return client
+
+	def respond(self, url: str, body: dict[str, Any] | None) -> TwinResponse:
+		"""The API's answer to a POST of `body` on `url`, the endpoint is the last component of its path."""
+		endpoint = url.rstrip("/").rsplit("/", 1)[-1]
+		try:
+			envelope = {"type": "success", "result": self.handle(endpoint, body or {})}
+		except TwinError as err:
+			envelope = {"type": "error", "code": err.code, "message": err.message}
+		return TwinResponse(200, json.dumps(envelope).encode(), {"Content-Type": "application/json"})
+
+	def handle(self, endpoint: str, payload: dict[str, Any]) -> dict[str, Any]:
+		handler = _ENDPOINTS.get(endpoint)
+		if handler is None:
+			raise TwinError("unknownEndpoint", f"No such endpoint: {endpoint}")
+		with self._lock:
+			self.calls.append(endpoint)
+			try:
+				# a copy: callers never share the twin's state
+				return copy.deepcopy(handler(self, payload))
+			except KeyError as err:
+				raise TwinError("invalidRequest", f"{endpoint}: missing field {err}") from err
+
+	## Helpers
+	def _user(self, name: str) -> dict[str, Any]:
+		if name not in self.users:
+			raise TwinError("userNotFound", f"User {name} does not exist")
+		return self.users[name]
+
+	def _domain(self, name: str, *, owned: bool = True) -> dict[str, Any]:
+		domain = self.domains.get(name)
+		if domain is None:
+			raise TwinError("domainNotFound", f"Domain {name} does not exist")
+		if owned and domain["isShared"]:
+			raise TwinError("domainNotOwned", f"Domain {name} is shared, it can't be modified")
+		return domain
+
+	def _check_domain(self, name: str) -> None:
+		if self.enforce_domains:
+			_ = self._domain(name, owned=False)
+
+	def _reset_method(self, user: dict[str, Any], target: str) -> int:
+		index = next((idx for idx, m in enumerate(user["resetMethods"]) if m["target"] == target), None)
+		if index is None:
+			raise TwinError("resetMethodNotFound", f"No password reset method targets {target}")
+		return index
+
+	## Users
+	def _create_user(self, p: dict[str, Any]) -> dict[str, Any]:
+		name = f"{p['userName']}@{p['domainName']}"
+		self._check_domain(p["domainName"])
+		if name in self.users:
+			raise TwinError("userExists", f"User {name} already exists")
+		methods = [
+			{"type": kind, "target": p[f"recovery{kind.title()}"], "description": p.get(f"recovery{kind.title()}Description", ""), "allowMfaReset": True}
+			for kind in ("email", "phone")
+			if p.get(f"recovery{kind.title()}")
+		]
+		self.users[name] = {
+			"enableSearchIndexing": p.get("enableSearchIndexing", True),
+			"recoveryEnabled": p.get("enablePasswordReset", True),
+			"requireTwoFactorAuthentication": False,
+			"enableSpamFiltering": True,
+			"resetMethods": methods,
+		}
+		return {}
+
+	def _delete_user(self, p: dict[str, Any]) -> dict[str, Any]:
+		_ = self._user(p["userName"])
+		del self.users[p["userName"]]
+		self.app_passwords.pop(p["userName"], None)
+		return {}
+
+	def _list_users(self, _: dict[str, Any]) -> dict[str, Any]:
+		return {"users": list(self.users)}
+
+	def _modify_user(self, p: dict[str, Any]) -> dict[str, Any]:
+		name, new_name = p["userName"], p.get("newUserName")
+		user = self._user(name)
+		renamed = new_name is not None and new_name != name
+		if renamed and new_name in self.users:
+			raise TwinError("userExists", f"User {new_name} already exists")
+		if renamed:
+			self._check_domain(new_name.rsplit("@", 1)[-1])
+		for setting, field_name in (
+			("enableSearchIndexing", "enableSearchIndexing"),
+			("enablePasswordReset", "recoveryEnabled"),
+			("requireTwoFactorAuthentication", "requireTwoFactorAuthentication"),
+		):
+			if p.get(setting) is not None:
+				user[field_name] = p[setting]
+		if renamed:
+			# in place: listUser keeps its order
+			self.users = {new_name if n == name else n: u for n, u in self.users.items()}
+			if name in self.app_passwords:
+				self.app_passwords[new_name] = self.app_passwords.pop(name)
+		return {}
+
+	def _get_user(self, p: dict[str, Any]) -> dict[str, Any]:
+		return self._user(p["userName"])
+
+	def _upsert_password_reset(self, p: dict[str, Any]) -> dict[str, Any]:
+		user = self._user(p["userName"])
+		method = {"type": p["type"], "target": p["target"], "description": p.get("description", ""), "allowMfaReset": p.get("allowMfaReset", True)}
+		existing_target = p.get("existingTarget")
+		if existing_target is not None:
+			user["resetMethods"][self._reset_method(user, existing_target)] = method
+		else:
+			user["resetMethods"].append(method)
+		return {}
+
+	def _delete_password_reset(self, p: dict[str, Any]) -> dict[str, Any]:
+		user = self._user(p["userName"])
+		if p.get("target") is None:
+			user["resetMethods"] = []
+		else:
+			del user["resetMethods"][self._reset_method(user, p["target"])]
+		return {}
+
+	def _list_password_reset(self, p: dict[str, Any]) -> dict[str, Any]:
+		return {"users": self._user(p["userName"])["resetMethods"]}
+
+	def _create_app_password(self, p: dict[str, Any]) -> dict[str, Any]:
+		_ = self._user(p["userHandle"])
+		password = secrets.token_urlsafe(12)
+		self.app_passwords.setdefault(p["userHandle"], {})[password] = p.get("name", "")
+		return {"appPassword": password}
+
+	def _delete_app_password(self, p: dict[str, Any]) -> dict[str, Any]:
+		_ = self._user(p["userName"])
+		if p["appPassword"] not in self.app_passwords.get(p["userName"], {}):
+			raise TwinError("appPasswordNotFound", f"No such app password for {p['userName']}")
+		del self.app_passwords[p["userName"]][p["appPassword"]]
+		return {}
+
+	## Routing
+	def _create_routing_rule(self, p: dict[str, Any]) -> dict[str, Any]:
+		self._check_domain(p["domainName"])
+		rule_id, self._next_rule_id = self._next_rule_id, self._next_rule_id + 1
+		self.rules[rule_id] = {
+			"prefix": p["prefix"],
+			"catchall": p["catchall"],
+			"domainName": p["domainName"],
+			"matchUser": p["matchUser"],
+			"targetAddresses": list(p["targetAddresses"]),
+			"id": rule_id,
+		}
+		return {}
+
+	def _delete_routing_rule(self, p: dict[str, Any]) -> dict[str, Any]:
+		if self.rules.pop(p["routingRuleId"], None) is None:
+			raise TwinError("routingRuleNotFound", f"Routing rule {p['routingRuleId']} does not exist")
+		return {}
+
+	def _list_routing_rules(self, _: dict[str, Any]) -> dict[str, Any]:
+		return {"rules": list(self.rules.values())}
+
+	## Domains
+	def _add_domain(self, p: dict[str, Any]) -> dict[str, Any]:
+		if p["domainName"] in self.domains:
+			raise TwinError("domainExists", f"Domain {p['domainName']} already exists")
+		self.domains[p["domainName"]] = ApiDomainInfo.DEFAULT(p["domainName"]).as_api_response()
+		return {}
+
+	def _get_ownership_code(self, _: dict[str, Any]) -> dict[str, Any]:
+		return {"code": f"purelymail_ownership_proof={self.ownership_code}"}
+
+	def _list_domains(self, p: dict[str, Any]) -> dict[str, Any]:
+		domains = [d for d in self.domains.values() if p.get("includeShared", False) or not d["isShared"]]
+		return {"domains": domains}
+
+	def _update_domain_settings(self, p: dict[str, Any]) -> dict[str, Any]:
+		domain = self._domain(p["name"])
+		for setting in ("allowAccountReset", "symbolicSubaddressing"):
+			if p.get(setting) is not None:
+				domain[setting] = p[setting]
+		return {}
+
+	def _delete_domain(self, p: dict[str, Any]) -> dict[str, Any]:
+		_ = self._domain(p["name"])
+		del self.domains[p["name"]]
+		# "and all dependent settings and users"
+		for name in [n for n in self.users if n.rsplit("@", 1)[-1] == p["name"]]:
+			del self.users[name]
+			self.app_passwords.pop(name, None)
+		self.rules = {rule_id: r for rule_id, r in self.rules.items() if r["domainName"] != p["name"]}
+		return {}
+
+	## Billing
+	def _check_account_credit(self, _: dict[str, Any]) -> dict[str, Any]:
+		return {"credit": self.credit}
+
+
+_ENDPOINTS: dict[str, Callable[[PurelymailTwin, dict[str, Any]], dict[str, Any]]] = {
+	"createUser": PurelymailTwin._create_user,
+	"deleteUser": PurelymailTwin._delete_user,
+	"listUser": PurelymailTwin._list_users,
+	"modifyUser": PurelymailTwin._modify_user,
+	"getUser": PurelymailTwin._get_user,
+	"upsertPasswordReset": PurelymailTwin._upsert_password_reset,
+	"deletePasswordReset": PurelymailTwin._delete_password_reset,
+	"listPasswordReset": PurelymailTwin._list_password_reset,
+	"createRoutingRule": PurelymailTwin._create_routing_rule,
+	"deleteRoutingRule": PurelymailTwin._delete_routing_rule,
+	"listRoutingRules": PurelymailTwin._list_routing_rules,
+	"addDomain": PurelymailTwin._add_domain,
+	"getOwnershipCode": PurelymailTwin._get_ownership_code,
+	"listDomains": PurelymailTwin._list_domains,
+	"updateDomainSettings": PurelymailTwin._update_domain_settings,
+	"deleteDomain": PurelymailTwin._delete_domain,
+	"createAppPassword": PurelymailTwin._create_app_password,
+	"deleteAppPassword": PurelymailTwin._delete_app_password,
+	"checkAccountCredit": PurelymailTwin._check_account_credit,
+}
@@ -114,6 +114,8 @@ def main():
 		import traceback
 
 		module.fail_json(msg=f"{type(err).__name__}: {err}", exception=traceback.format_exc())
+	finally:
+		api.close()
 
 
 if __name__ == "__main__":
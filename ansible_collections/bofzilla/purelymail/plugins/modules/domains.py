@@ -2,7 +2,9 @@ from typing import Any
 
 from ansible.module_utils.basic import AnsibleModule
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.api_options import API_OPTIONS_SPEC, build_api
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.call_estimate import CallEstimate, check_call_budget
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import DeadlineExceeded
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.domain_client import DomainClient
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import ApiDomainInfo
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import (
@@ -12,6 +14,13 @@ from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.
 	UpdateDomainSettingsRequest,
 )
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import EmptyResponse, ListDomainsResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.execution_plan import PLAN_SPEC, ExecutionPlan, PlanFileError, plan_paths
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.journal import JOURNAL_SPEC, OperationJournal
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import ApplyInterrupted, Operation, apply_operations, plan_operations, touched_keys
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.reconcile import reconcile
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.scope import SCOPE_SPEC, build_scope, retry_scope
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PlanRejected, PurelymailTwin
 
 DOCUMENTATION = r"""
 module: domains
@@ -19,6 +28,7 @@ short_description: Manage domains for a Purelymail account
 description:
   - This module allows you to define the desired state of all domains for a Purelymail account.
   - By default, this module is `canonical`, meaning it removes any domains that are not explicitly defined
+  - O(scope) restricts all of the above to a slice of the account.
 
 options:
   api_token:
@@ -32,6 +42,16 @@ options:
     required: false
     default: true
 
+  refresh_after_apply:
+    description:
+      - Once the plan is applied, lists the domains again instead of returning the predicted RV(domains).
+      - C(listDomains) being the only read, both V(touched) and V(all) make one call; V(touched) skips it when nothing was written.
+      - RV(diff) is left as planned. Ignored in check mode. When the refresh fails, a warning is emitted and the predicted domains are returned.
+    type: str
+    required: false
+    default: none
+    choices: [none, touched, all]
+
   domains:
     description: List of domains to apply
     type: list
@@ -56,6 +76,12 @@ options:
         type: bool
         default: false
 
+extends_documentation_fragment:
+  - bofzilla.purelymail.api_options
+  - bofzilla.purelymail.scope
+  - bofzilla.purelymail.execution_plan
+  - bofzilla.purelymail.journal
+
 attributes:
   check_mode:
     support: full
@@ -139,14 +165,127 @@ domains:
         passesDmarc:
           description: Whether the DMARC record check passes
           type: bool
+stats:
+  description: API call counters for this run.
+  returned: success
+  type: dict
+  contains:
+    retries:
+      description: Number of retries per endpoint, endpoints never retried are omitted.
+      type: dict
+      sample: {"listDomains": 2}
+    api_calls:
+      description:
+        - API calls per endpoint, V(read) the ones made before applying (retries included), V(write) the planned changes (the ones left when resuming O(journal)).
+        - V(estimated_write_seconds) estimates how long the writes take, from the latency observed so far and O(apply_concurrency). See O(max_api_calls).
+      type: dict
+      sample: {"read": {"listDomains": 1}, "write": {"addDomain": 1}, "total": 2, "estimated_write_seconds": 2.1}
+    out_of_scope:
+      description: Entries ignored because they are outside O(scope), V(desired) ones from O(domains) and V(existing) ones on the account.
+      type: dict
+      sample: {"desired": 0, "existing": 12}
+operations:
+  description: The planned changes in the order they were planned, with their outcome.
+  returned: success, or failure once changes started being applied
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+    status:
+      description: V(planned) in check mode, V(skipped) when an earlier failure stopped the run, V(resumed) when an interrupted run applied it (O(journal)).
+      type: str
+      choices: [planned, ok, resumed, failed, skipped]
+    duration:
+      description: Seconds the call took (retries included), V(null) when it didn't run.
+      type: float
+completed:
+  description: On failure once changes started being applied, the planned operations that were applied.
+  returned: failure
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+pending:
+  description: On failure once changes started being applied, the planned operations not applied (the failed ones included).
+  returned: failure
+  type: list
+  elements: dict
+  sample: [{"method": "delete_user", "target": "bob@example.com"}]
+failed:
+  description: On failure once changes started being applied, the operations that failed and why, in plan order.
+  returned: failure
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+    error:
+      description: Why it failed.
+      type: str
+retry_scope:
+  description: On failure once changes started being applied, an O(scope) limiting a rerun of the task to the domains of the operations not applied.
+  returned: failure
+  type: dict
+  sample: {"patterns": ["example.com"]}
 """
 
 
+def _plan(module: AnsibleModule, existing_domains: ListDomainsResponse, domains: list[UpdateDomainSettingsRequest]) -> tuple[list[Operation], dict[str, Any]]:
+	"""The operations reconciling `existing_domains` with `domains`, and the returned state (diff included)."""
+	plan = reconcile(
+		domains,
+		existing_domains.domains,
+		key=lambda d: d.name,
+		differs=lambda d, ed: d.updates(ed),
+		prune=module.params["canonical"],
+	)
+	extra_domains = [ed.name for ed in plan.delete]
+	domain_updates = [d for d, _ in plan.update]
+	missing_domains = plan.create
+
+	operations = [
+		*(Operation("delete_domain", name, DeleteDomainRequest(name)) for name in extra_domains),
+		*(Operation("update_domain_settings", domain.name, domain) for domain in domain_updates),
+	]
+	for domain in missing_domains:
+		operations.append(Operation("add_domain", domain.name, AddDomainRequest(domain.name)))
+		if domain.updates(ApiDomainInfo.DEFAULT(domain.name), ignore_recheck_dns=True):  # we just created it
+			operations.append(Operation("update_domain_settings", domain.name, domain))
+
+	# what listDomains returns once the plan is applied
+	supposed_after = PurelymailTwin.seeded(domains=existing_domains.domains).replay(operations).list_domains(ListDomainsRequest(False))
+
+	result = {
+		"domains": supposed_after.as_display(),
+		"diff": {"before": existing_domains.as_display(), "after": supposed_after.as_display()},
+	}
+	return operations, result
+
+
 def main():
 	module = AnsibleModule(
 		argument_spec=dict(
 			api_token=dict(type="str", required=True, no_log=True),
+			**API_OPTIONS_SPEC,
+			**SCOPE_SPEC,
+			**PLAN_SPEC,
+			**JOURNAL_SPEC,
 			canonical=dict(type="bool", required=False, default=True),
+			refresh_after_apply=dict(type="str", required=False, default="none", choices=["none", "touched", "all"]),
 			domains=dict(
 				type="list",
 				required=True,
@@ -162,51 +301,86 @@ def main():
 		supports_check_mode=True,
 	)
 
-	api = PurelymailAPI(module.params["api_token"])
+	scope = build_scope(module)
+	plan_out, plan_in = plan_paths(module)
+	journal_path: str | None = None if module.check_mode else module.params["journal"]
+	api = build_api(module)
 	client = DomainClient(api)
 
 	try:
-		existing_domains = client.list_domains(ListDomainsRequest(False))
-		domains = [UpdateDomainSettingsRequest(**d) for d in module.params["domains"]]
-
-		extra_domains = [ed.name for ed in existing_domains.domains if not any(d.name == ed.name for d in domains) and module.params["canonical"]]
-		domain_updates = [d for d in domains if any(d.name == ed.name and d.updates(ed) for ed in existing_domains.domains)]
-		missing_domains = [d for d in domains if not any(d.name == ed.name for ed in existing_domains.domains)]
-
-		supposed_after = (
-			existing_domains.filter(lambda r: r.name not in extra_domains).apply_updates(domain_updates).concat([d.update(ApiDomainInfo.DEFAULT(d.name)) for d in missing_domains])
+		api.warm_up(
+			(ListDomainsRequest, ListDomainsResponse),
+			(AddDomainRequest, EmptyResponse),
+			(UpdateDomainSettingsRequest, EmptyResponse),
+			(DeleteDomainRequest, EmptyResponse),
 		)
+		journal = OperationJournal.resume(journal_path, "domains", module.params) if journal_path else None
+		if journal is not None:
+			# an earlier run of this task was interrupted: resume its plan, nothing is listed
+			operations, result = journal.operations, dict(journal.result)
+			completed = journal.settle(client)
+			out_of_scope = {"desired": 0, "existing": 0}
+		else:
+			listed = client.list_domains(ListDomainsRequest(False))
+			existing_domains = listed.filter(lambda d: scope.contains(d.name))
+			requested = [UpdateDomainSettingsRequest(**d) for d in module.params["domains"]]
+			domains = [d for d in requested if scope.contains(d.name)]
+			out_of_scope = {"desired": len(requested) - len(domains), "existing": len(listed.domains) - len(existing_domains.domains)}
 
-		result: dict[str, Any] = {
-			"changed": bool(extra_domains) or bool(domain_updates) or bool(missing_domains),
-			"domains": supposed_after.as_display(),
-		}
-
-		if module._diff:
-			result["diff"] = {
-				"before": existing_domains.as_display(),
-				"after": supposed_after.as_display(),
-			}
-
-		if not module.check_mode:
-			for name in extra_domains:
-				_ = client.delete_domain(DeleteDomainRequest(name))
+			if plan_in:
+				saved = ExecutionPlan.load(plan_in, "domains", module.params["api_token"], existing_domains.as_api_response())
+				operations, result = saved.operations, dict(saved.result)
+			else:
+				operations, result = _plan(module, existing_domains, domains)
+			result["changed"] = bool(operations)
+			completed: set[int] = set()
 
-			for domain in domain_updates:
-				_ = client.update_domain_settings(domain)
+		estimate = CallEstimate.build(api.stats, operations, completed, module.params["apply_concurrency"])
+		check_call_budget(module, estimate)
+		if plan_out:
+			ExecutionPlan.build("domains", module.params["api_token"], existing_domains.as_api_response(), operations, result).save(plan_out)
+		if journal is None and journal_path and operations:
+			journal = OperationJournal.start(journal_path, "domains", module.params, operations, result)
+		if not module._diff:
+			del result["diff"]
 
-			for domain in missing_domains:
-				_ = client.add_domain(AddDomainRequest(domain.name))
-				if domain.updates(ApiDomainInfo.DEFAULT(domain.name), ignore_recheck_dns=True):  # we just created it
-					_ = client.update_domain_settings(domain)
+		if module.check_mode:
+			results = plan_operations(operations)
+		else:
+			results = apply_operations(
+				client,
+				operations,
+				module.params["apply_concurrency"],
+				completed=completed,
+				record=None if journal is None else journal.record,
+				on_error=module.params["on_error"],
+			)
+			# operations an interrupted run applied are finalized by this one
+			result["changed"] = bool(touched_keys(results))
+			if journal is not None:
+				journal.close()
+			refresh: str = module.params["refresh_after_apply"]
+			if refresh == "all" or (refresh == "touched" and touched_keys(results)):
+				try:
+					result["domains"] = client.list_domains(ListDomainsRequest(False)).filter(lambda d: scope.contains(d.name)).as_display()
+				except (ApiError, DeadlineExceeded) as err:
+					module.warn(f"Could not refresh the domains after apply: {err}, the predicted domains are returned")
+		result["operations"] = [r.as_display() for r in results]
 
+		result["stats"] = api.stats.as_dict() | {"out_of_scope": out_of_scope, "api_calls": estimate.as_dict()}
 		module.exit_json(**result)
+	except ApplyInterrupted as err:
+		module.fail_json(msg=err.msg, **err.as_result(), retry_scope=retry_scope(err.results))
+	except (DeadlineExceeded, PlanRejected, PlanFileError) as err:
+		module.fail_json(msg=f"{err}, no change was made")
 	except ApiError as err:  # pragma: no cover
 		module.fail_json(msg=f"Purelymail API error: {err}", exception=err)
 	except Exception as err:  # pragma: no cover
 		import traceback
 
 		module.fail_json(msg=f"{type(err).__name__}: {err}", exception=traceback.format_exc())
+	finally:
+		api.close()
 
 
 if __name__ == "__main__":
@@ -2,10 +2,20 @@ from typing import Any
 
 from ansible.module_utils.basic import AnsibleModule
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.api_options import API_OPTIONS_SPEC, build_api
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.call_estimate import CallEstimate, check_call_budget
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import DeadlineExceeded
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.routing_client import RoutingClient
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import CreateRoutingRequest, DeleteRoutingRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import CreateRoutingRequest, DeleteRoutingRequest, EmptyRequest
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import EmptyResponse, ListRoutingResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.execution_plan import PLAN_SPEC, ExecutionPlan, PlanFileError, plan_paths
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.journal import JOURNAL_SPEC, OperationJournal
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import ApplyInterrupted, Operation, apply_operations, plan_operations, touched_keys
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.routing_index import EXCLUSIVE_PRESETS, RoutingRuleIndex
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.routing_plan import plan_routing
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PlanRejected, PurelymailTwin
 
 DOCUMENTATION = r"""
 module: routing_rules
@@ -38,6 +48,15 @@ options:
     required: false
     elements: str
     default: list of all referenced domains in C(rules) + already present on API
+  refresh_after_apply:
+    description:
+      - Once the plan is applied, lists the rules again instead of returning the predicted RV(rules) (e.g. to get the ids of the created rules).
+      - C(listRoutingRules) being the only read, both V(touched) and V(all) make one call; V(touched) skips it when nothing was written.
+      - RV(diff) is left as planned. Ignored in check mode. When the refresh fails, a warning is emitted and the predicted rules are returned.
+    type: str
+    required: false
+    default: none
+    choices: [none, touched, all]
   inferred_safety:
     description:
       - If true, enables best-effort consistency checks inferred from observed Purelymail API behavior.
@@ -99,6 +118,11 @@ options:
         type: bool
         required: false
 
+extends_documentation_fragment:
+  - bofzilla.purelymail.api_options
+  - bofzilla.purelymail.execution_plan
+  - bofzilla.purelymail.journal
+
 attributes:
   check_mode:
     support: full
@@ -179,13 +203,90 @@ rules:
         - V(exact_match) → C(prefix=False, catchall=False)
       type: str
       choices: [any_address, catchall_except_valid, prefix_match, exact_match]
+stats:
+  description: API call counters for this run.
+  returned: success
+  type: dict
+  contains:
+    avoided_calls:
+      description:
+        - Calls saved per endpoint compared to matching rules with ordered targets.
+        - Rules differing only by the order of their targets are left untouched, rules listed twice are created once.
+      type: dict
+      sample: {"createRoutingRule": 3, "deleteRoutingRule": 3}
+    retries:
+      description: Number of retries per endpoint, endpoints never retried are omitted.
+      type: dict
+      sample: {"listRoutingRules": 2}
+    api_calls:
+      description:
+        - API calls per endpoint, V(read) the ones made before applying (retries included), V(write) the planned changes (the ones left when resuming O(journal)).
+        - V(estimated_write_seconds) estimates how long the writes take, from the latency observed so far and O(apply_concurrency). See O(max_api_calls).
+      type: dict
+      sample: {"read": {"listRoutingRules": 1}, "write": {"createRoutingRule": 2}, "total": 3, "estimated_write_seconds": 2.1}
+operations:
+  description: The planned changes in the order they were planned, with their outcome.
+  returned: success, or failure once changes started being applied
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+    status:
+      description: V(planned) in check mode, V(skipped) when an earlier failure stopped the run, V(resumed) when an interrupted run applied it (O(journal)).
+      type: str
+      choices: [planned, ok, resumed, failed, skipped]
+    duration:
+      description: Seconds the call took (retries included), V(null) when it didn't run.
+      type: float
+completed:
+  description: On failure once changes started being applied, the planned operations that were applied.
+  returned: failure
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+pending:
+  description: On failure once changes started being applied, the planned operations not applied (the failed ones included).
+  returned: failure
+  type: list
+  elements: dict
+  sample: [{"method": "delete_user", "target": "bob@example.com"}]
+failed:
+  description: On failure once changes started being applied, the operations that failed and why, in plan order.
+  returned: failure
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+    error:
+      description: Why it failed.
+      type: str
 """
 
 module_spec = dict(
 	argument_spec=dict(
 		api_token=dict(type="str", required=True, no_log=True),
+		**API_OPTIONS_SPEC,
+		**PLAN_SPEC,
+		**JOURNAL_SPEC,
 		canonical=dict(type="list", elements="str", required=False),
 		inferred_safety=dict(type="bool", required=False, default=True),
+		refresh_after_apply=dict(type="str", required=False, default="none", choices=["none", "touched", "all"]),
 		rules=dict(
 			type="list",
 			required=True,
@@ -218,6 +319,57 @@ module_spec = dict(
 )
 
 
+def _rule_label(rule: RoutingRule) -> str:
+	return f"{rule.matchUser}{'*' if rule.prefix else ''}@{rule.domainName} -> {', '.join(rule.targetAddresses)}"
+
+
+def _plan(module: AnsibleModule, existing_rules: ListRoutingResponse) -> tuple[list[Operation], dict[str, Any]]:
+	"""The operations reconciling `existing_rules` with the `rules` param, and the returned state (diff included)."""
+	rules = [CreateRoutingRequest(**r) for r in module.params["rules"]]
+
+	canonical_param: None | list[str] = module.params.get("canonical")
+	canonical_domains = {r.domainName for r in rules + existing_rules.rules} if canonical_param is None else set(canonical_param)
+
+	if module.params["inferred_safety"]:
+		desired_index = RoutingRuleIndex(rules)
+		existing_index = RoutingRuleIndex(existing_rules.rules)
+		for idx, rule in enumerate(rules):
+			preset = desired_index.presets[idx]
+			# Rule 1: must match a known UI preset
+			if preset is None:
+				module.fail_json(msg=f"Rule nº{idx} doesn't match any existing preset.")
+
+			# Rule 2: certain presets must be unique (even between each others)
+			if preset in EXCLUSIVE_PRESETS:
+				conflict_in_rules = any(i != idx and rules[i].targetAddresses == rule.targetAddresses for i in desired_index.exclusive(rule.domainName))
+				conflict_in_existing = rule.domainName not in canonical_domains and bool(existing_index.exclusive(rule.domainName))
+
+				if conflict_in_rules or conflict_in_existing:
+					module.fail_json(msg=f"Rule #{idx}: only one `any_address` or `catchall_except_valid` rule is allowed per domain ({rule.domainName}).")
+
+			# Rule 3: C(match_user="", prefix=False, catchall=False) fails as it is a "The exact address" preset but empty `match_user` isn't valid.
+			if preset == "exact_match" and rule.matchUser == "":
+				module.fail_json(msg=f"Rule nº{idx} technically matches `exact_match` preset but empty 'match_user' isn't allowed.")
+
+	plan = plan_routing(rules, existing_rules.rules, prune=lambda er: er.domainName in canonical_domains)
+	operations = [
+		Operation("delete_routing_rule", rule.domainName, DeleteRoutingRequest(rule.id), label=_rule_label(rule))
+		if step == "delete"
+		else Operation("create_routing_rule", rule.domainName, rule, label=_rule_label(rule))
+		for step, rule in plan.steps
+	]
+
+	# what listRoutingRules returns once the plan is applied
+	supposed_after = PurelymailTwin.seeded(rules=existing_rules.rules, enforce_domains=False).replay(operations).list_routing_rules()
+
+	result = {
+		"rules": supposed_after.as_display(),
+		"diff": {"before": existing_rules.as_display(), "after": supposed_after.as_display()},
+		"stats": {"avoided_calls": plan.avoided_calls},
+	}
+	return operations, result
+
+
 def main():
 	module = AnsibleModule(**module_spec, supports_check_mode=True)
 
@@ -226,70 +378,74 @@ def main():
 		if rule.get("preset", None) is None and rule.get("match_user", None) is None and rule.get("prefix", None) is None and rule.get("catchall", None) is None:
 			module.fail_json(msg=f"rule[{idx}]: preset is None but any of the following are missing: match_user, prefix, catchall found in rules")
 
-	api = PurelymailAPI(module.params["api_token"])
+	plan_out, plan_in = plan_paths(module)
+	journal_path: str | None = None if module.check_mode else module.params["journal"]
+	api = build_api(module)
 	client = RoutingClient(api)
 
 	try:
-		existing_rules = client.list_routing_rules()
-		rules = [CreateRoutingRequest(**r) for r in module.params["rules"]]
-
-		canonical_domains: None | list[str] = module.params.get("canonical")
-		if canonical_domains is None:
-			canonical_domains = list[str]({r.domainName for r in rules + existing_rules.rules})
-
-		if module.params["inferred_safety"]:
-			for idx, rule in enumerate(rules):
-				# Rule 1: must match a known UI preset
-				if rule.preset is None:
-					module.fail_json(msg=f"Rule nº{idx} doesn't match any existing preset.")
-
-				# Rule 2: certain presets must be unique (even between each others)
-				if rule.preset in ("any_address", "catchall_except_valid"):
-					conflict_in_rules = any(
-						i != idx and r.preset in ("any_address", "catchall_except_valid") and r.domainName == rule.domainName and r.targetAddresses == rule.targetAddresses
-						for i, r in enumerate(rules)
-					)
-					conflict_in_existing = rule.domainName not in canonical_domains and any(
-						er.preset in ("any_address", "catchall_except_valid") and er.domainName == rule.domainName for er in existing_rules.rules
-					)
-
-					if conflict_in_rules or conflict_in_existing:
-						module.fail_json(msg=f"Rule #{idx}: only one `any_address` or `catchall_except_valid` rule is allowed per domain ({rule.domainName}).")
-
-				# Rule 3: C(match_user="", prefix=False, catchall=False) fails as it is a "The exact address" preset but empty `match_user` isn't valid.
-				if rule.preset == "exact_match" and rule.matchUser == "":
-					module.fail_json(msg=f"Rule nº{idx} technically matches `exact_match` preset but empty 'match_user' isn't allowed.")
-
-		extra_rules = [er.id for er in existing_rules.rules if not any(r.eq(er) for r in rules) and er.domainName in canonical_domains]
-		missing_rules = [r for r in rules if not any(r.eq(er) for er in existing_rules.rules)]
-
-		supposed_after = existing_rules.concat(missing_rules).filter(lambda r: r.id not in extra_rules)
-
-		result: dict[str, Any] = {
-			"changed": bool(extra_rules) or bool(missing_rules),
-			"rules": supposed_after.as_display(),
-		}
-
-		if module._diff:
-			result["diff"] = {
-				"before": existing_rules.as_display(),
-				"after": supposed_after.as_display(),
-			}
-
-		if not module.check_mode:
-			for id in extra_rules:
-				_ = client.delete_routing_rule(DeleteRoutingRequest(id))
-
-			for rule in missing_rules:
-				_ = client.create_routing_rule(rule)
-
+		api.warm_up((EmptyRequest, ListRoutingResponse), (CreateRoutingRequest, EmptyResponse), (DeleteRoutingRequest, EmptyResponse))
+		journal = OperationJournal.resume(journal_path, "routing_rules", module.params) if journal_path else None
+		if journal is not None:
+			# an earlier run of this task was interrupted: resume its plan, nothing is listed
+			operations, result = journal.operations, dict(journal.result)
+			completed = journal.settle(client)
+		else:
+			existing_rules = client.list_routing_rules()
+			if plan_in:
+				saved = ExecutionPlan.load(plan_in, "routing_rules", module.params["api_token"], existing_rules.as_api_response())
+				operations, result = saved.operations, dict(saved.result)
+			else:
+				operations, result = _plan(module, existing_rules)
+			result["changed"] = bool(operations)
+			completed: set[int] = set()
+
+		estimate = CallEstimate.build(api.stats, operations, completed, module.params["apply_concurrency"])
+		check_call_budget(module, estimate)
+		if plan_out:
+			ExecutionPlan.build("routing_rules", module.params["api_token"], existing_rules.as_api_response(), operations, result).save(plan_out)
+		if journal is None and journal_path and operations:
+			journal = OperationJournal.start(journal_path, "routing_rules", module.params, operations, result)
+		if not module._diff:
+			del result["diff"]
+
+		if module.check_mode:
+			results = plan_operations(operations)
+		else:
+			results = apply_operations(
+				client,
+				operations,
+				module.params["apply_concurrency"],
+				completed=completed,
+				record=None if journal is None else journal.record,
+				on_error=module.params["on_error"],
+			)
+			# operations an interrupted run applied are finalized by this one
+			result["changed"] = bool(touched_keys(results))
+			if journal is not None:
+				journal.close()
+			refresh: str = module.params["refresh_after_apply"]
+			if refresh == "all" or (refresh == "touched" and touched_keys(results)):
+				try:
+					result["rules"] = client.list_routing_rules().as_display()
+				except (ApiError, DeadlineExceeded) as err:
+					module.warn(f"Could not refresh the rules after apply: {err}, the predicted rules are returned")
+		result["operations"] = [r.as_display() for r in results]
+
+		result["stats"] |= api.stats.as_dict() | {"api_calls": estimate.as_dict()}
 		module.exit_json(**result)
+	except ApplyInterrupted as err:
+		module.fail_json(msg=err.msg, **err.as_result())
+	except (DeadlineExceeded, PlanRejected, PlanFileError) as err:
+		module.fail_json(msg=f"{err}, no change was made")
 	except ApiError as err:  # pragma: no cover
 		module.fail_json(msg=f"Purelymail API error: {err}", exception=err)
 	except Exception as err:  # pragma: no cover
 		import traceback
 
 		module.fail_json(msg=f"{type(err).__name__}: {err}", exception=traceback.format_exc())
+	finally:
+		api.close()
 
 
 if __name__ == "__main__":
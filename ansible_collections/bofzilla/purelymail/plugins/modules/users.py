@@ -1,18 +1,32 @@
+import time
+from collections.abc import Callable
 from typing import Any
 
 from ansible.module_utils.basic import AnsibleModule
 
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.api_options import API_OPTIONS_SPEC, build_api
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.call_estimate import CallEstimate, check_call_budget
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import DeadlineExceeded
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.module_inputs import UserInput
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import (
 	DeletePasswordResetRequest,
 	DeleteUserRequest,
 	GetUserRequest,
+	ModifyUserRequest,
 	UpsertPasswordResetRequest,
 )
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import GetUserResponse
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.user_client import UserClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.concurrency import Prefetcher, fetch_all
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.execution_plan import PLAN_SPEC, ExecutionPlan, PlanFileError, plan_paths
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.journal import JOURNAL_SPEC, OperationJournal
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import ApplyInterrupted, Operation, OperationResult, apply_operations, plan_operations, touched_keys
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.password_store import PasswordFingerprints
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.reconcile import reconcile
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.scope import SCOPE_SPEC, build_scope, retry_scope
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.state_cache import StateSnapshots
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PlanRejected, PurelymailTwin
 
 DOCUMENTATION = r"""
 module: users
@@ -22,6 +36,9 @@ description:
   - Each user can be created, modified (settings + password), and have its
     password-reset methods (recovery email + phone) reconciled to the declared state.
   - By default, this module is `canonical`, meaning it removes any user not specified in C(users).
+  - O(scope) restricts all of the above to a slice of the account.
+  - A user listed with O(users[].previous_names) is renamed in place (one C(modifyUser), mailbox kept)
+    instead of being deleted and recreated.
   - Recovery methods are derived from O(users[].recovery_email) and O(users[].recovery_phone)
     (with their `_description` and `_allow_mfa_reset` companions). For existing users they
     are reconciled fully; non-empty target ensures the method exists exactly with the declared
@@ -42,7 +59,8 @@ options:
   password_mode:
     description:
       - Default password handling for all entries in C(users).
-      - V(update-if-provided) updates the password whenever O(users[].password) is given (always reports `changed`).
+      - V(update-if-provided) updates the password whenever O(users[].password) is given
+        (always reports `changed`, unless O(password_store) knows it's already the current password).
       - V(ignore-if-exists) only sets the password at user creation; for already-existing users the password field is ignored.
       - Each user entry can override this with O(users[].password_mode).
     type: str
@@ -50,6 +68,84 @@ options:
     default: update-if-provided
     choices: [update-if-provided, ignore-if-exists]
 
+  password_store:
+    description:
+      - Path of a local file recording a salted slow hash (scrypt) of the last password set by this module for each user,
+        keyed by account (a hash of O(api_token), never the token itself) and user name.
+      - With O(password_mode=update-if-provided), a password matching its recorded hash isn't sent again, making runs idempotent.
+      - Passwords changed outside the module aren't detected, remove the user's entry (or the file) to force an update.
+      - The file lives on the host running the module, concurrent runs sharing it are serialized with a lock on C(<path>.lock).
+      - Checking a password costs one scrypt hash (about 50ms), they are spread over O(fetch_concurrency) workers.
+      - Unset by default, nothing is recorded.
+    type: path
+    required: false
+
+  state_cache:
+    description:
+      - Path of a local file keeping, per account and user, the C(getUser) response of the last runs and when it was fetched.
+      - Only used with O(max_state_age). The file lives on the host running the module and may be shared with O(password_store).
+    type: path
+    required: false
+
+  max_state_age:
+    description:
+      - Trust user states from O(state_cache) fetched less than this many seconds ago instead of calling C(getUser) again.
+      - Users this module changed are dropped from the cache, as are users no longer listed by C(listUser),
+        so only changes made outside the module during that window go unnoticed.
+      - Requires O(state_cache). Unset means every user is fetched (the cache isn't read nor written).
+    type: float
+    required: false
+
+  diff_detail:
+    description:
+      - Fetch the full details (C(getUser)) of the users that O(canonical) mode is about to delete.
+      - They are only used for the C(before) side of the diff, so by default they are fetched only when running with C(--diff).
+    type: bool
+    required: false
+    default: false
+
+  fetch_concurrency:
+    description:
+      - Maximum number of C(getUser) calls in flight while reading the current state of the account.
+      - Results are independent of the completion order, and the first API error cancels every read not started yet.
+    type: int
+    required: false
+    default: 1
+
+  check_fidelity:
+    description:
+      - How thoroughly check mode (C(--check)) computes the changes, ignored outside check mode.
+      - V(full) reads every user (C(getUser)) and reports exactly the changes a real run would make.
+      - V(shallow) only calls C(listUser): it reports which users would be created, deleted or renamed,
+        but settings, passwords and recovery methods of existing users aren't compared,
+        they are listed under RV(unverified) and RV(users) only holds names.
+    type: str
+    required: false
+    default: full
+    choices: [full, shallow]
+
+  refresh_after_apply:
+    description:
+      - Once the plan is applied, reads the users again instead of returning the predicted RV(users).
+      - V(touched) only calls C(getUser) for the users the run wrote to (through O(fetch_concurrency) workers),
+        the other ones are returned as read before applying. V(all) lists and reads every user in O(scope) again.
+      - RV(diff) is left as planned. Ignored in check mode. When the refresh fails, a warning is emitted and the predicted users are returned.
+    type: str
+    required: false
+    default: none
+    choices: [none, touched, all]
+
+  speculative_prefetch:
+    description:
+      - Start the C(getUser) calls for every user listed in O(users) at the same time as C(listUser),
+        instead of waiting for C(listUser) to know which users exist.
+      - Calls made for users that turn out not to exist (to be created) are discarded, errors included,
+        and counted in RV(stats.wasted_calls). Users only known from C(listUser) (deleted or renamed ones) are fetched afterwards.
+      - Uses O(fetch_concurrency) workers, plus the C(listUser) call.
+    type: bool
+    required: false
+    default: false
+
   users:
     description: List of users to apply
     type: list
@@ -60,6 +156,18 @@ options:
         description: Full username (e.g. C(user@example.com))
         type: str
         required: true
+      previous_names:
+        description:
+          - Names this user may currently have on the account (e.g. C(old@example.com)), tried in order.
+          - When O(users[].name) doesn't exist but one of these does, that user is renamed to O(users[].name)
+            with its mailbox, settings and recovery methods, then reconciled like any existing user.
+          - A previous name can't be another entry's O(users[].name) nor be listed by two entries.
+          - A previous name belongs to the O(scope) of its entry: only the run whose O(scope) contains O(users[].name)
+            renames it, other runs neither fetch nor delete it whatever their own O(scope).
+        type: list
+        elements: str
+        required: false
+        default: []
       password:
         description:
           - Password for the user.
@@ -131,6 +239,12 @@ options:
         required: false
         default: false
 
+extends_documentation_fragment:
+  - bofzilla.purelymail.api_options
+  - bofzilla.purelymail.scope
+  - bofzilla.purelymail.execution_plan
+  - bofzilla.purelymail.journal
+
 attributes:
   check_mode:
     support: full
@@ -142,7 +256,8 @@ attributes:
     support: partial
     details:
       - When O(password_mode=update-if-provided) and a password is given for an existing user,
-        the module always reports a change for that user (the API gives no way to verify the password).
+        the module always reports a change for that user (the API gives no way to verify the password)
+        unless O(password_store) recorded that password as the last one set.
 
 author:
   - vic1707
@@ -200,13 +315,218 @@ users:
       description: List of password reset methods for this user.
       type: list
       elements: dict
+unverified:
+  description: With O(check_fidelity=shallow) in check mode, the users whose settings, password and recovery methods weren't compared.
+  returned: check mode with O(check_fidelity=shallow)
+  type: list
+  elements: str
+  sample: ["alice@example.com"]
+stats:
+  description: API call counters for this run.
+  returned: success
+  type: dict
+  contains:
+    avoided_calls:
+      description:
+        - Calls skipped altogether, per endpoint.
+        - V(getUser) for users about to be deleted, they aren't fetched unless diffing.
+        - V(deletePasswordReset) for recovery methods replaced in place by an upsert (same type, new target or settings).
+        - V(modifyUser) for users whose only change was a password O(password_store) knows is already set.
+      type: dict
+      sample: {"getUser": 12, "deletePasswordReset": 3, "modifyUser": 40}
+    wasted_calls:
+      description: Calls made but not needed, per endpoint (V(getUser) for O(speculative_prefetch) guesses of users that don't exist yet).
+      type: dict
+      sample: {"getUser": 2}
+    out_of_scope:
+      description: Entries ignored because they are outside O(scope), V(desired) ones from O(users) and V(existing) ones on the account.
+      type: dict
+      sample: {"desired": 3, "existing": 4012}
+    state_cache:
+      description: With O(max_state_age), users read from O(state_cache) (V(hits)) or fetched (V(misses)), V(hit_rate) is V(null) when no user was looked up.
+      type: dict
+      sample: {"hits": 950, "misses": 50, "hit_rate": 0.95}
+    unchanged_passwords:
+      description: Password updates skipped because O(password_store) recorded the same password, with or without other changes to the user.
+      type: int
+      sample: 42
+    retries:
+      description: Number of retries per endpoint, endpoints never retried are omitted.
+      type: dict
+      sample: {"getUser": 2}
+    api_calls:
+      description:
+        - API calls per endpoint, V(read) the ones made before applying (retries included), V(write) the planned changes (the ones left when resuming O(journal)).
+        - V(estimated_write_seconds) estimates how long the writes take, from the latency observed so far and O(apply_concurrency). See O(max_api_calls).
+      type: dict
+      sample: {"read": {"listUser": 1, "getUser": 40}, "write": {"createUser": 2, "modifyUser": 5}, "total": 48, "estimated_write_seconds": 2.1}
+operations:
+  description: The planned changes in the order they were planned, with their outcome.
+  returned: success, or failure once changes started being applied
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+    status:
+      description: V(planned) in check mode, V(skipped) when an earlier failure stopped the run, V(resumed) when an interrupted run applied it (O(journal)).
+      type: str
+      choices: [planned, ok, resumed, failed, skipped]
+    duration:
+      description: Seconds the call took (retries included), V(null) when it didn't run.
+      type: float
+completed:
+  description: On failure once changes started being applied, the planned operations that were applied.
+  returned: failure
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+pending:
+  description: On failure once changes started being applied, the planned operations not applied (the failed ones included).
+  returned: failure
+  type: list
+  elements: dict
+  sample: [{"method": "delete_user", "target": "bob@example.com"}]
+failed:
+  description: On failure once changes started being applied, the operations that failed and why, in plan order.
+  returned: failure
+  type: list
+  elements: dict
+  contains:
+    method:
+      description: Client method called.
+      type: str
+    target:
+      description: Object the operation touches.
+      type: str
+    error:
+      description: Why it failed.
+      type: str
+retry_scope:
+  description:
+    - On failure once changes started being applied, an O(scope) limiting a rerun of the task to the objects of the operations not applied,
+      e.g. to retry them once the cause of the failure is fixed.
+    - A renamed user's previous name is part of it.
+  returned: failure
+  type: dict
+  sample: {"patterns": ["bob@example.com"]}
 """
 
 
+def _remember_passwords(module: AnsibleModule, passwords: PasswordFingerprints | None, results: list[OperationResult]) -> None:
+	"""Records the passwords set by the applied operations (and forgets deleted users) in the `password_store`."""
+	if passwords is None:
+		return
+	for res in (r for r in results if r.status in ("ok", "resumed")):
+		op = res.operation
+		if op.method == "create_user":
+			passwords.record(op.key, op.request.password)
+		elif op.method == "modify_user":
+			if op.request.newUserName is not None:
+				passwords.rename(op.request.userName, op.request.newUserName)
+			if op.request.newPassword is not None:
+				passwords.record(op.key, op.request.newPassword)
+		elif op.method == "delete_user":
+			passwords.forget(op.key)
+	try:
+		passwords.save()
+	except OSError as err:
+		module.warn(f"Could not update password_store: {err}, passwords will be sent again next run")
+
+
+def _refresh_snapshots(
+	module: AnsibleModule,
+	snapshots: StateSnapshots[GetUserResponse] | None,
+	fetched: dict[str, GetUserResponse],
+	fetched_at: float,
+	results: list[OperationResult],
+) -> None:
+	"""Stores the users fetched this run in the `state_cache` and drops the ones this run wrote to (or tried to)."""
+	if snapshots is None:
+		return
+	for name, state in fetched.items():
+		snapshots.remember(name, state, fetched_at)
+	for res in (r for r in results if r.status != "skipped"):
+		snapshots.invalidate(res.operation.key)
+		if res.operation.method == "modify_user":
+			snapshots.invalidate(res.operation.request.userName)  # renamed users: the previous name too
+	try:
+		snapshots.save()
+	except OSError as err:
+		module.warn(f"Could not update state_cache: {err}, users will be fetched again next run")
+
+
+def _refresh_users(
+	client: UserClient, refresh: str, predicted: list[dict[str, Any]], results: list[OperationResult], in_scope: Callable[[str], bool], concurrency: int
+) -> list[dict[str, Any]]:
+	"""`refresh_after_apply`: the users read again once the plan is applied, every one or only the ones written to."""
+
+	def get_user(name: str) -> GetUserResponse:
+		return client.get_user(GetUserRequest(name))
+
+	if refresh == "all":
+		names = sorted(name for name in client.list_users().users if in_scope(name))
+		return [state.as_display(name) for name, state in fetch_all(get_user, names, concurrency).items()]
+	# deleted users and previous names are already gone from the prediction
+	users = {user["name"]: user for user in predicted}
+	touched = touched_keys(results)
+	users |= {name: state.as_display(name) for name, state in fetch_all(get_user, [n for n in users if n in touched], concurrency).items()}
+	return [users[name] for name in sorted(users)]
+
+
+def _unfetched_stats(avoided_get_user: int) -> dict[str, Any]:
+	"""`stats` of a run calling no `getUser`: shallow check, saved plan or resumed journal."""
+	return {
+		"avoided_calls": {"getUser": avoided_get_user, "deletePasswordReset": 0, "modifyUser": 0},
+		"wasted_calls": {"getUser": 0},
+		"state_cache": {"hits": 0, "misses": 0, "hit_rate": None},
+		"unchanged_passwords": 0,
+	}
+
+
+def _shallow_check(
+	module: AnsibleModule, listed: list[str], extra_users: list[str], missing_users: list[UserInput], renames: dict[str, str]
+) -> tuple[list[Operation], dict[str, Any]]:
+	"""`check_fidelity=shallow`: the changes `listUser` alone tells about, every kept user is `unverified`."""
+	deleted, renamed_to = set(extra_users), {previous: name for name, previous in renames.items()}
+	kept = [renamed_to.get(name, name) for name in listed if name not in deleted]
+	after = sorted([*kept, *(user.email for user in missing_users)])
+
+	operations = [
+		*(Operation("delete_user", name, DeleteUserRequest(name)) for name in extra_users),
+		*(Operation("create_user", user.email, user) for user in missing_users),
+		*(Operation("modify_user", name, ModifyUserRequest(user_name=previous, new_user_name=name), label=f"{previous} -> {name}") for name, previous in renames.items()),
+	]
+	result: dict[str, Any] = {
+		"changed": bool(operations),
+		"users": [{"name": name} for name in after],
+		"unverified": sorted(kept),
+		"operations": [r.as_display() for r in plan_operations(operations)],
+		"stats": _unfetched_stats(len(listed)),
+	}
+	if module._diff:
+		result["diff"] = {"before": [{"name": name} for name in sorted(listed)], "after": result["users"]}
+	return operations, result
+
+
 def main():
 	module = AnsibleModule(
 		argument_spec=dict(
 			api_token=dict(type="str", required=True, no_log=True),
+			**API_OPTIONS_SPEC,
+			**SCOPE_SPEC,
+			**PLAN_SPEC,
+			**JOURNAL_SPEC,
 			canonical=dict(type="bool", required=False, default=True),
 			password_mode=dict(
 				type="str",
@@ -214,12 +534,21 @@ def main():
 				default="update-if-provided",
 				choices=["update-if-provided", "ignore-if-exists"],
 			),
+			password_store=dict(type="path", required=False),
+			state_cache=dict(type="path", required=False),
+			max_state_age=dict(type="float", required=False),
+			diff_detail=dict(type="bool", required=False, default=False),
+			fetch_concurrency=dict(type="int", required=False, default=1),
+			check_fidelity=dict(type="str", required=False, default="full", choices=["full", "shallow"]),
+			speculative_prefetch=dict(type="bool", required=False, default=False),
+			refresh_after_apply=dict(type="str", required=False, default="none", choices=["none", "touched", "all"]),
 			users=dict(
 				type="list",
 				required=True,
 				elements="dict",
 				options=dict(
 					name=dict(type="str", required=True),
+					previous_names=dict(type="list", elements="str", required=False, default=[]),
 					password=dict(type="str", required=False, no_log=True),
 					password_mode=dict(
 						type="str",
@@ -242,103 +571,283 @@ def main():
 		supports_check_mode=True,
 	)
 
-	api = PurelymailAPI(module.params["api_token"])
+	fetch_concurrency: int = module.params["fetch_concurrency"]
+	if fetch_concurrency < 1:
+		module.fail_json(msg=f"fetch_concurrency must be >= 1, got {fetch_concurrency}")
+
+	max_state_age: float | None = module.params["max_state_age"]
+	if max_state_age is not None and (max_state_age <= 0 or not module.params["state_cache"]):
+		module.fail_json(msg=f"max_state_age must be > 0 and requires state_cache, got {max_state_age}")
+
+	shallow: bool = module.check_mode and module.params["check_fidelity"] == "shallow"
+	plan_out, plan_in = plan_paths(module)
+	if plan_out and shallow:
+		module.fail_json(msg="plan_out requires check_fidelity=full, a shallow check doesn't plan every change")
+	# a plan is saved with its diff, whether this run returns it or not
+	want_diff: bool = module._diff or bool(plan_out)
+	journal_path: str | None = None if module.check_mode else module.params["journal"]
+	speculative_prefetch: bool = module.params["speculative_prefetch"] and not shallow and not plan_in
+	# with speculation, listUser runs alongside the getUser workers
+	api = build_api(module, pool_size=fetch_concurrency + speculative_prefetch)
 	client = UserClient(api)
 
+	scope = build_scope(module)
 	default_password_mode: str = module.params["password_mode"]
 	canonical: bool = module.params["canonical"]
 
 	users: list[UserInput] = []
+	seen: set[str] = set()
 	for idx, params in enumerate(module.params["users"]):
 		email = params["name"]
-		if any(u.email == email for u in users):
+		if email in seen:
 			module.fail_json(msg=f"users[{idx}]: duplicate name {params['name']!r}")
 		if "@" not in email:
 			module.fail_json(msg=f"users[{idx}]: User name must be a full email address, got {params['name']!r}")
+		seen.add(email)
 		users.append(UserInput(**params))
 
+	# previous name -> name of the entry claiming it
+	claimed: dict[str, str] = {}
+	for idx, user in enumerate(users):
+		for name in user.previousNames:
+			if name in seen:
+				module.fail_json(msg=f"users[{idx}]: previous name {name!r} is also a user to manage")
+			if name in claimed:
+				module.fail_json(msg=f"users[{idx}]: previous name {name!r} is claimed by several users")
+			claimed[name] = user.email
+
+	def in_scope(name: str) -> bool:
+		"""A previous name follows its entry: whatever its own shard or domain, one run renames it and no other deletes it."""
+		return scope.contains(claimed.get(name, name))
+
+	scoped = [user for user in users if in_scope(user.email)]
+	out_of_scope = {"desired": len(users) - len(scoped), "existing": 0}
+	users = scoped
+
+	passwords: PasswordFingerprints | None = None
+	snapshots: StateSnapshots[GetUserResponse] | None = None
+	fetched: dict[str, GetUserResponse] = {}
+	fetched_at = time.time()
 	try:
-		existing = client.list_users()
-		existing_users = {name: client.get_user(GetUserRequest(name)) for name in existing.users}
-		desired_users = {user.email: user for user in users}
-
-		extra_users = [name for name in existing.users if canonical and name not in desired_users]
-		missing_users = [u for u in users if u.email not in existing_users]
-		for user in missing_users:
-			if not user.password:
-				module.fail_json(msg=f"users: {user.email!r} does not exist yet, `password` is required to create it")
-
-		updates = []
-		method_deletes = []
-		method_upserts = []
-		supposed_after = {name: user for name, user in existing_users.items() if name not in extra_users}
-
-		for user in users:
-			current = existing_users.get(user.email) or GetUserResponse.expectedFromUserInput(user, from_create=True)
-			wanted = GetUserResponse.expectedFromUserInput(
-				user,
-				enableSpamFiltering=current.enableSpamFiltering,
-			)
-			new_password = user.password if user.email in existing_users and user.password and (user.passwordMode or default_password_mode) == "update-if-provided" else None
-			update = current.modify_request(user.email, wanted, new_password=new_password)
-			if update.has_changes():
-				updates.append(update)
-				supposed_after[user.email] = current.update(update, wanted.resetMethods)
-			else:
-				supposed_after[user.email] = wanted
-
-			method_deletes += [(user.email, m) for m in current.resetMethods if m not in wanted.resetMethods]
-			method_upserts += [(user.email, m) for m in wanted.resetMethods if m not in current.resetMethods]
-
-		result: dict[str, Any] = {
-			"changed": bool(extra_users or missing_users or updates or method_deletes or method_upserts),
-			"users": [supposed_after[name].as_display(name) for name in sorted(supposed_after)],
-		}
-
-		if module._diff:
-			result["diff"] = {
-				"before": [existing_users[name].as_display(name) for name in sorted(existing_users)],
-				"after": [supposed_after[name].as_display(name) for name in sorted(supposed_after)],
-			}
-			for user in result["diff"]["before"]:
-				user["password"] = "<unknown>"
-			for user in result["diff"]["after"]:
-				if any(missing.email == user["name"] for missing in missing_users):
-					user["password"] = "<set>"
-				if any(update.userName == user["name"] and update.newPassword for update in updates):
-					user["password"] = "<changed>"
-
-		if not module.check_mode:
-			for name in extra_users:
-				_ = client.delete_user(DeleteUserRequest(name))
+		if module.params["password_store"]:
+			passwords = PasswordFingerprints.load(module.params["password_store"], module.params["api_token"])
+		if max_state_age is not None and not shallow:
+			snapshots = StateSnapshots.load(module.params["state_cache"], "getUser", module.params["api_token"], GetUserResponse, max_state_age)
+		api.warm_up((GetUserRequest, GetUserResponse))
+		secrets = {user.email: user.password for user in users if user.password}
+		journal = OperationJournal.resume(journal_path, "users", module.params, secrets) if journal_path else None
+		completed: set[int] = set()
+		if journal is not None:
+			# an earlier run of this task was interrupted: resume its plan, nothing is listed
+			operations, result = journal.operations, dict(journal.result)
+			completed = journal.settle(client)
+			result["stats"] = _unfetched_stats(0) | {"out_of_scope": out_of_scope}
+		elif plan_in:
+			existing = client.list_users()
+			listed = [name for name in existing.users if in_scope(name)]
+			out_of_scope["existing"] = len(existing.users) - len(listed)
+			saved = ExecutionPlan.load(plan_in, "users", module.params["api_token"], sorted(listed), secrets)
+			operations, result = saved.operations, dict(saved.result)
+			result["stats"] = _unfetched_stats(len(listed)) | {"out_of_scope": out_of_scope}
+		else:
+			with Prefetcher(lambda name: client.get_user(GetUserRequest(name)), fetch_concurrency) as prefetch:
+				if speculative_prefetch:
+					# Desired users most likely exist: fetch them while listUser is in flight.
+					prefetch.speculate(user.email for user in users if snapshots is None or not snapshots.fresh(user.email, fetched_at))
+				existing = client.list_users()
+				listed = [name for name in existing.users if in_scope(name)]
+				out_of_scope["existing"] = len(existing.users) - len(listed)
+				existing_names = set(listed)
+				# new name -> current name, only for users whose new name doesn't exist yet
+				renames = {
+					user.email: previous
+					for user in users
+					if user.email not in existing_names and (previous := next((n for n in user.previousNames if n in existing_names), None)) is not None
+				}
+				renamed_to = {previous: name for name, previous in renames.items()}
+				plan = reconcile(users, listed, key=lambda u: u.email, existing_key=lambda name: renamed_to.get(name, name), prune=canonical)
+				extra_users = plan.delete
+				missing_users = plan.create
+
+				# Users about to be deleted are only needed for the `before` side of the diff.
+				skipped = set() if want_diff or module.params["diff_detail"] else set(extra_users)
+				needed = [] if shallow else [n for n in listed if n not in skipped]
+				cached = {} if snapshots is None else {name: state for name in needed if (state := snapshots.get(name, fetched_at)) is not None}
+				fetched = prefetch.fetch_all([n for n in needed if n not in cached])
+				existing_users = {name: cached[name] if name in cached else fetched[name] for name in needed}
+				if snapshots is not None:
+					snapshots.prune(lambda name: in_scope(name) and name not in existing_names)
 
 			for user in missing_users:
-				_ = client.create_user(user)
-
-			for update in updates:
-				_ = client.modify_user(update)
-
-			for user_name, method in method_deletes:
-				_ = client.delete_password_reset(DeletePasswordResetRequest(user_name, method.target))
-
-			for user_name, method in method_upserts:
-				_ = client.upsert_password_reset(
-					UpsertPasswordResetRequest(
-						user_name=user_name,
-						type=method.type,
-						target=method.target,
-						description=method.description,
-						allow_mfa_reset=method.allowMfaReset,
-					)
+				if not user.password:
+					module.fail_json(msg=f"users: {user.email!r} does not exist yet, `password` is required to create it")
+
+			if shallow:
+				operations, result = _shallow_check(module, listed, extra_users, missing_users, renames)
+				estimate = CallEstimate.build(api.stats, operations)
+				check_call_budget(module, estimate)
+				result["stats"]["out_of_scope"] = out_of_scope
+				result["stats"] |= api.stats.as_dict() | {"api_calls": estimate.as_dict()}
+				module.exit_json(**result)
+
+			updates = []
+			method_deletes = []
+			method_upserts = []
+			replaced_in_place = 0
+			unchanged_passwords = 0
+			password_only_skipped = 0
+
+			# One slow hash per password to check: derive them on the fetch workers rather than one after another.
+			sent_passwords = {
+				renames.get(user.email, user.email): user.password
+				for user in users
+				if renames.get(user.email, user.email) in existing_users and user.password and (user.passwordMode or default_password_mode) == "update-if-provided"
+			}
+			matching_passwords = set() if passwords is None else passwords.matching(sent_passwords, fetch_concurrency)
+
+			for user in users:
+				current_name = renames.get(user.email, user.email)
+				current = existing_users.get(current_name) or GetUserResponse.expectedFromUserInput(user, from_create=True)
+				wanted = GetUserResponse.expectedFromUserInput(
+					user,
+					enableSpamFiltering=current.enableSpamFiltering,
 				)
+				new_password = sent_passwords.get(current_name)
+				password_unchanged = current_name in matching_passwords
+				update = current.modify_request(
+					current_name,
+					wanted,
+					new_password=None if password_unchanged else new_password,
+					new_user_name=user.email if user.email in renames else None,
+				)
+				if password_unchanged:
+					unchanged_passwords += 1
+					password_only_skipped += not update.has_changes()
+				if update.has_changes():
+					updates.append(update)
+
+				removed = [m for m in current.resetMethods if m not in wanted.resetMethods]
+				for method in (m for m in wanted.resetMethods if m not in current.resetMethods):
+					# Replace a removed method of the same type in place: one upsert instead of delete + upsert.
+					replaced = next((m for m in removed if m.type == method.type), None)
+					if replaced is not None:
+						removed.remove(replaced)
+						replaced_in_place += 1
+					method_upserts.append((user.email, method, replaced.target if replaced is not None else None))
+				method_deletes += [(user.email, m) for m in removed]
+
+			operations = [
+				*(Operation("delete_user", name, DeleteUserRequest(name)) for name in extra_users),
+				*(Operation("create_user", user.email, user) for user in missing_users),
+				# keyed by the final name: the user's recovery method changes run after its rename
+				*(
+					Operation("modify_user", update.newUserName or update.userName, update, label=f"{update.userName} -> {update.newUserName}" if update.newUserName else None)
+					for update in updates
+				),
+				*(Operation("delete_password_reset", user_name, DeletePasswordResetRequest(user_name, method.target)) for user_name, method in method_deletes),
+				*(
+					Operation(
+						"upsert_password_reset",
+						user_name,
+						UpsertPasswordResetRequest(
+							user_name=user_name,
+							type=method.type,
+							target=method.target,
+							existing_target=existing_target,
+							description=method.description,
+							allow_mfa_reset=method.allowMfaReset,
+						),
+					)
+					for user_name, method, existing_target in method_upserts
+				),
+			]
+
+			# users as getUser returns them once the plan is applied
+			after = PurelymailTwin.seeded(users={name: existing_users.get(name) for name in listed}, enforce_domains=False).replay(operations)
+			supposed_after = {name: after.get_user(GetUserRequest(name)) for name in after.list_users().users}
+
+			result: dict[str, Any] = {
+				"users": [supposed_after[name].as_display(name) for name in sorted(supposed_after)],
+				"stats": {
+					"avoided_calls": {"getUser": len(skipped), "deletePasswordReset": replaced_in_place, "modifyUser": password_only_skipped},
+					"wasted_calls": {"getUser": prefetch.wasted},
+					"out_of_scope": out_of_scope,
+					"state_cache": {"hits": 0, "misses": 0, "hit_rate": None}
+					if snapshots is None
+					else {"hits": snapshots.hits, "misses": snapshots.misses, "hit_rate": snapshots.hit_rate()},
+					"unchanged_passwords": unchanged_passwords,
+				},
+			}
 
+			if want_diff:
+				result["diff"] = {
+					"before": [existing_users[name].as_display(name) for name in sorted(existing_users)],
+					"after": [supposed_after[name].as_display(name) for name in sorted(supposed_after)],
+				}
+				for user in result["diff"]["before"]:
+					user["password"] = "<unknown>"
+				created = {u.email for u in missing_users}
+				password_changed = {update.newUserName or update.userName for update in updates if update.newPassword}
+				for user in result["diff"]["after"]:
+					if user["name"] in created:
+						user["password"] = "<set>"
+					if user["name"] in password_changed:
+						user["password"] = "<changed>"
+					if user["name"] in renames:
+						user["previous_name"] = renames[user["name"]]
+
+		estimate = CallEstimate.build(api.stats, operations, completed, module.params["apply_concurrency"])
+		check_call_budget(module, estimate)
+		if journal is None:
+			result["changed"] = bool(operations)
+			saved_result = {name: result[name] for name in ("users", "diff") if name in result}
+			if plan_out:
+				ExecutionPlan.build("users", module.params["api_token"], sorted(listed), operations, saved_result).save(plan_out)
+			if journal_path and operations:
+				journal = OperationJournal.start(journal_path, "users", module.params, operations, saved_result)
+		if not module._diff:
+			result.pop("diff", None)
+
+		if module.check_mode:
+			results = plan_operations(operations)
+		else:
+			results = apply_operations(
+				client,
+				operations,
+				module.params["apply_concurrency"],
+				completed=completed,
+				record=None if journal is None else journal.record,
+				on_error=module.params["on_error"],
+			)
+			# operations an interrupted run applied are finalized by this one
+			result["changed"] = bool(touched_keys(results))
+			if journal is not None:
+				journal.close()
+			if module.params["refresh_after_apply"] != "none":
+				try:
+					result["users"] = _refresh_users(client, module.params["refresh_after_apply"], result["users"], results, in_scope, fetch_concurrency)
+				except (ApiError, DeadlineExceeded) as err:
+					module.warn(f"Could not refresh the users after apply: {err}, the predicted users are returned")
+			_remember_passwords(module, passwords, results)
+			_refresh_snapshots(module, snapshots, fetched, fetched_at, results)
+		result["operations"] = [r.as_display() for r in results]
+
+		result["stats"] |= api.stats.as_dict() | {"api_calls": estimate.as_dict()}
 		module.exit_json(**result)
+	except ApplyInterrupted as err:
+		_remember_passwords(module, passwords, err.results)
+		_refresh_snapshots(module, snapshots, fetched, fetched_at, err.results)
+		module.fail_json(msg=err.msg, **err.as_result(), retry_scope=retry_scope(err.results))
+	except (DeadlineExceeded, PlanRejected, PlanFileError) as err:
+		module.fail_json(msg=f"{err}, no change was made")
 	except ApiError as err:  # pragma: no cover
 		module.fail_json(msg=f"Purelymail API error: {err}", exception=err)
 	except Exception as err:  # pragma: no cover
 		import traceback
 
 		module.fail_json(msg=f"{type(err).__name__}: {err}", exception=traceback.format_exc())
+	finally:
+		api.close()
 
 
 if __name__ == "__main__":
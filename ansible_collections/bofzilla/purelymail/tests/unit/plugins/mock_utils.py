@@ -1,4 +1,5 @@
 import functools
+import json
 from collections.abc import Callable
 from typing import Any, Protocol
 from unittest.mock import MagicMock
@@ -6,20 +7,25 @@ from unittest.mock import MagicMock
 import pytest
 import requests
 
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PurelymailTwin
+
 
 @pytest.fixture(scope="module")
 def make_runner():
 	"""
 	Returns a factory that can produce a `run()` callable for any Ansible module.
+	API calls the mocked clients don't intercept are answered by `mock_api_response` (from the request payload),
+	or with a `twin` by that in-memory account.
 	"""
 
 	def _make_runner(
 		py_module: HasMain,
 		mock_setup: tuple[tuple[str, Callable[[MagicMock], None]] | str, ...],
 		mock_api_response: Callable[[dict], FakeApiResponse] | None = None,
+		twin: PurelymailTwin | None = None,
 	) -> Callable[..., tuple[dict, dict[str, MagicMock]]]:
 		monkeypatch = pytest.MonkeyPatch()
-		mocks = bootstrap_module(monkeypatch, py_module, mock_setup, mock_api_response)
+		mocks = bootstrap_module(monkeypatch, py_module, mock_setup, mock_api_response, twin)
 
 		@functools.wraps(run_module_test)
 		def run_with_params(**kwargs):
@@ -40,16 +46,24 @@ def bootstrap_module(
 	py_module: HasMain,
 	mocks: tuple[tuple[str, Callable[[MagicMock], None]] | str, ...],
 	mock_api_response: Callable[[dict], "FakeApiResponse"] | None = None,
+	twin: PurelymailTwin | None = None,
 ) -> dict[str, MagicMock]:
 	module = MagicMock()
 	module.exit_json.side_effect = exit_json
 	module.fail_json.side_effect = fail_json
-	monkeypatch.setattr(py_module, "AnsibleModule", lambda *_, **__: module)
+
+	def ansible_module(*_, argument_spec: dict[str, dict] | None = None, **__):
+		module.params = with_defaults(argument_spec or {}, module.params)
+		return module
+
+	monkeypatch.setattr(py_module, "AnsibleModule", ansible_module)
 
 	ret = {"AnsibleModule": module}
 
 	if mock_api_response:
-		monkeypatch.setattr(requests, "post", lambda *_, **kwargs: mock_api_response(kwargs.get("json") or {}))
+		monkeypatch.setattr(requests.Session, "post", lambda *_, **kwargs: mock_api_response(kwargs.get("json") or {}))
+	elif twin is not None:
+		monkeypatch.setattr(requests.Session, "post", lambda _session, url, json=None, **__: twin.respond(url, json))
 
 	for mock_cfg in mocks:
 		mock = MagicMock()
@@ -65,9 +79,26 @@ def bootstrap_module(
 	return ret
 
 
+def with_defaults(argument_spec: dict[str, dict], params: dict[str, Any]) -> dict[str, Any]:
+	"""Fill defaults (suboptions included) the way AnsibleModule normally would."""
+	filled = {name: spec.get("default") for name, spec in argument_spec.items()} | params
+	for name, spec in argument_spec.items():
+		value = filled[name]
+		if "options" not in spec or value is None:
+			continue
+		if spec.get("type") == "list":
+			filled[name] = [with_defaults(spec["options"], item) for item in value]
+		else:  # pragma: no cover
+			filled[name] = with_defaults(spec["options"], value)
+	return filled
+
+
 class FakeApiResponse:
-	def __init__(self, payload):
+	def __init__(self, payload, *, status_code: int = 200, content: bytes | None = None, headers: dict[str, str] | None = None):
 		self._payload = payload
+		self.status_code = status_code
+		self.headers = headers or {}
+		self.content = json.dumps(payload).encode() if content is None else content
 
 	@classmethod
 	def success(cls, payload: dict) -> "FakeApiResponse":
@@ -77,11 +108,16 @@ class FakeApiResponse:
 	def error(cls, message: str, *, code: str = "internalError") -> "FakeApiResponse":
 		return FakeApiResponse({"type": "error", "code": code, "message": message})
 
+	@classmethod
+	def raw(cls, content: bytes, *, status_code: int, headers: dict[str, str] | None = None) -> "FakeApiResponse":
+		return FakeApiResponse(None, status_code=status_code, content=content, headers=headers)
+
 	def json(self):
 		return self._payload
 
 	def raise_for_status(self):
-		pass
+		if self.status_code >= 400:
+			raise requests.HTTPError(f"{self.status_code} Error", response=self)
 
 
 class AnsibleExitJson(BaseException):
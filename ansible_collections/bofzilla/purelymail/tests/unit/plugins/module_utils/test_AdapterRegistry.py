@@ -0,0 +1,45 @@
+from unittest.mock import MagicMock
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import GetUserRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiResponse, api_response_adapter
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import CreateAppPasswordResponse, GetUserResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.user_client import UserClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.pydantic import ADAPTERS, AdapterRegistry
+from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import FakeApiResponse
+
+USER = {"enableSearchIndexing": True, "enableSpamFiltering": True, "recoveryEnabled": False, "requireTwoFactorAuthentication": False, "resetMethods": []}
+
+
+def test_registry_memoizes():
+	registry = AdapterRegistry()
+
+	first = registry.get(GetUserRequest)
+	assert registry.get(GetUserRequest) is first
+	assert registry.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_warm_is_not_a_miss():
+	registry = AdapterRegistry()
+	registry.warm(GetUserRequest, GetUserRequest)
+	_ = registry.get(GetUserRequest)
+
+	assert registry.stats() == {"size": 1, "hits": 1, "misses": 0}
+
+
+def test_api_response_key_is_stable():
+	assert api_response_adapter(CreateAppPasswordResponse) is ADAPTERS.get(ApiResponse[CreateAppPasswordResponse])
+
+
+def test_steady_state_does_no_schema_build():
+	session = MagicMock()
+	session.post.return_value = FakeApiResponse.success(USER)
+	api = PurelymailAPI("dQw4w9WgXcQ", session=session)
+	client = UserClient(api)
+
+	api.warm_up((GetUserRequest, GetUserResponse))
+	misses = ADAPTERS.misses
+	for i in range(10):
+		_ = client.get_user(GetUserRequest(f"user{i}@example.com"))
+
+	assert ADAPTERS.misses == misses
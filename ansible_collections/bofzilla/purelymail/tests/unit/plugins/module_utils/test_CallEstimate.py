@@ -0,0 +1,54 @@
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.call_estimate import DEFAULT_LATENCY, CallEstimate
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import ApiStats
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation
+
+OPERATIONS = [
+	Operation("delete_user", "a@example.com", None),
+	Operation("create_user", "b@example.com", None),
+	Operation("upsert_password_reset", "b@example.com", None),
+	Operation("create_user", "c@example.com", None),
+]
+
+
+def _stats(**calls: tuple[int, float]) -> ApiStats:
+	stats = ApiStats()
+	for endpoint, (count, seconds) in calls.items():
+		for _ in range(count):
+			stats.called(endpoint, seconds / count)
+	return stats
+
+
+def test_counts_reads_and_planned_writes():
+	estimate = CallEstimate.build(_stats(listUser=(1, 0.5), getUser=(4, 2.0)), OPERATIONS)
+
+	assert estimate.as_dict() == {
+		"read": {"getUser": 4, "listUser": 1},
+		"write": {"createUser": 2, "deleteUser": 1, "upsertPasswordReset": 1},
+		"total": 9,
+		# no write observed: the mean latency of the reads, 0.5s
+		"estimated_write_seconds": 2.0,
+	}
+
+
+def test_observed_write_latency():
+	estimate = CallEstimate.build(_stats(getUser=(1, 1.0), createUser=(1, 0.1)), OPERATIONS)
+
+	assert estimate.write_seconds == pytest.approx(0.1 + 0.1 + 0.55 + 0.55)
+
+
+def test_concurrency_is_bound_by_the_longest_chain():
+	stats = _stats(getUser=(1, 1.0))
+
+	assert CallEstimate.build(stats, OPERATIONS, concurrency=2).write_seconds == pytest.approx(2.0)
+	# b@example.com's two writes run one after the other
+	assert CallEstimate.build(stats, OPERATIONS, concurrency=8).write_seconds == pytest.approx(2.0)
+	assert CallEstimate.build(stats, OPERATIONS[:2] + OPERATIONS[3:], concurrency=8).write_seconds == pytest.approx(1.0)
+
+
+def test_completed_operations_are_not_counted():
+	estimate = CallEstimate.build(ApiStats(), OPERATIONS, completed={0, 1})
+
+	assert estimate.write == {"createUser": 1, "upsertPasswordReset": 1}
+	assert estimate.write_seconds == pytest.approx(2 * DEFAULT_LATENCY)
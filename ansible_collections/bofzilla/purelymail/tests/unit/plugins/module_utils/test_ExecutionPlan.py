@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import CreateRoutingRequest, CreateUserRequest, DeleteUserRequest, ModifyUserRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.execution_plan import ExecutionPlan, PlanFileError, state_fingerprint
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation
+
+STATE = ["alice@example.com", "bob@example.com"]
+CREATE = CreateUserRequest(
+	user_name="carol",
+	domain_name="example.com",
+	password="hunter2",
+	enable_password_reset=True,
+	recovery_email="",
+	recovery_email_description="",
+	recovery_phone="",
+	recovery_phone_description="",
+	enable_search_indexing=False,
+	send_welcome_email=False,
+)
+OPERATIONS = [
+	Operation("delete_user", "bob@example.com", DeleteUserRequest("bob@example.com")),
+	Operation("create_user", "carol@example.com", CREATE),
+	Operation("modify_user", "alice@example.com", ModifyUserRequest(user_name="alice@example.com", new_password="s3cret"), label="alice"),
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+	return str(tmp_path / "plan.json")
+
+
+def _save(path: str, operations=OPERATIONS, state=STATE) -> None:
+	ExecutionPlan.build("users", "token", state, operations, {"users": [{"name": "carol@example.com"}]}).save(path)
+
+
+def test_round_trip(path):
+	_save(path)
+
+	plan = ExecutionPlan.load(path, "users", "token", list(STATE), {"carol@example.com": "hunter2", "alice@example.com": "s3cret"})
+
+	assert plan.operations == OPERATIONS
+	assert plan.result == {"users": [{"name": "carol@example.com"}]}
+
+
+def test_routing_rule_round_trip(path):
+	rule = CreateRoutingRequest(domain_name="example.com", preset="any_address", prefix=True, catchall=False, match_user="", target_addresses=["a@example.com"])
+	operations = [Operation("create_routing_rule", "example.com", rule)]
+	ExecutionPlan.build("routing_rules", "token", [], operations, {}).save(path)
+
+	(loaded,) = ExecutionPlan.load(path, "routing_rules", "token", []).operations
+	# the preset only matters while planning: the rule is loaded as resolved
+	assert loaded.request.eq(operations[0].request)
+
+
+def test_passwords_are_never_written(path):
+	_save(path)
+
+	with open(path) as f:
+		content = f.read()
+	assert "hunter2" not in content and "s3cret" not in content
+	assert [op["request"].get("password", op["request"].get("newPassword")) for op in json.loads(content)["operations"]] == [None, "<redacted>", "<redacted>"]
+
+
+def test_missing_password(path):
+	_save(path)
+
+	with pytest.raises(PlanFileError, match=r"modify_user of alice@example.com sets a password, provide it again in the task"):
+		ExecutionPlan.load(path, "users", "token", STATE, {"carol@example.com": "hunter2"})
+
+
+@pytest.mark.parametrize(
+	("module", "token", "state", "message"),
+	[
+		("users", "token", ["alice@example.com"], "the account changed since the plan was computed"),
+		("domains", "token", STATE, "the plan was computed by users, not domains"),
+		("users", "other", STATE, "the plan was computed for another account"),
+	],
+)
+def test_refused(path, module, token, state, message):
+	_save(path)
+
+	with pytest.raises(PlanFileError, match=message):
+		ExecutionPlan.load(path, module, token, state)
+
+
+def test_missing_file(path):
+	with pytest.raises(PlanFileError, match="does not exist or is empty"):
+		ExecutionPlan.load(path, "users", "token", STATE)
+
+
+def test_unsupported_version(path):
+	with open(path, "w") as f:
+		json.dump({"version": 0}, f)
+
+	with pytest.raises(PlanFileError, match="unsupported plan version 0"):
+		ExecutionPlan.load(path, "users", "token", STATE)
+
+
+def test_fingerprint_ignores_key_order():
+	assert state_fingerprint({"a": 1, "b": [1, 2]}) == state_fingerprint({"b": [1, 2], "a": 1})
+	assert state_fingerprint([1, 2]) != state_fingerprint([2, 1])
@@ -0,0 +1,151 @@
+import os
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import (
+	AddDomainRequest,
+	CreateRoutingRequest,
+	CreateUserRequest,
+	DeleteRoutingRequest,
+	DeleteUserRequest,
+	ModifyUserRequest,
+	UpsertPasswordResetRequest,
+)
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.journal import OperationJournal, task_fingerprint
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PurelymailTwin
+
+PARAMS = {"api_token": "token", "canonical": True, "users": [{"name": "bob@example.com", "password": "hunter2"}]}
+OPERATIONS = [
+	Operation("delete_user", "alice@example.com", DeleteUserRequest("alice@example.com")),
+	Operation(
+		"create_user",
+		"bob@example.com",
+		CreateUserRequest(
+			user_name="bob",
+			domain_name="example.com",
+			password="hunter2",
+			enable_password_reset=True,
+			recovery_email="",
+			recovery_email_description="",
+			recovery_phone="",
+			recovery_phone_description="",
+			enable_search_indexing=True,
+			send_welcome_email=False,
+		),
+	),
+	Operation("modify_user", "bob@example.com", ModifyUserRequest(user_name="bob@example.com", enable_search_indexing=False)),
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+	return str(tmp_path / "journal.jsonl")
+
+
+def test_resumes_an_unfinished_journal(path):
+	journal = OperationJournal.start(path, "users", PARAMS, OPERATIONS, {"users": []})
+	journal.record(0, "start")
+	journal.record(0, "done")
+	journal.record(1, "start")
+
+	resumed = OperationJournal.resume(path, "users", PARAMS, {"bob@example.com": "hunter2"})
+
+	assert resumed is not None
+	assert resumed.operations == OPERATIONS
+	assert resumed.result == {"users": []}
+	assert (resumed.done, resumed.unsettled()) == ({0}, [1])
+	with open(path) as file:
+		assert "hunter2" not in file.read()
+
+
+@pytest.mark.parametrize(
+	("module", "params"),
+	[
+		("domains", PARAMS),
+		("users", {**PARAMS, "canonical": False}),
+		("users", {**PARAMS, "api_token": "other"}),
+	],
+)
+def test_other_tasks_start_over(path, module, params):
+	OperationJournal.start(path, "users", PARAMS, OPERATIONS, {})
+
+	assert OperationJournal.resume(path, module, params) is None
+
+
+def test_missing_or_partial_journal(path):
+	assert OperationJournal.resume(path, "users", PARAMS) is None
+
+	journal = OperationJournal.start(path, "users", PARAMS, OPERATIONS[:1], {})
+	journal.record(0, "start")
+	with open(path, "a") as file:
+		file.write('{"op": 0, "ev')  # died while writing
+
+	resumed = OperationJournal.resume(path, "users", PARAMS)
+	assert resumed is not None and resumed.unsettled() == [0]
+
+
+def test_passwords_left_out_of_the_task_fingerprint():
+	assert task_fingerprint(PARAMS) == task_fingerprint({**PARAMS, "api_token": "other", "users": [{"name": "bob@example.com", "password": "n3w"}]})
+	assert task_fingerprint(PARAMS) != task_fingerprint({**PARAMS, "users": []})
+
+
+def test_resumes_with_other_run_settings(path):
+	OperationJournal.start(path, "users", {**PARAMS, "deadline": 30.0}, OPERATIONS, {})
+
+	resumed = OperationJournal.resume(path, "users", {**PARAMS, "deadline": 600.0, "apply_concurrency": 4, "on_error": "continue"}, {"bob@example.com": "hunter2"})
+	assert resumed is not None
+	assert resumed.operations == OPERATIONS
+
+
+def test_settles_with_targeted_reads(path):
+	twin = PurelymailTwin.seeded(users={"bob@example.com": None}, enforce_domains=False)
+	journal = OperationJournal.start(path, "users", PARAMS, OPERATIONS, {})
+	for idx in range(3):
+		journal.record(idx, "start")
+
+	# alice is gone and bob exists: both took effect, the settings update is run again
+	assert journal.settle(twin.client()) == {0, 1}
+	assert twin.calls == ["listUser"]
+	resumed = OperationJournal.resume(path, "users", PARAMS, {"bob@example.com": "hunter2"})
+	assert resumed is not None
+	assert resumed.unsettled() == [2]
+
+
+ANY_ADDRESS_RULE = CreateRoutingRequest(domain_name="example.com", preset="any_address", prefix=True, catchall=False, match_user="", target_addresses=["a@example.com"])
+
+
+@pytest.mark.parametrize(
+	("operation", "applied"),
+	[
+		(Operation("add_domain", "example.com", AddDomainRequest("example.com")), True),
+		(Operation("add_domain", "other.com", AddDomainRequest("other.com")), False),
+		(Operation("delete_routing_rule", "example.com", DeleteRoutingRequest(1)), False),
+		(Operation("delete_routing_rule", "example.com", DeleteRoutingRequest(2)), True),
+		(Operation("create_routing_rule", "example.com", ANY_ADDRESS_RULE), True),
+		(Operation("modify_user", "bob@example.com", ModifyUserRequest(user_name="alice@example.com", new_user_name="bob@example.com")), False),
+		(
+			Operation(
+				"upsert_password_reset",
+				"alice@example.com",
+				UpsertPasswordResetRequest(user_name="alice@example.com", type="email", target="new@backup.com", existing_target="old@backup.com"),
+			),
+			False,
+		),
+	],
+)
+def test_settle(path, operation, applied):
+	rule = RoutingRule(prefix=True, catchall=False, domain_name="example.com", match_user="", target_addresses=["a@example.com"], id=1)
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None}, rules=[rule])
+	twin.client().add_domain(AddDomainRequest("example.com"))
+	journal = OperationJournal.start(path, "users", PARAMS, [operation], {})
+	journal.record(0, "start")
+
+	assert journal.settle(twin.client()) == ({0} if applied else set())
+
+
+def test_close(path):
+	OperationJournal.start(path, "users", PARAMS, OPERATIONS, {}).close()
+
+	assert not os.path.exists(path)
@@ -0,0 +1,116 @@
+import json
+import multiprocessing
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.local_store import LocalStore, account_key
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.password_store import PasswordFingerprints, fingerprint
+
+
+@pytest.fixture
+def path(tmp_path):
+	return str(tmp_path / "store" / "passwords.json")
+
+
+def test_record_then_match(path):
+	passwords = PasswordFingerprints.load(path, "token")
+	assert not passwords.matches("alice@example.com", "s3cret")
+
+	passwords.record("alice@example.com", "s3cret")
+	passwords.save()
+
+	reloaded = PasswordFingerprints.load(path, "token")
+	assert reloaded.matches("alice@example.com", "s3cret")
+	assert not reloaded.matches("alice@example.com", "other")
+	assert not reloaded.matches("bob@example.com", "s3cret")
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_matching(path, concurrency):
+	passwords = PasswordFingerprints.load(path, "token")
+	for name in ("alice@example.com", "bob@example.com", "carol@example.com"):
+		passwords.record(name, "s3cret")
+
+	sent = {"alice@example.com": "s3cret", "bob@example.com": "other", "carol@example.com": "s3cret", "dave@example.com": "s3cret"}
+	assert passwords.matching(sent, concurrency) == {"alice@example.com", "carol@example.com"}
+
+
+def test_store_holds_no_secret(path):
+	passwords = PasswordFingerprints.load(path, "token")
+	passwords.record("alice@example.com", "s3cret")
+	passwords.save()
+
+	with open(path) as file:
+		content = file.read()
+	assert "s3cret" not in content
+	assert "token" not in content
+	assert account_key("token") in json.loads(content)["passwords"]
+
+
+def test_accounts_are_separate(path):
+	passwords = PasswordFingerprints.load(path, "token")
+	passwords.record("alice@example.com", "s3cret")
+	passwords.save()
+
+	assert not PasswordFingerprints.load(path, "other-token").matches("alice@example.com", "s3cret")
+
+
+def test_salted(path):
+	passwords = PasswordFingerprints.load(path, "token")
+	passwords.record("alice@example.com", "s3cret")
+	passwords.record("bob@example.com", "s3cret")
+	assert passwords.entries["alice@example.com"]["hash"] != passwords.entries["bob@example.com"]["hash"]
+
+
+def test_forget(path):
+	passwords = PasswordFingerprints.load(path, "token")
+	passwords.record("alice@example.com", "s3cret")
+	passwords.save()
+
+	passwords = PasswordFingerprints.load(path, "token")
+	passwords.forget("alice@example.com")
+	passwords.save()
+	assert not PasswordFingerprints.load(path, "token").matches("alice@example.com", "s3cret")
+
+
+def test_save_merges_concurrent_runs(path):
+	first, second = PasswordFingerprints.load(path, "token"), PasswordFingerprints.load(path, "token")
+	first.record("alice@example.com", "a")
+	second.record("bob@example.com", "b")
+	first.save()
+	second.save()
+
+	reloaded = PasswordFingerprints.load(path, "token")
+	assert reloaded.matches("alice@example.com", "a")
+	assert reloaded.matches("bob@example.com", "b")
+
+
+def test_pbkdf2_fallback():
+	salt = b"0" * 16
+	assert fingerprint("s3cret", salt, "pbkdf2_sha256") == fingerprint("s3cret", salt, "pbkdf2_sha256")
+	assert fingerprint("s3cret", salt, "pbkdf2_sha256") != fingerprint("s3cret", salt, "scrypt")
+	with pytest.raises(ValueError, match="Unknown password fingerprint algorithm"):
+		_ = fingerprint("s3cret", salt, "md5")
+
+
+def _increment(path: str, times: int) -> None:
+	store = LocalStore(path)
+	for _ in range(times):
+		store.update(lambda data: data.update(count=data.get("count", 0) + 1))
+
+
+def test_local_store_serializes_processes(path):
+	workers = [multiprocessing.get_context("fork").Process(target=_increment, args=(path, 25)) for _ in range(4)]
+	for worker in workers:
+		worker.start()
+	for worker in workers:
+		worker.join()
+
+	assert LocalStore(path).read() == {"count": 100}
+
+
+def test_local_store_rejects_non_object(path, tmp_path):
+	store = LocalStore(str(tmp_path / "list.json"))
+	(tmp_path / "list.json").write_text("[]")
+	with pytest.raises(ValueError, match="expected a JSON object"):
+		_ = store.read()
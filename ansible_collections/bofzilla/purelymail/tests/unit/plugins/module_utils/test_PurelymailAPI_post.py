@@ -0,0 +1,185 @@
+import time
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pydantic
+import pytest
+import requests
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients import base_client
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import DeadlineExceeded, PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.retry import RetryPolicy
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import DeleteUserRequest, EmptyRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError, parse_api_response, parse_api_response_json
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import CheckCreditResponse, EmptyResponse, ListRoutingResponse, ListUsersResponse
+from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import FakeApiResponse
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch) -> list[float]:
+	slept: list[float] = []
+	monkeypatch.setattr(base_client.time, "sleep", slept.append)
+	return slept
+
+
+def _answers(*responses: FakeApiResponse | Exception) -> Any:
+	"""`side_effect` answering `responses` in turn, or always the only one."""
+	return responses if len(responses) > 1 else lambda *_, **__: responses[0]
+
+
+def _api(*responses: FakeApiResponse | Exception, retry: RetryPolicy | None = None) -> PurelymailAPI:
+	session = MagicMock()
+	session.post.side_effect = _answers(*responses)
+	return PurelymailAPI("dQw4w9WgXcQ", session=session, retry=retry or RetryPolicy())
+
+
+OK_USERS = FakeApiResponse.success({"users": ["a@example.com"]})
+
+
+def test_json_and_python_paths_agree():
+	payload = {
+		"type": "success",
+		"result": {"rules": [{"prefix": True, "catchall": False, "domainName": "example.com", "matchUser": "", "targetAddresses": ["a@example.com"], "id": 1}]},
+	}
+	raw = FakeApiResponse(payload).content
+
+	assert parse_api_response_json(raw, ListRoutingResponse) == parse_api_response(payload, ListRoutingResponse)
+
+
+def test_json_string_fields_are_still_decoded():
+	res = _api(FakeApiResponse.success({"credit": "19.16"})).post("/checkAccountCredit", EmptyRequest(), CheckCreditResponse)
+
+	assert res.credit == 19.16
+
+
+def test_structured_error_under_non_2xx():
+	with pytest.raises(ApiError) as err:
+		_api(FakeApiResponse({"type": "error", "code": "invalidToken", "message": "Token not valid."}, status_code=401)).post("/listUser", EmptyRequest(), ListUsersResponse)
+
+	assert err.value.code == "invalidToken"
+
+
+def test_non_json_error_body_raises_http_error():
+	with pytest.raises(requests.HTTPError):
+		_api(FakeApiResponse.raw(b"<html>502 Bad Gateway</html>", status_code=502)).post("/listUser", EmptyRequest(), ListUsersResponse)
+
+
+def test_non_json_success_body_raises_validation_error():
+	with pytest.raises(pydantic.ValidationError):
+		_api(FakeApiResponse.raw(b"<html>maintenance</html>", status_code=200)).post("/listUser", EmptyRequest(), ListUsersResponse)
+
+
+def test_json_not_matching_model_is_not_swallowed():
+	# valid JSON under a 5xx: the schema mismatch is reported, not hidden behind the HTTP status
+	with pytest.raises(pydantic.ValidationError):
+		_api(FakeApiResponse({"type": "success", "result": {"users": 1}}, status_code=500)).post("/listUser", EmptyRequest(), ListUsersResponse)
+
+
+def test_transient_failures_are_retried(sleeps):
+	api = _api(
+		FakeApiResponse.raw(b"<html>502 Bad Gateway</html>", status_code=502),
+		requests.ConnectionError("reset by peer"),
+		FakeApiResponse({"type": "error", "code": "rateLimited", "message": "Slow down"}, status_code=200),
+		OK_USERS,
+	)
+
+	assert api.post("/listUser", EmptyRequest(), ListUsersResponse).users == ["a@example.com"]
+	assert api.stats.as_dict() == {"retries": {"listUser": 3}}
+	# every attempt is a call
+	assert api.stats.latencies()[0] == {"listUser": 4}
+	assert len(sleeps) == 3
+
+
+def test_retry_after_is_honoured(sleeps):
+	api = _api(FakeApiResponse.raw(b"busy", status_code=429, headers={"Retry-After": "7"}), OK_USERS)
+
+	api.post("/listUser", EmptyRequest(), ListUsersResponse)
+
+	assert sleeps == [7.0]
+
+
+def test_retry_after_past_max_delay_gives_up(sleeps):
+	api = _api(FakeApiResponse.raw(b"busy", status_code=429, headers={"Retry-After": "3600"}), OK_USERS)
+
+	with pytest.raises(requests.HTTPError):
+		api.post("/listUser", EmptyRequest(), ListUsersResponse)
+	assert sleeps == []
+
+
+def test_retries_are_bounded(sleeps):
+	api = PurelymailAPI("dQw4w9WgXcQ", retry=RetryPolicy(max_retries=2))
+
+	with patch.object(api.session, "post", side_effect=_answers(FakeApiResponse.raw(b"<html>503</html>", status_code=503))) as post, pytest.raises(requests.HTTPError):
+		api.post("/listUser", EmptyRequest(), ListUsersResponse)
+	assert post.call_count == 3
+	assert api.stats.retries == {"listUser": 2}
+
+
+def test_deterministic_errors_are_not_retried(sleeps):
+	with pytest.raises(ApiError):
+		_api(FakeApiResponse.error("Unknown user")).post("/getUser", EmptyRequest(), ListUsersResponse)
+	assert sleeps == []
+
+
+def test_writes_are_not_retried_by_default(sleeps):
+	api = _api(requests.ConnectionError("reset by peer"), FakeApiResponse.success({}))
+
+	with pytest.raises(requests.ConnectionError):
+		api.post("/deleteUser", DeleteUserRequest("a@example.com"), EmptyResponse)
+	assert sleeps == []
+
+
+def test_writes_can_opt_in(sleeps):
+	api = _api(requests.ConnectionError("reset by peer"), FakeApiResponse.success({}), retry=RetryPolicy(per_endpoint={"deleteUser": 1}))
+
+	api.post("/deleteUser", DeleteUserRequest("a@example.com"), EmptyResponse)
+	assert api.stats.retries == {"deleteUser": 1}
+
+
+def test_calls_have_timeouts():
+	api = PurelymailAPI("dQw4w9WgXcQ")
+
+	with patch.object(api.session, "post", side_effect=_answers(OK_USERS)) as post:
+		api.post("/listUser", EmptyRequest(), ListUsersResponse)
+	assert post.call_args.kwargs["timeout"] == (10.0, 60.0)
+
+
+def test_timeouts_are_shortened_to_the_deadline():
+	api = PurelymailAPI("dQw4w9WgXcQ", deadline=time.monotonic() + 5)
+
+	with patch.object(api.session, "post", side_effect=_answers(OK_USERS)) as post:
+		api.post("/listUser", EmptyRequest(), ListUsersResponse)
+	connect, read = post.call_args.kwargs["timeout"]
+	assert 0 < connect <= 5
+	assert 0 < read <= 5
+
+
+def test_expired_deadline_calls_nothing():
+	api = PurelymailAPI("dQw4w9WgXcQ", deadline=time.monotonic() - 1)
+
+	with patch.object(api.session, "post", side_effect=_answers(OK_USERS)) as post, pytest.raises(DeadlineExceeded):
+		api.post("/listUser", EmptyRequest(), ListUsersResponse)
+	post.assert_not_called()
+
+
+def test_no_retry_past_the_deadline(sleeps):
+	api = _api(FakeApiResponse.raw(b"busy", status_code=429, headers={"Retry-After": "20"}), OK_USERS)
+	api.deadline = time.monotonic() + 10
+
+	with pytest.raises(DeadlineExceeded) as err:
+		api.post("/listUser", EmptyRequest(), ListUsersResponse)
+	assert isinstance(err.value.__cause__, requests.HTTPError)
+	assert sleeps == []
+
+
+def test_non_retryable_error_past_the_deadline_is_kept():
+	api = PurelymailAPI("dQw4w9WgXcQ", session=MagicMock())
+	api.deadline = time.monotonic() + 5
+
+	def slow_call(*_, **__):
+		api.deadline = time.monotonic() - 1  # the call used up the time left
+		return FakeApiResponse({"type": "error", "code": "userNotFound", "message": "No such user."}, status_code=400)
+
+	with patch.object(api.session, "post", side_effect=slow_call), pytest.raises(ApiError) as err:
+		api.post("/deleteUser", DeleteUserRequest("a@example.com"), EmptyResponse)
+	assert err.value.code == "userNotFound"
@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.billing_client import BillingClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.domain_client import DomainClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.routing_client import RoutingClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import ListDomainsRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.user_client import UserClient
+from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import FakeApiResponse
+
+
+def test_session_is_configured():
+	api = PurelymailAPI("dQw4w9WgXcQ", pool_size=4, tls_verify=False)
+	adapter = api.session.get_adapter(api.url)
+
+	assert api.session.headers["Purelymail-Api-Token"] == "dQw4w9WgXcQ"
+	assert api.session.verify is False
+	assert adapter._pool_maxsize == 4  # ty:ignore[unresolved-attribute]
+
+
+def test_invalid_pool_size():
+	with pytest.raises(ValueError):
+		PurelymailAPI("dQw4w9WgXcQ", pool_size=0)
+
+
+def test_clients_share_the_session():
+	session = MagicMock()
+	session.post.side_effect = [
+		FakeApiResponse.success({"users": []}),
+		FakeApiResponse.success({"domains": []}),
+		FakeApiResponse.success({"rules": []}),
+		FakeApiResponse.success({"credit": "1.0"}),
+	]
+	api = PurelymailAPI("dQw4w9WgXcQ", session=session)
+
+	UserClient(api).list_users()
+	DomainClient(api).list_domains(ListDomainsRequest(False))
+	RoutingClient(api).list_routing_rules()
+	BillingClient(api).check_account_credit()
+
+	assert [c.args[0] for c in session.post.call_args_list] == [
+		"https://purelymail.com/api/v0/listUser",
+		"https://purelymail.com/api/v0/listDomains",
+		"https://purelymail.com/api/v0/listRoutingRules",
+		"https://purelymail.com/api/v0/checkAccountCredit",
+	]
+
+
+def test_context_manager_closes_session():
+	session = MagicMock()
+	with PurelymailAPI("dQw4w9WgXcQ", session=session) as api:
+		assert api.session is session
+		session.close.assert_not_called()
+
+	session.close.assert_called_once()
@@ -0,0 +1,225 @@
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import ApiDomainDnsSummary, ApiDomainInfo, RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import (
+	AddDomainRequest,
+	CreateAppPasswordRequest,
+	CreateRoutingRequest,
+	CreateUserRequest,
+	DeleteAppPasswordRequest,
+	DeleteDomainRequest,
+	DeletePasswordResetRequest,
+	DeleteRoutingRequest,
+	DeleteUserRequest,
+	GetUserRequest,
+	ListDomainsRequest,
+	ListPasswordResetRequest,
+	ModifyUserRequest,
+	UpdateDomainSettingsRequest,
+	UpsertPasswordResetRequest,
+)
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PlanRejected, PurelymailTwin
+
+
+def _create_user(local: str, domain: str = "example.com", *, recovery_email: str = "", recovery_phone: str = "") -> CreateUserRequest:
+	return CreateUserRequest(
+		user_name=local,
+		domain_name=domain,
+		password="hunter2",
+		enable_password_reset=True,
+		recovery_email=recovery_email,
+		recovery_email_description="",
+		recovery_phone=recovery_phone,
+		recovery_phone_description="",
+		enable_search_indexing=False,
+		send_welcome_email=False,
+	)
+
+
+@pytest.fixture
+def twin():
+	twin = PurelymailTwin.seeded(domains=[ApiDomainInfo("shared.com", False, False, True, ApiDomainDnsSummary(True, True, True, True))])
+	twin.client().add_domain(AddDomainRequest("example.com"))
+	return twin
+
+
+def test_users(twin):
+	client = twin.client()
+	client.create_user(_create_user("alice", recovery_email="alice@backup.com"))
+	client.create_user(_create_user("bob"))
+
+	alice = client.get_user(GetUserRequest("alice@example.com"))
+	assert (alice.enableSearchIndexing, alice.recoveryEnabled, alice.requireTwoFactorAuthentication, alice.enableSpamFiltering) == (False, True, False, True)
+	assert [(m.type, m.target, m.allowMfaReset) for m in alice.resetMethods] == [("email", "alice@backup.com", True)]
+
+	client.modify_user(ModifyUserRequest(user_name="alice@example.com", new_user_name="carol@example.com", require_two_factor_authentication=True))
+	assert client.list_users().users == ["carol@example.com", "bob@example.com"]
+	assert client.get_user(GetUserRequest("carol@example.com")).requireTwoFactorAuthentication
+
+	client.delete_user(DeleteUserRequest("bob@example.com"))
+	assert client.list_users().users == ["carol@example.com"]
+
+
+@pytest.mark.parametrize(
+	("call", "code"),
+	[
+		(lambda c: c.create_user(_create_user("alice")), "userExists"),
+		(lambda c: c.create_user(_create_user("alice", "unknown.com")), "domainNotFound"),
+		(lambda c: c.delete_user(DeleteUserRequest("nobody@example.com")), "userNotFound"),
+		(lambda c: c.modify_user(ModifyUserRequest(user_name="nobody@example.com")), "userNotFound"),
+		(lambda c: c.delete_password_reset(DeletePasswordResetRequest("alice@example.com", "nothing@example.com")), "resetMethodNotFound"),
+		(lambda c: c.delete_app_password(DeleteAppPasswordRequest("alice@example.com", "nope")), "appPasswordNotFound"),
+		(lambda c: c.add_domain(AddDomainRequest("example.com")), "domainExists"),
+		(lambda c: c.update_domain_settings(UpdateDomainSettingsRequest("shared.com", allow_account_reset=True)), "domainNotOwned"),
+		(lambda c: c.delete_domain(DeleteDomainRequest("unknown.com")), "domainNotFound"),
+		(lambda c: c.delete_routing_rule(DeleteRoutingRequest(42)), "routingRuleNotFound"),
+	],
+)
+def test_errors(twin, call, code):
+	client = twin.client()
+	client.create_user(_create_user("alice"))
+	with pytest.raises(ApiError) as err:
+		call(client)
+	assert err.value.code == code
+
+
+def test_rename_onto_existing_user_changes_nothing(twin):
+	client = twin.client()
+	client.create_user(_create_user("alice"))
+	client.create_user(_create_user("bob"))
+
+	with pytest.raises(ApiError, match="already exists"):
+		client.modify_user(ModifyUserRequest(user_name="alice@example.com", new_user_name="bob@example.com", enable_search_indexing=True))
+	assert not client.get_user(GetUserRequest("alice@example.com")).enableSearchIndexing
+
+
+def test_password_reset_methods(twin):
+	client = twin.client()
+	client.create_user(_create_user("alice", recovery_email="old@backup.com", recovery_phone="+33600000000"))
+
+	def targets():
+		return [m.target for m in client.list_password_reset(ListPasswordResetRequest("alice@example.com")).users]
+
+	client.upsert_password_reset(UpsertPasswordResetRequest(user_name="alice@example.com", type="email", target="new@backup.com", existing_target="old@backup.com"))
+	assert targets() == ["new@backup.com", "+33600000000"]
+	client.upsert_password_reset(
+		UpsertPasswordResetRequest(user_name="alice@example.com", type="email", target="new@backup.com", description="updated", existing_target="new@backup.com")
+	)
+	assert targets() == ["new@backup.com", "+33600000000"]
+	assert client.get_user(GetUserRequest("alice@example.com")).resetMethods[0].description == "updated"
+	# without existingTarget an upsert always creates a method, even for a known target
+	client.upsert_password_reset(UpsertPasswordResetRequest(user_name="alice@example.com", type="email", target="new@backup.com"))
+	assert targets() == ["new@backup.com", "+33600000000", "new@backup.com"]
+
+	client.delete_password_reset(DeletePasswordResetRequest("alice@example.com", "+33600000000"))
+	assert targets() == ["new@backup.com", "new@backup.com"]
+	client.delete_password_reset(DeletePasswordResetRequest("alice@example.com"))
+	assert targets() == []
+
+
+def test_app_passwords(twin):
+	client = twin.client()
+	client.create_user(_create_user("alice"))
+
+	password = client.create_app_password(CreateAppPasswordRequest(user_handle="alice@example.com", name="phone")).appPassword
+	assert twin.app_passwords == {"alice@example.com": {password: "phone"}}
+	client.delete_app_password(DeleteAppPasswordRequest("alice@example.com", password))
+	assert twin.app_passwords == {"alice@example.com": {}}
+
+
+def test_routing_rules(twin):
+	client = twin.client()
+	client.create_routing_rule(
+		CreateRoutingRequest(domain_name="example.com", preset="any_address", prefix=True, catchall=False, match_user="", target_addresses=["a@example.com"])
+	)
+	client.create_routing_rule(
+		CreateRoutingRequest(domain_name="example.com", preset="exact_match", prefix=False, catchall=False, match_user="b", target_addresses=["b@example.com"])
+	)
+
+	rules = client.list_routing_rules().rules
+	assert [(r.id, r.preset) for r in rules] == [(1, "any_address"), (2, "exact_match")]
+
+	# no uniqueness constraint: same user/prefix on the domain
+	client.create_routing_rule(
+		CreateRoutingRequest(domain_name="example.com", preset="catchall_except_valid", prefix=True, catchall=True, match_user="", target_addresses=["c@example.com"])
+	)
+	client.delete_routing_rule(DeleteRoutingRequest(1))
+	assert [(r.id, r.preset) for r in client.list_routing_rules().rules] == [(2, "exact_match"), (3, "catchall_except_valid")]
+	with pytest.raises(ApiError, match="does not exist"):
+		client.delete_routing_rule(DeleteRoutingRequest(1))
+
+
+def test_seeded_rules_keep_their_ids():
+	rule = RoutingRule(prefix=True, catchall=False, domain_name="example.com", match_user="", target_addresses=["a@example.com"], id=41)
+	client = PurelymailTwin.seeded(rules=[rule], enforce_domains=False).client()
+	client.create_routing_rule(
+		CreateRoutingRequest(domain_name="example.com", preset="exact_match", prefix=False, catchall=False, match_user="b", target_addresses=["b@example.com"])
+	)
+
+	assert [r.id for r in client.list_routing_rules().rules] == [41, 42]
+
+
+def test_domains(twin):
+	client = twin.client()
+	assert [d.name for d in client.list_domains(ListDomainsRequest(True)).domains] == ["shared.com", "example.com"]
+	assert client.list_domains(ListDomainsRequest(False)).domains == [ApiDomainInfo.DEFAULT("example.com")]
+
+	client.update_domain_settings(UpdateDomainSettingsRequest("example.com", symbolic_subaddressing=False, recheck_dns=True))
+	assert not client.list_domains(ListDomainsRequest(False)).domains[0].symbolicSubaddressing
+	assert client.get_ownership_code().value == "twin"
+
+
+def test_delete_domain_cascades(twin):
+	client = twin.client()
+	client.add_domain(AddDomainRequest("other.com"))
+	client.create_user(_create_user("alice"))
+	client.create_user(_create_user("alice", "other.com"))
+	client.create_routing_rule(CreateRoutingRequest(domain_name="example.com", preset="any_address", prefix=True, catchall=False, match_user="", target_addresses=["a@other.com"]))
+
+	client.delete_domain(DeleteDomainRequest("example.com"))
+
+	assert client.list_users().users == ["alice@other.com"]
+	assert client.list_routing_rules().rules == []
+
+
+def test_credit():
+	twin = PurelymailTwin(credit="12.50")
+	assert twin.client().check_account_credit().credit == 12.5
+
+
+def test_returns_copies(twin):
+	client = twin.client()
+	client.create_user(_create_user("alice"))
+
+	twin.handle("getUser", {"userName": "alice@example.com"})["resetMethods"].append("garbage")
+	assert client.get_user(GetUserRequest("alice@example.com")).resetMethods == []
+
+
+def test_invalid_requests(twin):
+	assert twin.respond("https://purelymail.com/api/v0/nothing", {}).content == b'{"type": "error", "code": "unknownEndpoint", "message": "No such endpoint: nothing"}'
+	assert b'"invalidRequest"' in twin.respond("https://purelymail.com/api/v0/deleteUser", None).content
+
+
+def test_replay():
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None}, enforce_domains=False)
+	operations = [
+		Operation("delete_user", "alice@example.com", DeleteUserRequest("alice@example.com")),
+		Operation("create_user", "bob@example.com", _create_user("bob")),
+	]
+
+	assert twin.replay(operations).list_users().users == ["bob@example.com"]
+	assert twin.calls == ["deleteUser", "createUser", "listUser"]
+
+
+def test_replay_rejects_plan():
+	twin = PurelymailTwin()
+	operations = [
+		Operation("delete_user", "alice@example.com", DeleteUserRequest("alice@example.com"), label="alice"),
+		Operation("create_user", "bob@example.com", _create_user("bob")),
+	]
+
+	with pytest.raises(PlanRejected, match=r"Planned delete_user of alice would fail: \[userNotFound\]"):
+		_ = twin.replay(operations)
+	assert twin.calls == ["deleteUser"]
@@ -0,0 +1,58 @@
+import random
+from datetime import UTC, datetime
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.retry import RetryPolicy, parse_retry_after
+
+NOW = datetime(2025, 1, 1, 12, 0, 0, tzinfo=UTC)
+
+
+@pytest.mark.parametrize(
+	("header", "expected"),
+	[
+		(None, None),
+		("120", 120.0),
+		(" 3 ", 3.0),
+		("Wed, 01 Jan 2025 12:00:30 GMT", 30.0),
+		("Wed, 01 Jan 2025 11:00:00 GMT", 0.0),
+		("soon", None),
+	],
+)
+def test_parse_retry_after(header, expected):
+	assert parse_retry_after(header, NOW) == expected
+
+
+def test_only_idempotent_reads_are_retried_by_default():
+	policy = RetryPolicy(max_retries=4, per_endpoint={"getUser": 1, "createUser": 2})
+
+	assert policy.retries_for("listUser") == 4
+	assert policy.retries_for("getUser") == 1
+	assert policy.retries_for("createUser") == 2
+	assert policy.retries_for("deleteUser") == 0
+
+
+def test_classification():
+	policy = RetryPolicy()
+
+	assert policy.is_retryable(None, None)
+	assert policy.is_retryable(503, None)
+	assert policy.is_retryable(200, "rateLimited")
+	assert not policy.is_retryable(200, "internalError")
+	assert not policy.is_retryable(401, "invalidToken")
+
+
+def test_decorrelated_jitter_stays_within_bounds():
+	policy = RetryPolicy(base_delay=0.5, max_delay=10.0, rng=random.Random(42))
+
+	delay = 0.0
+	for _ in range(100):
+		nxt = policy.backoff(delay)
+		assert 0.5 <= nxt <= max(0.5, min(10.0, delay * 3))
+		delay = nxt
+
+
+@pytest.mark.parametrize("kwargs", [{"max_retries": -1}, {"per_endpoint": {"getUser": -1}}, {"base_delay": 0}, {"base_delay": 5, "max_delay": 1}])
+def test_invalid_policy(kwargs):
+	with pytest.raises(ValueError):
+		RetryPolicy(**kwargs)
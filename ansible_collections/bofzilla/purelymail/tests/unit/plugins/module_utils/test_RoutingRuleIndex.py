@@ -0,0 +1,38 @@
+import itertools
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import PRESET_MAP, RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.routing_index import RoutingRuleIndex, match_key
+
+
+def _rule(id: int, domain: str, match_user: str, prefix: bool, catchall: bool, targets: tuple[str, ...] = ("t@example.org",)) -> RoutingRule:
+	return RoutingRule(prefix=prefix, catchall=catchall, domain_name=domain, match_user=match_user, target_addresses=list(targets), id=id)
+
+
+@pytest.mark.parametrize(("match_user", "prefix", "catchall"), list(itertools.product(["", "admin"], [True, False], [True, False])))
+def test_preset_lookup_matches_preset_map(match_user, prefix, catchall):
+	rule = _rule(1, "example.com", match_user, prefix, catchall)
+	# first PRESET_MAP entry whose values all match, like the UI does
+	expected = next((p for p, values in PRESET_MAP.items() if all(getattr(rule, f) == v for f, v in values.items())), None)
+
+	assert rule.preset == expected
+
+
+def test_buckets():
+	rules = [
+		_rule(1, "a.com", "", True, False),
+		_rule(2, "a.com", "", True, True),
+		_rule(3, "a.com", "admin", False, False),
+		_rule(4, "b.com", "admin", False, False),
+		_rule(5, "a.com", "admin", False, False, ("other@example.org",)),
+	]
+
+	index = RoutingRuleIndex(rules)
+
+	assert index.presets == ["any_address", "catchall_except_valid", "exact_match", "exact_match", "exact_match"]
+	assert index.by_domain == {"a.com": [0, 1, 2, 4], "b.com": [3]}
+	assert index.by_match[match_key(rules[2])] == [2, 4]
+	assert index.exclusive("a.com") == [0, 1]
+	assert index.exclusive("b.com") == []
+	assert index.exclusive("unknown.com") == []
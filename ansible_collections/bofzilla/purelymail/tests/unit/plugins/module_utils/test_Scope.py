@@ -0,0 +1,70 @@
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import ModifyUserRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import Operation, OperationResult
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.scope import Scope, retry_scope, shard_of
+
+NAMES = [f"user{i}@example{i % 7}.com" for i in range(2_000)]
+
+
+def test_unbounded():
+	scope = Scope.from_params(None)
+	assert all(scope.contains(name) for name in NAMES)
+
+
+def test_domains():
+	scope = Scope.from_params({"domains": ["example1.com", "example2.com"]})
+	assert scope.contains("a@example1.com")
+	assert scope.contains("example2.com")
+	assert not scope.contains("a@example3.com")
+	assert not scope.contains("a@sub.example1.com")
+
+
+def test_patterns():
+	scope = Scope.from_params({"patterns": ["support-*", "*@example.org"]})
+	assert scope.contains("support-fr@example.com")
+	assert scope.contains("alice@example.org")
+	assert not scope.contains("alice@example.com")
+	assert not scope.contains("Support-fr@example.com")
+
+
+def test_selectors_combine():
+	scope = Scope.from_params({"domains": ["example1.com"], "patterns": ["user1*"], "shard": "1/1"})
+	assert [n for n in NAMES if scope.contains(n)] == [n for n in NAMES if n.endswith("@example1.com") and n.startswith("user1")]
+
+
+@pytest.mark.parametrize("count", [1, 2, 8])
+def test_shards_partition(count):
+	shards = [Scope.from_params({"shard": f"{i}/{count}"}) for i in range(1, count + 1)]
+	owners = [[s for s in shards if s.contains(name)] for name in NAMES]
+	assert all(len(o) == 1 for o in owners)
+	sizes = [sum(s.contains(name) for name in NAMES) for s in shards]
+	assert min(sizes) > len(NAMES) / count * 0.8
+
+
+def test_shard_is_stable():
+	# pinned: the same on every host and every run (no per-process hash seed), changing it reshuffles every deployment
+	assert [shard_of(f"user{i}@example.com", 8) for i in range(5)] == [1, 2, 4, 8, 7]
+
+
+@pytest.mark.parametrize("shard", ["0/8", "9/8", "3", "a/8", "3/0", "-1/8"])
+def test_invalid_shard(shard):
+	with pytest.raises(ValueError, match="scope.shard must be 'i/N'"):
+		Scope.from_params({"shard": shard})
+
+
+def test_retry_scope():
+	results = [
+		OperationResult(Operation("create_user", "ok@example.com", None), "ok"),
+		OperationResult(Operation("create_user", "[ops]*@example.com", None), "failed"),
+		OperationResult(Operation("modify_user", "new@example.com", ModifyUserRequest(user_name="old@example.com", new_user_name="new@example.com")), "skipped"),
+		OperationResult(Operation("create_user", "done@example.com", None), "resumed"),
+	]
+
+	scope = Scope.from_params(retry_scope(results))
+
+	assert [name for name in ("ok@example.com", "[ops]*@example.com", "new@example.com", "old@example.com", "o@example.com") if scope.contains(name)] == [
+		"[ops]*@example.com",
+		"new@example.com",
+		"old@example.com",
+	]
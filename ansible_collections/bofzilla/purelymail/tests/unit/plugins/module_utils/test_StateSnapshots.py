@@ -0,0 +1,72 @@
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import GetUserPasswordResetMethod
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import GetUserResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.state_cache import StateSnapshots
+
+ALICE = GetUserResponse(
+	enableSearchIndexing=True,
+	recoveryEnabled=True,
+	requireTwoFactorAuthentication=False,
+	enableSpamFiltering=True,
+	resetMethods=[GetUserPasswordResetMethod("email", "r@example.com", "backup", True)],
+)
+
+
+@pytest.fixture
+def path(tmp_path):
+	return str(tmp_path / "state.json")
+
+
+def _load(path: str, max_age: float = 60.0, token: str = "token") -> StateSnapshots[GetUserResponse]:
+	return StateSnapshots.load(path, "getUser", token, GetUserResponse, max_age)
+
+
+def test_round_trip(path):
+	snapshots = _load(path)
+	snapshots.remember("alice@example.com", ALICE, at=1_000.0)
+	snapshots.save()
+
+	assert _load(path).get("alice@example.com", now=1_030.0) == ALICE
+
+
+def test_expiry_and_hit_rate(path):
+	snapshots = _load(path)
+	snapshots.remember("alice@example.com", ALICE, at=1_000.0)
+	assert snapshots.hit_rate() is None
+
+	assert snapshots.get("alice@example.com", now=1_060.0) == ALICE
+	assert snapshots.get("alice@example.com", now=1_061.0) is None
+	assert snapshots.get("bob@example.com", now=1_000.0) is None
+	assert (snapshots.hits, snapshots.misses, snapshots.hit_rate()) == (1, 2, 0.3333)
+
+
+def test_fresh_isnt_counted(path):
+	snapshots = _load(path)
+	snapshots.remember("alice@example.com", ALICE, at=1_000.0)
+	assert snapshots.fresh("alice@example.com", now=1_000.0)
+	assert (snapshots.hits, snapshots.misses) == (0, 0)
+
+
+def test_invalidate_and_prune(path):
+	snapshots = _load(path)
+	for name in ("alice@example.com", "bob@example.com", "carol@example.org"):
+		snapshots.remember(name, ALICE, at=1_000.0)
+	snapshots.save()
+
+	snapshots = _load(path)
+	snapshots.invalidate("alice@example.com")
+	snapshots.prune(lambda name: name.endswith("@example.org"))
+	snapshots.save()
+	assert list(_load(path).entries) == ["bob@example.com"]
+
+
+def test_runs_merge_and_accounts_are_separate(path):
+	first, second = _load(path), _load(path)
+	first.remember("alice@example.com", ALICE, at=1_000.0)
+	second.remember("bob@example.com", ALICE, at=1_000.0)
+	first.save()
+	second.save()
+
+	assert sorted(_load(path).entries) == ["alice@example.com", "bob@example.com"]
+	assert _load(path, token="other").entries == {}
@@ -0,0 +1,183 @@
+import threading
+import time
+from unittest.mock import ANY, MagicMock
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import DeadlineExceeded
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.operations import ApplyInterrupted, Operation, apply_operations, plan_operations
+
+OPERATIONS = [
+	Operation("delete_user", "a@example.com", "req-a"),
+	Operation("create_user", "b@example.com", "req-b"),
+	Operation("modify_user", "c@example.com", "req-c", label="c"),
+]
+
+
+def test_runs_in_order():
+	client = MagicMock()
+
+	results = apply_operations(client, OPERATIONS)
+
+	assert [c[0] for c in client.method_calls] == ["delete_user", "create_user", "modify_user"]
+	client.create_user.assert_called_once_with("req-b")
+	assert [r.as_display() for r in results] == [
+		{"method": "delete_user", "target": "a@example.com", "status": "ok", "duration": ANY},
+		{"method": "create_user", "target": "b@example.com", "status": "ok", "duration": ANY},
+		{"method": "modify_user", "target": "c", "status": "ok", "duration": ANY},
+	]
+
+
+def test_plan_runs_nothing():
+	assert [r.as_display()["status"] for r in plan_operations(OPERATIONS)] == ["planned"] * 3
+
+
+def test_failure_reports_completed_and_pending():
+	client = MagicMock()
+	client.create_user.side_effect = DeadlineExceeded("Deadline exceeded, createUser not called")
+
+	with pytest.raises(ApplyInterrupted) as err:
+		apply_operations(client, OPERATIONS)
+
+	client.modify_user.assert_not_called()
+	assert err.value.msg == "DeadlineExceeded: Deadline exceeded, createUser not called"
+	assert err.value.as_result() == {
+		"changed": True,
+		"completed": [{"method": "delete_user", "target": "a@example.com"}],
+		"pending": [{"method": "create_user", "target": "b@example.com"}, {"method": "modify_user", "target": "c"}],
+		"operations": [
+			{"method": "delete_user", "target": "a@example.com", "status": "ok", "duration": ANY},
+			{"method": "create_user", "target": "b@example.com", "status": "failed", "duration": ANY},
+			{"method": "modify_user", "target": "c", "status": "skipped", "duration": None},
+		],
+		"failed": [{"method": "create_user", "target": "b@example.com", "error": "DeadlineExceeded: Deadline exceeded, createUser not called"}],
+	}
+
+
+def test_api_error_message_is_kept():
+	client = MagicMock()
+	client.delete_user.side_effect = ApiError("error", "internalError", "boom")
+
+	with pytest.raises(ApplyInterrupted) as err:
+		apply_operations(client, OPERATIONS)
+
+	assert err.value.msg == "Purelymail API error: [internalError] boom"
+	assert err.value.as_result()["changed"] is False
+
+
+class RecordingClient:
+	"""Every method sleeps a bit and records (key, step), tracking how many calls overlap."""
+
+	def __init__(self, fail: tuple[str, str] | None = None):
+		self.calls: list[tuple[str, str]] = []
+		self.in_flight = 0
+		self.max_in_flight = 0
+		self.fail = fail
+		self._lock = threading.Lock()
+
+	def step(self, request: tuple[str, str]) -> None:
+		with self._lock:
+			self.in_flight += 1
+			self.max_in_flight = max(self.max_in_flight, self.in_flight)
+		time.sleep(0.01)
+		with self._lock:
+			self.in_flight -= 1
+			self.calls.append(request)
+		if request == self.fail:
+			raise ApiError("error", "internalError", f"{request} failed")
+
+
+def _chains(keys: int, steps: list[str]) -> list[Operation]:
+	# Plan order is phase by phase like the modules do: every key's 1st step, then every key's 2nd step...
+	return [Operation("step", f"user{k}", (f"user{k}", step)) for step in steps for k in range(keys)]
+
+
+def test_concurrent_keys_keep_their_order():
+	client = RecordingClient()
+	steps = ["create", "modify", "delete_reset", "upsert_reset"]
+
+	results = apply_operations(client, _chains(8, steps), concurrency=4)
+
+	assert client.max_in_flight > 1
+	assert client.max_in_flight <= 4
+	for k in range(8):
+		assert [step for key, step in client.calls if key == f"user{k}"] == steps
+	assert [r.operation.request for r in results] == [(f"user{k}", step) for step in steps for k in range(8)]
+	assert all(r.status == "ok" for r in results)
+
+
+def test_concurrent_failure_stops_starting_operations():
+	client = RecordingClient(fail=("user0", "create"))
+
+	with pytest.raises(ApplyInterrupted) as err:
+		apply_operations(client, _chains(2, ["create", "modify"]) + _chains(30, ["create"])[2:], concurrency=2)
+
+	statuses = {r.operation.request: r.status for r in err.value.results}
+	assert statuses[("user0", "create")] == "failed"
+	assert statuses[("user0", "modify")] == "skipped"
+	assert list(statuses.values()).count("skipped") > 10
+
+
+def test_invalid_concurrency():
+	with pytest.raises(ValueError):
+		apply_operations(MagicMock(), OPERATIONS, concurrency=0)
+
+
+def test_resumes_and_records():
+	client = MagicMock()
+	events = []
+
+	results = apply_operations(client, OPERATIONS, completed={0}, record=lambda idx, event: events.append((idx, event)))
+
+	client.delete_user.assert_not_called()
+	assert [r.status for r in results] == ["resumed", "ok", "ok"]
+	assert events == [(1, "start"), (1, "done"), (2, "start"), (2, "done")]
+
+
+def test_failed_operation_is_only_started():
+	client = MagicMock()
+	client.create_user.side_effect = ApiError("error", "internalError", "boom")
+	events = []
+
+	with pytest.raises(ApplyInterrupted) as err:
+		apply_operations(client, OPERATIONS, completed={0}, record=lambda idx, event: events.append((idx, event)))
+
+	assert events == [(1, "start")]
+	assert err.value.as_result()["completed"] == [{"method": "delete_user", "target": "a@example.com"}]
+
+
+def test_continue_skips_only_the_failed_keys():
+	client = RecordingClient(fail=("user0", "create"))
+	operations = _chains(3, ["create", "modify"])
+
+	with pytest.raises(ApplyInterrupted) as err:
+		apply_operations(client, operations, on_error="continue")
+
+	statuses = {r.operation.request: r.status for r in err.value.results}
+	assert statuses == {
+		("user0", "create"): "failed",
+		("user1", "create"): "ok",
+		("user2", "create"): "ok",
+		("user0", "modify"): "skipped",
+		("user1", "modify"): "ok",
+		("user2", "modify"): "ok",
+	}
+	assert err.value.failed == [err.value.results[0]]
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_continue_reports_every_failure(concurrency: int):
+	client = MagicMock()
+	client.delete_user.side_effect = ApiError("error", "internalError", "boom")
+	client.modify_user.side_effect = ApiError("error", "userNotFound", "no c")
+
+	with pytest.raises(ApplyInterrupted) as err:
+		apply_operations(client, OPERATIONS, concurrency, on_error="continue")
+
+	client.create_user.assert_called_once_with("req-b")
+	assert err.value.msg == "2 operations failed, the first one with Purelymail API error: [internalError] boom"
+	assert err.value.as_result()["failed"] == [
+		{"method": "delete_user", "target": "a@example.com", "error": "Purelymail API error: [internalError] boom"},
+		{"method": "modify_user", "target": "c", "error": "Purelymail API error: [userNotFound] no c"},
+	]
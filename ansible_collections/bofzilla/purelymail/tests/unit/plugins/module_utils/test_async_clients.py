@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients import base_client
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import AsyncPurelymailAPI, DeadlineExceeded
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.billing_client import AsyncBillingClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.domain_client import AsyncDomainClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.retry import RetryPolicy
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.routing_client import AsyncRoutingClient
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import GetUserRequest, ListDomainsRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import GetUserResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.user_client import AsyncUserClient
+
+USER = {"enableSearchIndexing": True, "enableSpamFiltering": True, "recoveryEnabled": False, "requireTwoFactorAuthentication": False, "resetMethods": []}
+RESULTS = {
+	"listUser": {"users": ["a@example.com"]},
+	"getUser": USER,
+	"listDomains": {"domains": []},
+	"listRoutingRules": {"rules": []},
+	"checkAccountCredit": {"credit": "1.5"},
+}
+
+
+def _handler(request: "httpx.Request") -> "httpx.Response":
+	assert request.headers["Purelymail-Api-Token"] == "dQw4w9WgXcQ"
+	endpoint = request.url.path.rsplit("/", 1)[-1]
+	if json.loads(request.content).get("userName") == "unknown@example.com":
+		return httpx.Response(200, json={"type": "error", "code": "internalError", "message": "Unknown user"})
+	return httpx.Response(200, json={"type": "success", "result": RESULTS[endpoint]})
+
+
+def _api() -> AsyncPurelymailAPI:
+	return AsyncPurelymailAPI("dQw4w9WgXcQ", client=httpx.AsyncClient(transport=httpx.MockTransport(_handler)))
+
+
+def test_async_clients_share_types():
+	async def scenario():
+		async with _api() as api:
+			users, domains, rules, credit = await asyncio.gather(
+				AsyncUserClient(api).list_users(),
+				AsyncDomainClient(api).list_domains(ListDomainsRequest(False)),
+				AsyncRoutingClient(api).list_routing_rules(),
+				AsyncBillingClient(api).check_account_credit(),
+			)
+		return users, domains, rules, credit
+
+	users, domains, rules, credit = asyncio.run(scenario())
+	assert users.users == ["a@example.com"]
+	assert domains.domains == []
+	assert rules.rules == []
+	assert credit.credit == 1.5
+
+
+def test_async_fan_out():
+	async def scenario():
+		async with _api() as api:
+			client = AsyncUserClient(api)
+			return await asyncio.gather(*(client.get_user(GetUserRequest(f"user{i}@example.com")) for i in range(50)))
+
+	res = asyncio.run(scenario())
+	assert len(res) == 50
+	assert all(isinstance(u, GetUserResponse) for u in res)
+
+
+def test_async_api_error():
+	async def scenario():
+		async with _api() as api:
+			return await AsyncUserClient(api).get_user(GetUserRequest("unknown@example.com"))
+
+	with pytest.raises(ApiError):
+		asyncio.run(scenario())
+
+
+def test_async_non_json_error_body():
+	api = AsyncPurelymailAPI(
+		"dQw4w9WgXcQ",
+		retry=RetryPolicy(max_retries=0),
+		client=httpx.AsyncClient(transport=httpx.MockTransport(lambda _: httpx.Response(502, content=b"Bad Gateway"))),
+	)
+
+	with pytest.raises(httpx.HTTPStatusError):
+		asyncio.run(AsyncUserClient(api).list_users())
+
+
+def test_async_retries_transient_failures(monkeypatch):
+	slept: list[float] = []
+
+	async def sleep(delay: float) -> None:
+		slept.append(delay)
+
+	monkeypatch.setattr(base_client.asyncio, "sleep", sleep)
+	responses = iter([httpx.Response(503, content=b"Unavailable", headers={"Retry-After": "2"}), httpx.Response(200, json={"type": "success", "result": RESULTS["listUser"]})])
+	api = AsyncPurelymailAPI("dQw4w9WgXcQ", client=httpx.AsyncClient(transport=httpx.MockTransport(lambda _: next(responses))))
+
+	assert asyncio.run(AsyncUserClient(api).list_users()).users == ["a@example.com"]
+	assert slept == [2.0]
+	assert api.stats.as_dict() == {"retries": {"listUser": 1}}
+
+
+def test_async_deadline():
+	api = _api()
+	api.deadline = time.monotonic() - 1
+
+	with pytest.raises(DeadlineExceeded):
+		asyncio.run(AsyncUserClient(api).list_users())
@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.concurrency import Prefetcher, fetch_all
+
+KEYS = [f"user{i}@example.com" for i in range(40)]
+
+
+def test_serial():
+	assert fetch_all(str.upper, KEYS) == {k: k.upper() for k in KEYS}
+
+
+def test_result_order_is_deterministic():
+	def fetch(key: str) -> str:
+		time.sleep(random.random() / 100)
+		return key.upper()
+
+	res = fetch_all(fetch, KEYS, concurrency=8)
+	assert list(res) == KEYS
+	assert list(res.values()) == [k.upper() for k in KEYS]
+
+
+def test_bounded_concurrency():
+	in_flight = 0
+	peak = 0
+	lock = threading.Lock()
+
+	def fetch(key: str) -> str:
+		nonlocal in_flight, peak
+		with lock:
+			in_flight += 1
+			peak = max(peak, in_flight)
+		time.sleep(0.005)
+		with lock:
+			in_flight -= 1
+		return key
+
+	_ = fetch_all(fetch, KEYS, concurrency=4)
+	assert 1 < peak <= 4
+
+
+def test_fail_fast():
+	calls = []
+
+	def fetch(key: str) -> str:
+		calls.append(key)
+		if key == KEYS[0]:
+			raise ApiError("error", "internalError", f"Unknown user {key}")
+		time.sleep(0.01)
+		return key
+
+	with pytest.raises(ApiError):
+		fetch_all(fetch, KEYS, concurrency=2)
+
+	assert len(calls) < len(KEYS)
+
+
+def test_invalid_concurrency():
+	with pytest.raises(ValueError):
+		fetch_all(str.upper, KEYS, concurrency=0)
+
+
+def test_prefetch_reuses_speculative_calls():
+	calls = []
+	lock = threading.Lock()
+
+	def fetch(key: str) -> str:
+		with lock:
+			calls.append(key)
+		return key.upper()
+
+	with Prefetcher(fetch, 4) as prefetch:
+		prefetch.speculate(KEYS[:10])
+		res = prefetch.fetch_all(KEYS[5:20])
+
+	assert list(res) == KEYS[5:20]
+	assert list(res.values()) == [k.upper() for k in KEYS[5:20]]
+	# every key fetched once, unneeded guesses either cancelled or counted as wasted
+	assert sorted(calls) == sorted(set(calls))
+	assert set(KEYS[5:20]) <= set(calls)
+	assert prefetch.wasted == len(set(calls) - set(KEYS[5:20]))
+
+
+def test_prefetch_discards_errors_of_unneeded_guesses():
+	def fetch(key: str) -> str:
+		if key == "missing@example.com":
+			raise ApiError("error", "internalError", f"Unknown user {key}")
+		return key
+
+	with Prefetcher(fetch, 2) as prefetch:
+		prefetch.speculate(["missing@example.com", KEYS[0]])
+		time.sleep(0.01)  # let the guesses run
+		assert prefetch.fetch_all([KEYS[0], KEYS[1]]) == {KEYS[0]: KEYS[0], KEYS[1]: KEYS[1]}
+	assert prefetch.wasted == 1
+
+
+def test_prefetch_raises_errors_of_needed_keys():
+	def fetch(key: str) -> str:
+		raise ApiError("error", "internalError", f"Unknown user {key}")
+
+	with Prefetcher(fetch, 2) as prefetch:
+		prefetch.speculate(KEYS[:1])
+		with pytest.raises(ApiError):
+			prefetch.fetch_all(KEYS[:3])
+
+
+def test_prefetch_speculates_while_caller_works():
+	started = threading.Event()
+
+	def fetch(key: str) -> str:
+		started.set()
+		return key
+
+	with Prefetcher(fetch) as prefetch:
+		prefetch.speculate(KEYS[:1])
+		assert started.wait(1)  # running before fetch_all is called
+		assert prefetch.fetch_all(KEYS[:1]) == {KEYS[0]: KEYS[0]}
+
+
+def test_prefetch_requires_positive_concurrency():
+	with pytest.raises(ValueError, match="concurrency must be >= 1"):
+		Prefetcher(str.upper, 0)
@@ -0,0 +1,36 @@
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.routing_plan import plan_routing
+
+
+def _rule(id: int, match_user: str, targets: list[str], domain: str = "example.com") -> RoutingRule:
+	return RoutingRule(prefix=False, catchall=False, domain_name=domain, match_user=match_user, target_addresses=targets, id=id)
+
+
+EXISTING = [_rule(1, "a", ["x@t.org", "y@t.org"]), _rule(2, "b", ["x@t.org"]), _rule(3, "c", ["x@t.org"], domain="other.com")]
+
+
+def test_target_order_is_ignored():
+	plan = plan_routing([_rule(9, "a", ["y@t.org", "x@t.org"]), _rule(9, "b", ["x@t.org"])], EXISTING, prune=lambda r: r.domainName == "example.com")
+
+	assert plan.delete == []
+	assert plan.create == []
+	assert plan.steps == []
+	assert plan.avoided_calls == {"deleteRoutingRule": 1, "createRoutingRule": 1}
+
+
+def test_duplicates_are_created_once():
+	new = [_rule(9, "n", ["x@t.org", "y@t.org"]), _rule(9, "n", ["y@t.org", "x@t.org"])]
+
+	plan = plan_routing(new, [], prune=lambda _: True)
+
+	assert plan.create == [new[0]]
+	assert plan.avoided_calls == {"deleteRoutingRule": 0, "createRoutingRule": 1}
+
+
+def test_deletes_are_followed_by_their_replacement():
+	new_b = _rule(9, "b", ["z@t.org"])
+	new_d = _rule(9, "d", ["z@t.org"])
+
+	plan = plan_routing([new_d, new_b], EXISTING, prune=lambda r: r.domainName == "example.com")
+
+	assert plan.steps == [("delete", EXISTING[0]), ("delete", EXISTING[1]), ("create", new_b), ("create", new_d)]
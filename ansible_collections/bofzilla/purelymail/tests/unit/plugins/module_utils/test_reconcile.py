@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.reconcile import reconcile
+
+
+def test_sets():
+	desired = [("a", 1), ("b", 2), ("c", 3)]
+	existing = [("b", 2), ("c", 0), ("d", 4)]
+
+	plan = reconcile(desired, existing, key=lambda e: e[0], differs=lambda d, e: d[1] != e[1])
+
+	assert plan.create == [("a", 1)]
+	assert plan.update == [(("c", 3), ("c", 0))]
+	assert plan.unchanged == [(("b", 2), ("b", 2))]
+	assert plan.delete == [("d", 4)]
+
+
+def test_prune():
+	existing = ["keep@a.com", "drop@b.com"]
+
+	assert reconcile([], existing, key=str, prune=False).delete == []
+	assert reconcile([], existing, key=str, prune=lambda e: e.endswith("@b.com")).delete == ["drop@b.com"]
+
+
+def test_existing_key_and_duplicates():
+	existing = [("x", 1), ("x", 2), ("y", 3), ("y", 4)]
+
+	plan = reconcile(["x"], existing, key=str, existing_key=lambda e: e[0])
+
+	# first existing entry is the match, its duplicates aren't deleted either
+	assert plan.unchanged == [("x", ("x", 1))]
+	assert plan.delete == [("y", 3), ("y", 4)]
+
+
+class Counting:
+	def __init__(self, fn):
+		self.fn = fn
+		self.calls = 0
+
+	def __call__(self, *args):
+		self.calls += 1
+		return self.fn(*args)
+
+
+@pytest.mark.parametrize("size", [10_000, 100_000])
+def test_scales_linearly(size):
+	desired = [(f"user{i}@example.com", i % 3) for i in range(0, size)]
+	existing = [(f"user{i}@example.com", i % 2) for i in range(size // 2, size + size // 2)]
+	key = Counting(lambda e: e[0])
+	differs = Counting(lambda d, e: d[1] != e[1])
+
+	start = time.perf_counter()
+	plan = reconcile(desired, existing, key=key, differs=differs)
+	elapsed = time.perf_counter() - start
+
+	assert len(plan.create) == size // 2
+	assert len(plan.delete) == size // 2
+	assert len(plan.update) + len(plan.unchanged) == size // 2
+	# each entry hashed once for the index and once for its lookup / delete check, each pair compared once
+	assert key.calls == 3 * size
+	assert differs.calls == size // 2
+	# nested scans would take minutes, generous bound for slow CI runners
+	assert elapsed < size / 10_000
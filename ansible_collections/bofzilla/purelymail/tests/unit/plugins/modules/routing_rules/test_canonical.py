@@ -1,4 +1,5 @@
 import functools
+from unittest.mock import ANY
 
 import pytest
 
@@ -54,7 +55,15 @@ def test_absent_canonical_means_canonical_for_all(run):
 	data, mocks = run([], canonical=None)
 
 	assert mocks["RoutingClient"].delete_routing_rule.call_count == 2
-	assert data == {"changed": True, "rules": []}
+	assert data == {
+		"stats": ANY,
+		"operations": [
+			{"method": "delete_routing_rule", "target": "toto*@toto.com -> admin@toto.com", "status": "ok", "duration": ANY},
+			{"method": "delete_routing_rule", "target": "admin*@example.com -> support@example.com", "status": "ok", "duration": ANY},
+		],
+		"changed": True,
+		"rules": [],
+	}
 
 
 def test_canonical_empty_list_disables_prune(run):
@@ -62,6 +71,8 @@ def test_canonical_empty_list_disables_prune(run):
 
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": [],
 		"changed": False,
 		"rules": [
 			{"prefix": True, "catchall": False, "domainName": "toto.com", "matchUser": "toto", "targetAddresses": ["admin@toto.com"], "preset": "prefix_match"},
@@ -76,6 +87,11 @@ def test_canonical_subset_only_prunes_for_that_domain(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_called_once()
 	mocks["RoutingClient"].create_routing_rule.assert_called_once()
 	assert data == {
+		"stats": ANY,
+		"operations": [
+			{"method": "delete_routing_rule", "target": "toto*@toto.com -> admin@toto.com", "status": "ok", "duration": ANY},
+			{"method": "create_routing_rule", "target": "newuser@toto.com -> helpdesk@toto.com", "status": "ok", "duration": ANY},
+		],
 		"changed": True,
 		"rules": [
 			{"prefix": True, "catchall": False, "domainName": "example.com", "matchUser": "admin", "targetAddresses": ["support@example.com"], "preset": "prefix_match"},
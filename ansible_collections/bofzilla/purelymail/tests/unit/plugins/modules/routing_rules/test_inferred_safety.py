@@ -1,4 +1,5 @@
 import functools
+from unittest.mock import ANY
 
 import pytest
 
@@ -58,6 +59,11 @@ def test_conflict_any_rule_canonical(run):
 	)
 
 	assert data == {
+		"stats": ANY,
+		"operations": [
+			{"method": "delete_routing_rule", "target": "*@example.com -> admin@example.com", "status": "ok", "duration": ANY},
+			{"method": "create_routing_rule", "target": "*@example.com -> ", "status": "ok", "duration": ANY},
+		],
 		"changed": True,
 		"rules": [
 			{"prefix": False, "catchall": False, "domainName": "toto.com", "matchUser": "toto", "targetAddresses": ["admin@toto.com"], "preset": "exact_match"},
@@ -78,6 +84,11 @@ def test_can_safely_add_restricted_preset_to_other_domain(run):
 	)
 
 	assert data == {
+		"stats": ANY,
+		"operations": [
+			{"method": "create_routing_rule", "target": "*@toto.com -> ", "status": "ok", "duration": ANY},
+			{"method": "create_routing_rule", "target": "*@valid.com -> ", "status": "ok", "duration": ANY},
+		],
 		"changed": True,
 		"rules": [
 			{"prefix": True, "catchall": False, "domainName": "example.com", "matchUser": "", "targetAddresses": ["admin@example.com"], "preset": "any_address"},
@@ -97,6 +108,11 @@ def test_conflict_catchall_rule_canonical(run):
 	)
 
 	assert data == {
+		"stats": ANY,
+		"operations": [
+			{"method": "delete_routing_rule", "target": "*@example.com -> admin@example.com", "status": "ok", "duration": ANY},
+			{"method": "create_routing_rule", "target": "*@example.com -> ", "status": "ok", "duration": ANY},
+		],
 		"changed": True,
 		"rules": [
 			{"prefix": False, "catchall": False, "domainName": "toto.com", "matchUser": "toto", "targetAddresses": ["admin@toto.com"], "preset": "exact_match"},
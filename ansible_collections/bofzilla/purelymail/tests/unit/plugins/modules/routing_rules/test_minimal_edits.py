@@ -0,0 +1,51 @@
+import functools
+
+import pytest
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import ListRoutingResponse
+from ansible_collections.bofzilla.purelymail.plugins.modules import routing_rules
+from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import make_runner  # noqa: F401
+
+EXISTING_RULES = [
+	RoutingRule(id=1, match_user="team", prefix=False, catchall=False, domain_name="example.com", target_addresses=["a@example.com", "b@example.com"]),
+	RoutingRule(id=2, match_user="ops", prefix=False, catchall=False, domain_name="example.com", target_addresses=["c@example.com"]),
+]
+
+
+@pytest.fixture(scope="module")
+def run(make_runner):  # noqa: F811
+	runner_run = make_runner(
+		routing_rules,
+		(("RoutingClient", lambda mock: setattr(mock.list_routing_rules, "return_value", ListRoutingResponse(EXISTING_RULES))),),
+	)
+
+	@functools.wraps(runner_run)
+	def inner_run(rules: list[dict], **kwargs):
+		return runner_run(params={"rules": rules, "inferred_safety": True}, **kwargs)
+
+	return inner_run
+
+
+def _rule(match_user: str, targets: list[str]) -> dict:
+	return {"domain_name": "example.com", "match_user": match_user, "preset": "exact_match", "target_addresses": targets}
+
+
+def test_reordered_targets_are_left_alone(run):
+	data, mocks = run([_rule("team", ["b@example.com", "a@example.com"]), _rule("ops", ["c@example.com"])])
+
+	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
+	mocks["RoutingClient"].create_routing_rule.assert_not_called()
+	assert data["changed"] is False
+	assert data["stats"]["avoided_calls"] == {"deleteRoutingRule": 1, "createRoutingRule": 1}
+
+
+def test_replacement_is_paired_with_its_delete(run):
+	data, _ = run([_rule("ops", ["c@example.com"]), _rule("new", ["n@example.com"]), _rule("team", ["a@example.com", "z@example.com"])])
+
+	assert [(op["method"], op["target"]) for op in data["operations"]] == [
+		("delete_routing_rule", "team@example.com -> a@example.com, b@example.com"),
+		("create_routing_rule", "team@example.com -> a@example.com, z@example.com"),
+		("create_routing_rule", "new@example.com -> n@example.com"),
+	]
+	assert data["stats"]["avoided_calls"] == {"deleteRoutingRule": 0, "createRoutingRule": 0}
@@ -1,9 +1,11 @@
 import functools
+from unittest.mock import ANY
 
 import pytest
 
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import RoutingRule
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import ListRoutingResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PurelymailTwin
 from ansible_collections.bofzilla.purelymail.plugins.modules import routing_rules
 from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import make_runner  # noqa: F401
 
@@ -49,6 +51,8 @@ def test_noncanonical_changes_normal(run):
 	mocks["RoutingClient"].create_routing_rule.assert_called_once()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -64,6 +68,8 @@ def test_noncanonical_no_changes_normal(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -79,6 +85,8 @@ def test_noncanonical_changes_diff(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"diff": {
 			"before": [
@@ -106,6 +114,8 @@ def test_noncanonical_no_changes_diff(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"diff": {
 			"before": [
@@ -130,6 +140,8 @@ def test_noncanonical_changes_check(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -145,6 +157,8 @@ def test_noncanonical_no_changes_check(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -160,6 +174,8 @@ def test_noncanonical_changes_diff_check(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"diff": {
 			"before": [
@@ -187,6 +203,8 @@ def test_noncanonical_no_changes_diff_check(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"diff": {
 			"before": [
@@ -211,6 +229,8 @@ def test_canonical_changes_normal(run):
 	mocks["RoutingClient"].create_routing_rule.assert_called_once()
 	assert mocks["RoutingClient"].delete_routing_rule.call_count == 2
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"rules": [
 			{"prefix": False, "preset": "exact_match", "catchall": False, "domainName": "example.com", "matchUser": "newuser", "targetAddresses": ["helpdesk@example.com"]},
@@ -224,6 +244,8 @@ def test_canonical_no_changes_normal(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -239,6 +261,8 @@ def test_canonical_changes_diff(run):
 	assert mocks["RoutingClient"].delete_routing_rule.call_count == 2
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"diff": {
 			"before": [
@@ -262,6 +286,8 @@ def test_canonical_no_changes_diff(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"diff": {
 			"before": [
@@ -286,6 +312,8 @@ def test_canonical_changes_check(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"rules": [
 			{"prefix": False, "preset": "exact_match", "catchall": False, "domainName": "example.com", "matchUser": "newuser", "targetAddresses": ["helpdesk@example.com"]},
@@ -299,6 +327,8 @@ def test_canonical_no_changes_check(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -314,6 +344,8 @@ def test_canonical_changes_diff_check(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"diff": {
 			"before": [
@@ -337,6 +369,8 @@ def test_canonical_no_changes_diff_check(run):
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"diff": {
 			"before": [
@@ -361,6 +395,8 @@ def test_canonical_deletes_all_when_input_empty(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	assert mocks["RoutingClient"].delete_routing_rule.call_count == 2
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"rules": [],
 	}
@@ -372,6 +408,8 @@ def test_noncanonical_empty_input_no_changes(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -387,6 +425,8 @@ def test_canonical_partial_overlap(run):
 	mocks["RoutingClient"].create_routing_rule.assert_called_once()
 	mocks["RoutingClient"].delete_routing_rule.assert_called_once()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"rules": [
 			{"prefix": True, "preset": "prefix_match", "catchall": False, "domainName": "example.com", "matchUser": "toto", "targetAddresses": ["admin@example.com"]},
@@ -402,6 +442,8 @@ def test_canonical_partial_overlap_diff(run):
 	mocks["RoutingClient"].create_routing_rule.assert_called_once()
 	mocks["RoutingClient"].delete_routing_rule.assert_called_once()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"diff": {
 			"before": [
@@ -426,6 +468,73 @@ def test_canonical_check_mode_deletions_only(run):
 	mocks["RoutingClient"].create_routing_rule.assert_not_called()
 	mocks["RoutingClient"].delete_routing_rule.assert_not_called()
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"rules": [],
 	}
+
+
+def test_predicts_the_applied_state(make_runner):  # noqa: F811
+	twin = PurelymailTwin.seeded(rules=EXISTING_RULES, enforce_domains=False)
+	runner = make_runner(routing_rules, (), twin=twin)
+	params = {"rules": [EXISTING_RULES_AS_INPUT[0], NEW_RULE, {**EXISTING_RULES_AS_INPUT[1], "target_addresses": ["help@example.com"]}]}
+
+	planned, _ = runner(params=params, check_mode=True)
+	assert twin.calls == ["listRoutingRules"]
+
+	applied, _ = runner(params=params)
+	assert applied["rules"] == planned["rules"] == twin.client().list_routing_rules().as_display()
+	assert [r.id for r in twin.client().list_routing_rules().rules] == [1, 3, 4]
+
+	again, _ = runner(params=params)
+	assert not again["changed"]
+
+
+@pytest.mark.parametrize(
+	"rules",
+	[
+		pytest.param([NEW_RULE, {**NEW_RULE, "target_addresses": ["other@example.com"]}], id="same_user_other_targets"),
+		pytest.param(
+			[
+				{**NEW_RULE, "match_user": "", "prefix": True},
+				{**NEW_RULE, "match_user": "", "prefix": True, "catchall": True},
+			],
+			id="any_address_and_catchall",
+		),
+	],
+)
+def test_applies_rules_sharing_a_match_key(make_runner, rules):  # noqa: F811
+	twin = PurelymailTwin.seeded(rules=EXISTING_RULES, enforce_domains=False)
+	runner = make_runner(routing_rules, (), twin=twin)
+
+	data, _ = runner(params={"rules": rules, "canonical": [], "inferred_safety": False})
+
+	assert data["changed"]
+	assert twin.calls.count("createRoutingRule") == 2
+	assert len(twin.rules) == len(EXISTING_RULES) + 2
+
+
+def test_applies_a_saved_plan(make_runner, tmp_path):  # noqa: F811
+	twin = PurelymailTwin.seeded(rules=EXISTING_RULES, enforce_domains=False)
+	runner = make_runner(routing_rules, (), twin=twin)
+	plan = str(tmp_path / "plan.json")
+
+	planned, _ = runner(params={"rules": [EXISTING_RULES_AS_INPUT[0], NEW_RULE], "plan_out": plan}, check_mode=True)
+
+	twin.calls.clear()
+	applied, _ = runner(params={"rules": [], "plan_in": plan}, diff=True)
+	assert twin.calls[0] == "listRoutingRules" and "createRoutingRule" in twin.calls
+	assert applied["rules"] == planned["rules"] == twin.client().list_routing_rules().as_display()
+	assert applied["diff"]["after"] == planned["rules"]
+
+
+@pytest.mark.parametrize(("params", "reads"), [({"rules": [EXISTING_RULES_AS_INPUT[0], NEW_RULE]}, 1), ({"rules": EXISTING_RULES_AS_INPUT}, 0)])
+def test_refresh_touched(make_runner, params, reads):  # noqa: F811
+	twin = PurelymailTwin.seeded(rules=EXISTING_RULES, enforce_domains=False)
+	runner = make_runner(routing_rules, (), twin=twin)
+
+	data, _ = runner(params={**params, "refresh_after_apply": "touched"})
+
+	assert twin.calls.count("listRoutingRules") == 1 + reads
+	assert data["rules"] == twin.client().list_routing_rules().as_display()
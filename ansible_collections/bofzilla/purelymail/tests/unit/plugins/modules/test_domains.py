@@ -1,16 +1,19 @@
 import functools
+from unittest.mock import ANY
 
 import pytest
 
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import ApiDomainDnsSummary, ApiDomainInfo
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import ListDomainsRequest
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import ListDomainsResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PurelymailTwin
 from ansible_collections.bofzilla.purelymail.plugins.modules import domains
-from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import make_runner  # noqa: F401
+from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import AnsibleFailJson, make_runner  # noqa: F401
 
 STATE = ListDomainsResponse(
 	[
 		ApiDomainInfo(name="example.com", allowAccountReset=True, symbolicSubaddressing=True, isShared=False, dnsSummary=ApiDomainDnsSummary(True, True, True, True)),
-		ApiDomainInfo(name="testdomain.net", allowAccountReset=False, symbolicSubaddressing=False, isShared=True, dnsSummary=ApiDomainDnsSummary(True, True, True, True)),
+		ApiDomainInfo(name="testdomain.net", allowAccountReset=False, symbolicSubaddressing=False, isShared=False, dnsSummary=ApiDomainDnsSummary(True, True, True, True)),
 		ApiDomainInfo(name="another.org", allowAccountReset=True, symbolicSubaddressing=False, isShared=False, dnsSummary=ApiDomainDnsSummary(True, True, True, True)),
 	]
 )
@@ -46,6 +49,8 @@ def test_noncanonical_adds_missing(run):
 	mocks["DomainClient"].update_domain_settings.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -59,7 +64,7 @@ def test_noncanonical_adds_missing(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -91,6 +96,8 @@ def test_noncanonical_no_changes(run):
 	mocks["DomainClient"].update_domain_settings.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"domains": [
 			{
@@ -104,7 +111,7 @@ def test_noncanonical_no_changes(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -129,6 +136,8 @@ def test_noncanonical_updates(run):
 	mocks["DomainClient"].delete_domain.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -142,7 +151,7 @@ def test_noncanonical_updates(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -168,6 +177,8 @@ def test_noncanonical_diff(run):
 	mocks["DomainClient"].delete_domain.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -181,7 +192,7 @@ def test_noncanonical_diff(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -212,7 +223,7 @@ def test_noncanonical_diff(run):
 					"name": "testdomain.net",
 					"allowAccountReset": False,
 					"symbolicSubaddressing": False,
-					"isShared": True,
+					"isShared": False,
 					"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 				},
 				{
@@ -235,7 +246,7 @@ def test_noncanonical_diff(run):
 					"name": "testdomain.net",
 					"allowAccountReset": False,
 					"symbolicSubaddressing": False,
-					"isShared": True,
+					"isShared": False,
 					"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 				},
 				{
@@ -269,6 +280,8 @@ def test_noncanonical_check_mode(run):
 	mocks["DomainClient"].delete_domain.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -282,7 +295,7 @@ def test_noncanonical_check_mode(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -311,6 +324,8 @@ def test_canonical_removes_extra(run):
 	mocks["DomainClient"].update_domain_settings.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -338,6 +353,8 @@ def test_canonical_no_changes(run):
 	mocks["DomainClient"].update_domain_settings.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": False,
 		"domains": [
 			{
@@ -351,7 +368,7 @@ def test_canonical_no_changes(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -376,6 +393,8 @@ def test_canonical_adds_and_deletes(run):
 	assert mocks["DomainClient"].delete_domain.call_count == 2
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -408,6 +427,8 @@ def test_canonical_diff(run):
 	assert mocks["DomainClient"].delete_domain.call_count == 2
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -431,7 +452,7 @@ def test_canonical_diff(run):
 					"name": "testdomain.net",
 					"allowAccountReset": False,
 					"symbolicSubaddressing": False,
-					"isShared": True,
+					"isShared": False,
 					"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 				},
 				{
@@ -466,7 +487,7 @@ def test_canonical_check_mode(run):
 	mocks["DomainClient"].delete_domain.assert_not_called()
 	mocks["DomainClient"].update_domain_settings.assert_not_called()
 
-	assert data == {"changed": True, "domains": []}
+	assert data == {"stats": ANY, "operations": ANY, "changed": True, "domains": []}
 
 
 def test_canonical_partial_overlap(run):
@@ -479,6 +500,8 @@ def test_canonical_partial_overlap(run):
 	assert mocks["DomainClient"].delete_domain.call_count == 2
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -510,6 +533,8 @@ def test_dns_recheck_noncanonical(run):
 	mocks["DomainClient"].update_domain_settings.assert_called_once()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -523,7 +548,7 @@ def test_dns_recheck_noncanonical(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -548,6 +573,8 @@ def test_dns_recheck_noncanonical_new_domain(run):
 	mocks["DomainClient"].delete_domain.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -561,7 +588,7 @@ def test_dns_recheck_noncanonical_new_domain(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -593,6 +620,8 @@ def test_dns_recheck_canonical(run):
 	assert mocks["DomainClient"].delete_domain.call_count == 2
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -618,6 +647,8 @@ def test_dns_recheck_check_mode(run):
 	mocks["DomainClient"].delete_domain.assert_not_called()
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -631,7 +662,7 @@ def test_dns_recheck_check_mode(run):
 				"name": "testdomain.net",
 				"allowAccountReset": False,
 				"symbolicSubaddressing": False,
-				"isShared": True,
+				"isShared": False,
 				"dnsSummary": {"passesMx": True, "passesSpf": True, "passesDkim": True, "passesDmarc": True},
 			},
 			{
@@ -656,6 +687,8 @@ def test_new_domain_with_non_default(run):
 	assert mocks["DomainClient"].delete_domain.call_count == 3
 
 	assert data == {
+		"stats": ANY,
+		"operations": ANY,
 		"changed": True,
 		"domains": [
 			{
@@ -667,3 +700,94 @@ def test_new_domain_with_non_default(run):
 			}
 		],
 	}
+
+
+def test_scales_to_10k_domains(make_runner):  # noqa: F811
+	existing = ListDomainsResponse(
+		[
+			ApiDomainInfo(name=f"d{i}.com", allowAccountReset=True, symbolicSubaddressing=False, isShared=False, dnsSummary=ApiDomainDnsSummary(True, True, True, True))
+			for i in range(10_000)
+		]
+	)
+	runner = make_runner(domains, (("DomainClient", lambda mock: setattr(mock.list_domains, "return_value", existing)),))
+
+	data, mocks = runner(
+		params={"canonical": True, "domains": [{"name": f"d{i}.com", "symbolic_subaddressing": i % 2 == 0} for i in range(5_000, 15_000)]},
+		check_mode=True,
+	)
+
+	methods = [op["method"] for op in data["operations"]]
+	assert methods.count("delete_domain") == 5_000
+	assert methods.count("add_domain") == 5_000
+	assert methods.count("update_domain_settings") == 2_500 + 2_500  # half the kept ones, half the created ones
+	assert len(data["domains"]) == 10_000
+
+
+def test_scope_limits_canonical(make_runner):  # noqa: F811
+	runner = make_runner(domains, (("DomainClient", lambda mock: setattr(mock.list_domains, "return_value", STATE)),))
+	data, mocks = runner(params={"canonical": True, "scope": {"patterns": ["*.com", "*.org"]}, "domains": [{"name": "example.com"}, {"name": "new.net"}]})
+
+	# testdomain.net and new.net belong to another slice
+	assert [c.args[0].name for c in mocks["DomainClient"].delete_domain.call_args_list] == ["another.org"]
+	mocks["DomainClient"].add_domain.assert_not_called()
+	assert [d["name"] for d in data["domains"]] == ["example.com"]
+	assert data["stats"]["out_of_scope"] == {"desired": 1, "existing": 1}
+
+
+def test_shards_partition_the_account(make_runner):  # noqa: F811
+	existing = ListDomainsResponse(
+		[
+			ApiDomainInfo(name=f"d{i}.com", allowAccountReset=True, symbolicSubaddressing=False, isShared=False, dnsSummary=ApiDomainDnsSummary(True, True, True, True))
+			for i in range(300)
+		]
+	)
+	runner = make_runner(domains, (("DomainClient", lambda mock: setattr(mock.list_domains, "return_value", existing)),))
+
+	deleted: list[str] = []
+	for shard in range(1, 4):
+		data, _ = runner(params={"canonical": True, "scope": {"shard": f"{shard}/3"}, "domains": []}, check_mode=True)
+		deleted += [op["target"] for op in data["operations"]]
+		assert 50 < len(data["operations"]) < 150
+
+	assert sorted(deleted) == sorted(d.name for d in existing.domains)
+
+
+def test_invalid_shard(make_runner):  # noqa: F811
+	runner = make_runner(domains, (("DomainClient", lambda mock: setattr(mock.list_domains, "return_value", STATE)),))
+	data, mocks = runner(params={"canonical": True, "scope": {"shard": "4/3"}, "domains": []}, expect=AnsibleFailJson)
+
+	assert data == {"msg": "scope.shard must be 'i/N' with 1 <= i <= N, got '4/3'"}
+	mocks["DomainClient"].list_domains.assert_not_called()
+
+
+def test_predicts_the_applied_state(make_runner):  # noqa: F811
+	twin = PurelymailTwin.seeded(domains=STATE.domains)
+	runner = make_runner(domains, (), twin=twin)
+	params = {"canonical": True, "domains": [{"name": "example.com", "allow_account_reset": False}, {"name": "new.com", "symbolic_subaddressing": False}]}
+
+	planned, _ = runner(params=params, check_mode=True)
+	assert twin.calls == ["listDomains"]
+
+	applied, _ = runner(params=params)
+	assert applied["domains"] == planned["domains"] == twin.client().list_domains(ListDomainsRequest(False)).as_display()
+	assert [d["name"] for d in applied["domains"]] == ["example.com", "new.com"]
+
+	again, _ = runner(params=params)
+	assert not again["changed"]
+
+
+def test_applies_a_saved_plan(make_runner, tmp_path):  # noqa: F811
+	twin = PurelymailTwin.seeded(domains=STATE.domains)
+	runner = make_runner(domains, (), twin=twin)
+	plan = str(tmp_path / "plan.json")
+
+	planned, _ = runner(params={"canonical": True, "domains": [{"name": "example.com"}, {"name": "new.com"}], "plan_out": plan}, check_mode=True)
+	assert planned["changed"]
+
+	# applied as planned, whatever the task now describes
+	applied, _ = runner(params={"plan_in": plan, "domains": []})
+	assert applied["domains"] == planned["domains"] == twin.client().list_domains(ListDomainsRequest(False)).as_display()
+	assert [op["method"] for op in applied["operations"]] == [op["method"] for op in planned["operations"]]
+
+	stale, _ = runner(params={"plan_in": plan, "domains": []}, expect=AnsibleFailJson)
+	assert stale == {"msg": "plan_in: the account changed since the plan was computed, compute a new one, no change was made"}
@@ -1,12 +1,17 @@
 import functools
+import threading
+from unittest.mock import ANY
 
 import pytest
 
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import DeadlineExceeded
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import GetUserPasswordResetMethod
-from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import ModifyUserRequest, UpsertPasswordResetRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import GetUserRequest, ModifyUserRequest, UpsertPasswordResetRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import ApiError
 from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import GetUserResponse, ListUsersResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PurelymailTwin, TwinError
 from ansible_collections.bofzilla.purelymail.plugins.modules import users
-from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import make_runner  # noqa: F401
+from ansible_collections.bofzilla.purelymail.tests.unit.plugins.mock_utils import AnsibleFailJson, make_runner  # noqa: F401
 
 
 def _existing_user(
@@ -46,18 +51,7 @@ def run(make_runner):  # noqa: F811
 	def inner_run(params: dict, **kwargs):
 		params.setdefault("canonical", False)
 		params.setdefault("password_mode", "update-if-provided")
-		# fill defaults the way AnsibleModule normally would
-		for u in params.get("users", []):
-			u.setdefault("enable_search_indexing", True)
-			u.setdefault("enable_password_reset", True)
-			u.setdefault("require_two_factor_authentication", False)
-			u.setdefault("recovery_email", "")
-			u.setdefault("recovery_email_description", "")
-			u.setdefault("recovery_email_allow_mfa_reset", True)
-			u.setdefault("recovery_phone", "")
-			u.setdefault("recovery_phone_description", "")
-			u.setdefault("recovery_phone_allow_mfa_reset", True)
-			u.setdefault("send_welcome_email", False)
+		# the users[] defaults are filled from the argument_spec by `mock_utils.with_defaults`
 		return runner_run(params=params, **kwargs)
 
 	return inner_run
@@ -141,6 +135,212 @@ def test_canonical_deletes_extras(run):
 	assert data["changed"] is True
 
 
+def _setup_offboarding(mock):
+	mock.list_users.return_value = ListUsersResponse(users=["alice@example.com", "bob@example.com", "charlie@example.com"])
+	mock.get_user.return_value = _existing_user()
+
+
+def test_canonical_skips_get_user_for_deleted(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(params={"canonical": True, "users": [{"name": "alice@example.com"}]})
+
+	assert [c.args[0].userName for c in mocks["UserClient"].get_user.call_args_list] == ["alice@example.com"]
+	assert [c.args[0].userName for c in mocks["UserClient"].delete_user.call_args_list] == ["bob@example.com", "charlie@example.com"]
+	assert [u["name"] for u in data["users"]] == ["alice@example.com"]
+	assert data["stats"]["avoided_calls"] == {"getUser": 2, "deletePasswordReset": 0, "modifyUser": 0}
+
+
+def test_deadline_reports_completed_and_pending(make_runner):  # noqa: F811
+	def _setup(mock):
+		_setup_offboarding(mock)
+		mock.delete_user.side_effect = [None, DeadlineExceeded("Deadline exceeded, deleteUser not called")]
+
+	runner = make_runner(users, (("UserClient", _setup),))
+	data, _ = runner(params={"canonical": True, "deadline": 30.0, "users": [{"name": "alice@example.com"}]}, expect=AnsibleFailJson)
+
+	assert data == {
+		"msg": "DeadlineExceeded: Deadline exceeded, deleteUser not called",
+		"changed": True,
+		"completed": [{"method": "delete_user", "target": "bob@example.com"}],
+		"pending": [{"method": "delete_user", "target": "charlie@example.com"}],
+		"operations": [
+			{"method": "delete_user", "target": "bob@example.com", "status": "ok", "duration": ANY},
+			{"method": "delete_user", "target": "charlie@example.com", "status": "failed", "duration": ANY},
+		],
+		"failed": [{"method": "delete_user", "target": "charlie@example.com", "error": "DeadlineExceeded: Deadline exceeded, deleteUser not called"}],
+		"retry_scope": {"patterns": ["charlie@example.com"]},
+	}
+
+
+def test_concurrent_apply(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(params={"canonical": True, "apply_concurrency": 4, "users": [{"name": "alice@example.com", "enable_search_indexing": False}]})
+
+	assert sorted(c.args[0].userName for c in mocks["UserClient"].delete_user.call_args_list) == ["bob@example.com", "charlie@example.com"]
+	mocks["UserClient"].modify_user.assert_called_once()
+	assert [(op["method"], op["target"], op["status"]) for op in data["operations"]] == [
+		("delete_user", "bob@example.com", "ok"),
+		("delete_user", "charlie@example.com", "ok"),
+		("modify_user", "alice@example.com", "ok"),
+	]
+
+
+def test_speculative_prefetch(make_runner):  # noqa: F811
+	def _setup(mock):
+		_setup_offboarding(mock)
+		guessed = threading.Semaphore(0)
+
+		def get_user(req):
+			guessed.release()
+			if req.userName == "dave@example.com":
+				raise ApiError("error", "internalError", "User not found")
+			return _existing_user()
+
+		def list_users():
+			# the 3 guesses have started before listUser answers
+			assert all(guessed.acquire(timeout=1) for _ in range(3))
+			return ListUsersResponse(users=["alice@example.com", "bob@example.com", "charlie@example.com"])
+
+		mock.get_user.side_effect = get_user
+		mock.list_users.side_effect = list_users
+
+	runner = make_runner(users, (("UserClient", _setup),))
+	data, mocks = runner(
+		params={
+			"canonical": True,
+			"fetch_concurrency": 4,
+			"speculative_prefetch": True,
+			"users": [{"name": "alice@example.com"}, {"name": "robert@example.com", "previous_names": ["bob@example.com"]}, {"name": "dave@example.com", "password": "s3cret"}],
+		}
+	)
+
+	# guesses for every desired user, then the renamed user under its current name
+	assert sorted(c.args[0].userName for c in mocks["UserClient"].get_user.call_args_list) == [
+		"alice@example.com",
+		"bob@example.com",
+		"dave@example.com",
+		"robert@example.com",
+	]
+	assert mocks["UserClient"].create_user.call_args.args[0].userName == "dave"
+	assert [c.args[0].userName for c in mocks["UserClient"].delete_user.call_args_list] == ["charlie@example.com"]
+	assert data["stats"]["wasted_calls"] == {"getUser": 2}
+	assert data["stats"]["avoided_calls"]["getUser"] == 1
+
+
+def test_speculative_prefetch_reports_errors_for_existing_users(make_runner):  # noqa: F811
+	def _setup(mock):
+		_setup_offboarding(mock)
+		mock.get_user.side_effect = ApiError("error", "internalError", "boom")
+
+	runner = make_runner(users, (("UserClient", _setup),))
+	data, _ = runner(params={"canonical": False, "speculative_prefetch": True, "users": [{"name": "alice@example.com"}]}, expect=AnsibleFailJson)
+
+	assert data["msg"] == "Purelymail API error: [internalError] boom"
+
+
+def test_scope_limits_fetch_and_deletes(make_runner):  # noqa: F811
+	def _setup(mock):
+		mock.list_users.return_value = ListUsersResponse(users=["alice@example.com", "bob@example.com", "carol@example.org", "dave@example.org"])
+		mock.get_user.return_value = _existing_user()
+
+	runner = make_runner(users, (("UserClient", _setup),))
+	data, mocks = runner(
+		params={
+			"canonical": True,
+			"scope": {"domains": ["example.org"]},
+			"users": [{"name": "alice@example.com", "enable_search_indexing": False}, {"name": "carol@example.org"}],
+		}
+	)
+
+	assert [c.args[0].userName for c in mocks["UserClient"].get_user.call_args_list] == ["carol@example.org"]
+	assert [c.args[0].userName for c in mocks["UserClient"].delete_user.call_args_list] == ["dave@example.org"]
+	mocks["UserClient"].modify_user.assert_not_called()
+	assert [u["name"] for u in data["users"]] == ["carol@example.org"]
+	assert data["stats"]["out_of_scope"] == {"desired": 1, "existing": 2}
+
+
+def test_sharded_rename_stays_a_rename(make_runner):  # noqa: F811
+	# old@ hashes to shard 1/2, new@ and alice@ to 2/2: the rename belongs to the shard of its entry
+	twin = PurelymailTwin.seeded(users={"old@example.com": None, "alice@example.com": None}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	entries = [{"name": "alice@example.com"}, {"name": "new@example.com", "previous_names": ["old@example.com"]}]
+
+	first, _ = runner(params={"canonical": True, "scope": {"shard": "1/2"}, "users": entries})
+	assert first["operations"] == []
+	assert first["stats"]["out_of_scope"] == {"desired": 2, "existing": 2}
+
+	second, _ = runner(params={"canonical": True, "scope": {"shard": "2/2"}, "users": entries})
+	assert [(op["method"], op["target"]) for op in second["operations"]] == [("modify_user", "old@example.com -> new@example.com")]
+	assert twin.client().list_users().users == ["new@example.com", "alice@example.com"]
+
+
+def test_check_mode_reports_planned_operations(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(params={"canonical": True, "users": [{"name": "alice@example.com"}]}, check_mode=True)
+
+	mocks["UserClient"].delete_user.assert_not_called()
+	assert data["operations"] == [
+		{"method": "delete_user", "target": "bob@example.com", "status": "planned", "duration": None},
+		{"method": "delete_user", "target": "charlie@example.com", "status": "planned", "duration": None},
+	]
+
+
+def test_shallow_check_uses_list_only(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(
+		params={
+			"canonical": True,
+			"check_fidelity": "shallow",
+			"users": [
+				{"name": "alice@example.com", "enable_search_indexing": False},
+				{"name": "robert@example.com", "previous_names": ["bob@example.com"]},
+				{"name": "dave@example.com", "password": "s3cret"},
+			],
+		},
+		check_mode=True,
+		diff=True,
+	)
+
+	mocks["UserClient"].get_user.assert_not_called()
+	assert data["changed"] is True
+	assert [(op["method"], op["target"], op["status"]) for op in data["operations"]] == [
+		("delete_user", "charlie@example.com", "planned"),
+		("create_user", "dave@example.com", "planned"),
+		("modify_user", "bob@example.com -> robert@example.com", "planned"),
+	]
+	assert data["users"] == [{"name": "alice@example.com"}, {"name": "dave@example.com"}, {"name": "robert@example.com"}]
+	assert data["unverified"] == ["alice@example.com", "robert@example.com"]
+	assert data["diff"]["before"] == [{"name": "alice@example.com"}, {"name": "bob@example.com"}, {"name": "charlie@example.com"}]
+	assert data["stats"]["avoided_calls"]["getUser"] == 3
+
+
+def test_shallow_check_still_requires_passwords(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, _ = runner(params={"canonical": False, "check_fidelity": "shallow", "users": [{"name": "dave@example.com"}]}, check_mode=True, expect=AnsibleFailJson)
+
+	assert data == {"msg": "users: 'dave@example.com' does not exist yet, `password` is required to create it"}
+
+
+def test_shallow_ignored_outside_check_mode(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(params={"canonical": False, "check_fidelity": "shallow", "users": [{"name": "alice@example.com", "enable_search_indexing": False}]})
+
+	mocks["UserClient"].modify_user.assert_called_once()
+	assert "unverified" not in data
+
+
+@pytest.mark.parametrize(("diff", "diff_detail"), [(True, False), (False, True)])
+def test_canonical_fetches_deleted_for_diff(make_runner, diff, diff_detail):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(params={"canonical": True, "diff_detail": diff_detail, "users": [{"name": "alice@example.com"}]}, diff=diff)
+
+	assert mocks["UserClient"].get_user.call_count == 3
+	assert data["stats"]["avoided_calls"] == {"getUser": 0, "deletePasswordReset": 0, "modifyUser": 0}
+	if diff:
+		assert [u["name"] for u in data["diff"]["before"]] == ["alice@example.com", "bob@example.com", "charlie@example.com"]
+		assert [u["name"] for u in data["diff"]["after"]] == ["alice@example.com"]
+
+
 def test_non_canonical_keeps_extras(run):
 	data, mocks = run({"canonical": False, "users": []})
 	mocks["UserClient"].delete_user.assert_not_called()
@@ -209,6 +409,145 @@ def test_per_user_password_mode_override(run):
 	assert data["changed"] is True
 
 
+def test_password_store_skips_known_password(run, tmp_path):
+	store = str(tmp_path / "passwords.json")
+	params = lambda password: {"password_store": store, "users": [{"name": "alice@example.com", "password": password}]}  # noqa: E731
+
+	data, mocks = run(params("rotated"))
+	assert mocks["UserClient"].modify_user.call_args.args[0].newPassword == "rotated"
+	assert "rotated" not in (tmp_path / "passwords.json").read_text()
+
+	mocks["UserClient"].modify_user.reset_mock()  # mocks are shared by every run of the test
+	data, mocks = run(params("rotated"))
+	mocks["UserClient"].modify_user.assert_not_called()
+	assert data["changed"] is False
+	assert data["stats"]["avoided_calls"]["modifyUser"] == 1
+	assert data["stats"]["unchanged_passwords"] == 1
+
+	data, mocks = run(params("rotated-again"))
+	assert mocks["UserClient"].modify_user.call_args.args[0].newPassword == "rotated-again"
+
+
+def test_password_store_keeps_other_changes(run, tmp_path):
+	store = str(tmp_path / "passwords.json")
+	_ = run({"password_store": store, "users": [{"name": "alice@example.com", "password": "rotated"}]})
+
+	data, mocks = run({"password_store": store, "users": [{"name": "alice@example.com", "password": "rotated", "enable_search_indexing": False}]})
+	req: ModifyUserRequest = mocks["UserClient"].modify_user.call_args.args[0]
+	assert (req.newPassword, req.enableSearchIndexing) == (None, False)
+	assert data["stats"]["avoided_calls"]["modifyUser"] == 0
+	assert data["stats"]["unchanged_passwords"] == 1
+
+
+def test_password_store_untouched_in_check_mode(run, tmp_path):
+	data, mocks = run({"password_store": str(tmp_path / "passwords.json"), "users": [{"name": "alice@example.com", "password": "rotated"}]}, check_mode=True)
+	assert data["changed"] is True
+	assert not (tmp_path / "passwords.json").exists()
+
+
+def test_state_cache_reuses_fresh_states(run, tmp_path):
+	params = lambda **user: {"state_cache": str(tmp_path / "state.json"), "max_state_age": 3600.0, "users": [{"name": "alice@example.com", **user}]}  # noqa: E731
+
+	data, mocks = run(params())
+	assert mocks["UserClient"].get_user.call_count == 1
+	assert data["stats"]["state_cache"] == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+	data, mocks = run(params(enable_search_indexing=False))
+	assert mocks["UserClient"].get_user.call_count == 1  # no new call
+	assert mocks["UserClient"].modify_user.call_args.args[0].enableSearchIndexing is False
+	assert data["stats"]["state_cache"] == {"hits": 1, "misses": 0, "hit_rate": 1.0}
+
+	# alice was modified: her snapshot is gone
+	data, mocks = run(params(enable_search_indexing=False))
+	assert mocks["UserClient"].get_user.call_count == 2
+	assert data["stats"]["state_cache"]["misses"] == 1
+
+
+def test_state_cache_expires(run, tmp_path, monkeypatch):
+	params = {"state_cache": str(tmp_path / "state.json"), "max_state_age": 60.0, "users": [{"name": "alice@example.com"}]}
+	_ = run(dict(params))
+
+	monkeypatch.setattr(users.time, "time", lambda: 1e12)
+	data, mocks = run(dict(params))
+	assert mocks["UserClient"].get_user.call_count == 2
+	assert data["stats"]["state_cache"] == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+
+def test_max_state_age_requires_state_cache(run):
+	data, _ = run({"max_state_age": 60.0, "users": []}, expect=AnsibleFailJson)
+	assert data == {"msg": "max_state_age must be > 0 and requires state_cache, got 60.0"}
+
+
+# ---------------------------------------------------------------------------
+# renames
+# ---------------------------------------------------------------------------
+
+
+def test_rename_with_previous_names(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(
+		params={
+			"canonical": True,
+			"users": [
+				{"name": "alice@example.com"},
+				{"name": "robert@example.com", "previous_names": ["rob@example.com", "bob@example.com"], "recovery_email": "r@example.com"},
+			],
+		},
+		diff=True,
+	)
+
+	mocks["UserClient"].create_user.assert_not_called()
+	assert [c.args[0].userName for c in mocks["UserClient"].delete_user.call_args_list] == ["charlie@example.com"]
+	req: ModifyUserRequest = mocks["UserClient"].modify_user.call_args.args[0]
+	assert (req.userName, req.newUserName) == ("bob@example.com", "robert@example.com")
+	assert mocks["UserClient"].upsert_password_reset.call_args.args[0].userName == "robert@example.com"
+	assert [(op["method"], op["target"]) for op in data["operations"]] == [
+		("delete_user", "charlie@example.com"),
+		("modify_user", "bob@example.com -> robert@example.com"),
+		("upsert_password_reset", "robert@example.com"),
+	]
+	assert [u["name"] for u in data["users"]] == ["alice@example.com", "robert@example.com"]
+	assert [u.get("previous_name") for u in data["diff"]["after"]] == [None, "bob@example.com"]
+
+
+def test_rename_skipped_when_new_name_exists(make_runner):  # noqa: F811
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	data, mocks = runner(params={"canonical": False, "users": [{"name": "alice@example.com", "previous_names": ["bob@example.com"]}]})
+
+	mocks["UserClient"].modify_user.assert_not_called()
+	mocks["UserClient"].delete_user.assert_not_called()
+	assert data["changed"] is False
+
+
+def test_rename_moves_password_fingerprint(make_runner, tmp_path):  # noqa: F811
+	store = str(tmp_path / "passwords.json")
+	runner = make_runner(users, (("UserClient", _setup_offboarding),))
+	_ = runner(params={"canonical": False, "password_store": store, "users": [{"name": "bob@example.com", "password": "s3cret"}]})
+
+	data, mocks = runner(
+		params={"canonical": False, "password_store": store, "users": [{"name": "robert@example.com", "previous_names": ["bob@example.com"], "password": "s3cret"}]}
+	)
+	req: ModifyUserRequest = mocks["UserClient"].modify_user.call_args.args[0]
+	assert (req.userName, req.newUserName, req.newPassword) == ("bob@example.com", "robert@example.com", None)
+	assert data["stats"]["unchanged_passwords"] == 1
+
+
+@pytest.mark.parametrize(
+	("entries", "msg"),
+	[
+		([{"name": "a@example.com"}, {"name": "b@example.com", "previous_names": ["a@example.com"]}], "users[1]: previous name 'a@example.com' is also a user to manage"),
+		(
+			[{"name": "a@example.com", "previous_names": ["c@example.com"]}, {"name": "b@example.com", "previous_names": ["c@example.com"]}],
+			"users[1]: previous name 'c@example.com' is claimed by several users",
+		),
+	],
+)
+def test_invalid_previous_names(run, entries, msg):
+	data, mocks = run({"users": entries}, expect=AnsibleFailJson)
+	assert data == {"msg": msg}
+	mocks["UserClient"].list_users.assert_not_called()
+
+
 # ---------------------------------------------------------------------------
 # recovery method reconciliation (existing user)
 # ---------------------------------------------------------------------------
@@ -259,14 +598,30 @@ def test_recovery_email_replaced_when_target_changes(make_runner):  # noqa: F811
 	current = [GetUserPasswordResetMethod(type="email", target="old@example.com", description="", allowMfaReset=True)]
 	runner = make_runner(users, (("UserClient", _setup_with_methods(current)),))
 	data, mocks = runner(params=_params_with_user(recovery_email="new@example.com"))
-	# old removed, new added
-	mocks["UserClient"].delete_password_reset.assert_called_once()
-	deleted = mocks["UserClient"].delete_password_reset.call_args.args[0]
-	assert deleted.target == "old@example.com"
+	# old replaced in place by new
+	mocks["UserClient"].delete_password_reset.assert_not_called()
 	mocks["UserClient"].upsert_password_reset.assert_called_once()
 	added = mocks["UserClient"].upsert_password_reset.call_args.args[0]
 	assert added.target == "new@example.com"
+	assert added.existingTarget == "old@example.com"
 	assert data["changed"] is True
+	assert data["stats"]["avoided_calls"]["deletePasswordReset"] == 1
+
+
+def test_recovery_methods_only_replaced_by_same_type(make_runner):  # noqa: F811
+	current = [
+		GetUserPasswordResetMethod(type="email", target="old@example.com", description="", allowMfaReset=True),
+		GetUserPasswordResetMethod(type="phone", target="+33100000000", description="", allowMfaReset=True),
+	]
+	runner = make_runner(users, (("UserClient", _setup_with_methods(current)),))
+	data, mocks = runner(params=_params_with_user(recovery_phone="+33123456789"))
+	# phone replaced in place, email has no replacement: deleted
+	mocks["UserClient"].delete_password_reset.assert_called_once()
+	assert mocks["UserClient"].delete_password_reset.call_args.args[0].target == "old@example.com"
+	mocks["UserClient"].upsert_password_reset.assert_called_once()
+	added = mocks["UserClient"].upsert_password_reset.call_args.args[0]
+	assert (added.type, added.target, added.existingTarget) == ("phone", "+33123456789", "+33100000000")
+	assert data["stats"]["avoided_calls"]["deletePasswordReset"] == 1
 
 
 def test_empty_recovery_email_deletes_existing(make_runner):  # noqa: F811
@@ -292,12 +647,34 @@ def test_allow_mfa_reset_flag(make_runner):  # noqa: F811
 	current = [GetUserPasswordResetMethod(type="email", target="r@example.com", description="", allowMfaReset=True)]
 	runner = make_runner(users, (("UserClient", _setup_with_methods(current)),))
 	data, mocks = runner(params=_params_with_user(recovery_email="r@example.com", recovery_email_allow_mfa_reset=False))
-	# mismatch on allowMfaReset → delete + add
-	mocks["UserClient"].delete_password_reset.assert_called_once()
+	# mismatch on allowMfaReset → upserted over the same target
+	mocks["UserClient"].delete_password_reset.assert_not_called()
 	mocks["UserClient"].upsert_password_reset.assert_called_once()
 	added = mocks["UserClient"].upsert_password_reset.call_args.args[0]
 	assert added.allowMfaReset is False
+	assert added.existingTarget == "r@example.com"
+	assert data["changed"] is True
+
+
+def test_recovery_method_updated_in_place_on_the_wire(make_runner, monkeypatch):  # noqa: F811
+	methods = [GetUserPasswordResetMethod(type="email", target="r@example.com", description="", allowMfaReset=True)]
+	twin = PurelymailTwin.seeded(users={"alice@example.com": _existing_user(resetMethods=methods)}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	handle = twin.handle
+	upserts = []
+
+	def record_upserts(endpoint, payload):
+		if endpoint == "upsertPasswordReset":
+			upserts.append(payload)
+		return handle(endpoint, payload)
+
+	monkeypatch.setattr(twin, "handle", record_upserts)
+	data, _ = runner(params=_params_with_user(recovery_email="r@example.com", recovery_email_description="backup"))
+
+	# same target, new description: an update of the method, not a second one
+	assert [p.get("existingTarget") for p in upserts] == ["r@example.com"]
 	assert data["changed"] is True
+	assert [m.description for m in twin.client().get_user(GetUserRequest("alice@example.com")).resetMethods] == ["backup"]
 
 
 # ---------------------------------------------------------------------------
@@ -376,6 +753,53 @@ def test_get_user_called_for_each_listed_user(make_runner):  # noqa: F811
 	]
 
 
+def test_get_user_concurrent_fetch(make_runner):  # noqa: F811
+	names = [f"user{i}@example.com" for i in range(20)]
+
+	def _setup(mock):
+		mock.list_users.return_value = ListUsersResponse(users=names)
+		mock.get_user.side_effect = lambda req: _existing_user(enableSearchIndexing=int(req.userName[4:].split("@")[0]) % 2 == 0)
+
+	runner = make_runner(users, (("UserClient", _setup),))
+	data, mocks = runner(params={"canonical": False, "fetch_concurrency": 4, "users": []})
+
+	assert mocks["UserClient"].get_user.call_count == 20
+	assert [u["name"] for u in data["users"]] == sorted(names)
+	assert all(u["enableSearchIndexing"] is (int(u["name"][4:].split("@")[0]) % 2 == 0) for u in data["users"])
+
+
+def test_get_user_concurrent_fetch_fails_fast(make_runner):  # noqa: F811
+	def _setup(mock):
+		mock.list_users.return_value = ListUsersResponse(users=["alice@example.com", "bob@example.com"])
+		mock.get_user.side_effect = ApiError("error", "internalError", "boom")
+
+	runner = make_runner(users, (("UserClient", _setup),))
+	data, mocks = runner(params={"canonical": False, "fetch_concurrency": 4, "users": []}, expect=AnsibleFailJson)
+
+	assert data["msg"] == "Purelymail API error: [internalError] boom"
+	mocks["UserClient"].create_user.assert_not_called()
+
+
+def test_stats_report_retries(run):
+	data, _ = run(params={"canonical": False, "users": []})
+
+	assert data["stats"] == {
+		"avoided_calls": {"getUser": 0, "deletePasswordReset": 0, "modifyUser": 0},
+		"wasted_calls": {"getUser": 0},
+		"out_of_scope": {"desired": 0, "existing": 0},
+		"state_cache": {"hits": 0, "misses": 0, "hit_rate": None},
+		"unchanged_passwords": 0,
+		"retries": {},
+		"api_calls": {"read": {}, "write": {}, "total": 0, "estimated_write_seconds": 0.0},
+	}
+
+
+def test_negative_max_retries_fails(run):
+	data, _ = run(params={"max_retries": -1, "users": []}, expect=AnsibleFailJson)
+
+	assert data == {"msg": "max_retries must be >= 0, got -1"}
+
+
 def test_check_mode_no_side_effects(run):
 	_, mocks = run(
 		{
@@ -391,3 +815,212 @@ def test_check_mode_no_side_effects(run):
 	mocks["UserClient"].delete_user.assert_not_called()
 	mocks["UserClient"].upsert_password_reset.assert_not_called()
 	mocks["UserClient"].delete_password_reset.assert_not_called()
+
+
+def test_predicts_the_applied_state(make_runner):  # noqa: F811
+	methods = [GetUserPasswordResetMethod("email", "old@backup.com", "", True)]
+	twin = PurelymailTwin.seeded(
+		users={
+			"alice@example.com": GetUserResponse(True, True, False, True, methods),
+			"bob@example.com": GetUserResponse(True, True, False, True, []),
+			"eve@example.com": GetUserResponse(True, True, False, True, []),
+		},
+		enforce_domains=False,
+	)
+	runner = make_runner(users, (), twin=twin)
+	params = {
+		"users": [
+			{"name": "alice@example.com", "recovery_email": "new@backup.com", "require_two_factor_authentication": True},
+			{"name": "carol@example.com", "previous_names": ["bob@example.com"], "enable_search_indexing": False},
+			{"name": "dave@example.com", "password": "hunter2", "password_mode": "ignore-if-exists", "recovery_phone": "+33600000000", "recovery_phone_allow_mfa_reset": False},
+		]
+	}
+
+	planned, _ = runner(params=params, check_mode=True)
+	assert set(twin.calls) == {"listUser", "getUser"}
+
+	applied, _ = runner(params=params)
+	client = twin.client()
+	assert applied["users"] == planned["users"] == [client.get_user(GetUserRequest(name)).as_display(name) for name in sorted(client.list_users().users)]
+	assert [u["name"] for u in applied["users"]] == ["alice@example.com", "carol@example.com", "dave@example.com"]
+
+	again, _ = runner(params=params)
+	assert not again["changed"]
+
+
+def test_applies_a_saved_plan(make_runner, tmp_path):  # noqa: F811
+	twin = PurelymailTwin.seeded(users={"alice@example.com": GetUserResponse(True, True, False, True, [])}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	plan = str(tmp_path / "plan.json")
+	params = {"users": [{"name": "alice@example.com", "password": "n3w"}, {"name": "bob@example.com", "password": "hunter2"}]}
+
+	planned, _ = runner(params={**params, "plan_out": plan}, check_mode=True)
+	assert "hunter2" not in (tmp_path / "plan.json").read_text()
+
+	# the desired state isn't computed again: only the passwords are taken from the task
+	twin.calls.clear()
+	applied, _ = runner(params={"plan_in": plan, "users": [{"name": "alice@example.com", "password": "n3w"}, {"name": "bob@example.com", "password": "hunter2"}]}, diff=True)
+	assert twin.calls == ["listUser", "createUser", "modifyUser"]
+	assert applied["changed"]
+	assert applied["users"] == planned["users"]
+	assert applied["diff"]["after"][1] == {**planned["users"][1], "password": "<set>"}
+
+	stale, _ = runner(params={"plan_in": plan, "users": params["users"]}, expect=AnsibleFailJson)
+	assert stale == {"msg": "plan_in: the account changed since the plan was computed, compute a new one, no change was made"}
+
+
+def test_saved_plan_requires_passwords(make_runner, tmp_path):  # noqa: F811
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	plan = str(tmp_path / "plan.json")
+
+	runner(params={"plan_out": plan, "users": [{"name": "bob@example.com", "password": "hunter2"}]}, check_mode=True)
+	data, _ = runner(params={"plan_in": plan, "users": []}, expect=AnsibleFailJson)
+
+	assert data == {"msg": "plan_in: create_user of bob@example.com sets a password, provide it again in the task, no change was made"}
+	assert twin.client().list_users().users == ["alice@example.com"]
+
+
+@pytest.mark.parametrize(
+	("params", "check_mode", "message"),
+	[
+		({"plan_out": "plan.json"}, False, "plan_out requires check mode, the plan would be applied right away otherwise"),
+		({"plan_out": "plan.json", "plan_in": "plan.json"}, True, "plan_out and plan_in are mutually exclusive"),
+		({"plan_out": "plan.json", "check_fidelity": "shallow"}, True, "plan_out requires check_fidelity=full, a shallow check doesn't plan every change"),
+	],
+)
+def test_plan_params(run, params, check_mode, message):
+	data, _ = run(params={**params, "users": []}, check_mode=check_mode, expect=AnsibleFailJson)
+	assert data == {"msg": message}
+
+
+def test_resumes_an_interrupted_apply(make_runner, monkeypatch, tmp_path):  # noqa: F811
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	journal = str(tmp_path / "journal.jsonl")
+	params = {"journal": journal, "users": [{"name": "alice@example.com"}, *({"name": f"{name}@example.com", "password": "hunter2"} for name in ("bob", "carol", "dave"))]}
+
+	handle = twin.handle
+
+	def lost_response(endpoint, payload):
+		# carol is created but the answer never comes back
+		result = handle(endpoint, payload)
+		if endpoint == "createUser" and payload["userName"] == "carol":
+			raise TwinError("internalError", "connection reset")
+		return result
+
+	monkeypatch.setattr(twin, "handle", lost_response)
+	failed, _ = runner(params=params, expect=AnsibleFailJson)
+	assert [op["status"] for op in failed["operations"]] == ["ok", "failed", "skipped"]
+
+	monkeypatch.undo()
+	twin.calls.clear()
+	# rerun with a longer deadline: a run setting, the journal still applies
+	resumed, _ = runner(params=params | {"deadline": 600.0})
+
+	# no getUser: carol is verified with one listUser, only dave is left to create
+	assert twin.calls == ["listUser", "createUser"]
+	assert [op["status"] for op in resumed["operations"]] == ["resumed", "resumed", "ok"]
+	assert resumed["changed"]
+	assert twin.client().list_users().users == [f"{name}@example.com" for name in ("alice", "bob", "carol", "dave")]
+	assert not (tmp_path / "journal.jsonl").exists()
+
+
+def test_resume_with_nothing_left_to_apply_is_a_change(make_runner, monkeypatch, tmp_path):  # noqa: F811
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	bob = {"name": "bob@example.com", "password": "hunter2", "password_mode": "ignore-if-exists"}
+	params = {"journal": str(tmp_path / "journal.jsonl"), "users": [{"name": "alice@example.com"}, bob]}
+
+	handle = twin.handle
+
+	def lost_response(endpoint, payload):
+		# bob is created but the answer never comes back
+		result = handle(endpoint, payload)
+		if endpoint == "createUser":
+			raise TwinError("internalError", "connection reset")
+		return result
+
+	monkeypatch.setattr(twin, "handle", lost_response)
+	failed, _ = runner(params=params, expect=AnsibleFailJson)
+	assert not failed["changed"]
+
+	monkeypatch.undo()
+	resumed, _ = runner(params=params)
+
+	assert [op["status"] for op in resumed["operations"]] == ["resumed"]
+	assert resumed["changed"]
+	again, _ = runner(params=params)
+	assert not again["changed"]
+
+
+def test_continue_on_error_then_retry(make_runner, monkeypatch):  # noqa: F811
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	params = {"on_error": "continue", "users": [{"name": "alice@example.com"}, *({"name": f"{name}@example.com", "password": "hunter2"} for name in ("bob", "carol", "dave"))]}
+
+	handle = twin.handle
+
+	def refuse_carol(endpoint, payload):
+		if endpoint == "createUser" and payload["userName"] == "carol":
+			raise TwinError("userLimitReached", "no room for carol")
+		return handle(endpoint, payload)
+
+	monkeypatch.setattr(twin, "handle", refuse_carol)
+	failed, _ = runner(params=params, expect=AnsibleFailJson)
+
+	assert [op["status"] for op in failed["operations"]] == ["ok", "failed", "ok"]
+	assert failed["changed"]
+	assert failed["msg"] == "Purelymail API error: [userLimitReached] no room for carol"
+	assert failed["failed"] == [{"method": "create_user", "target": "carol@example.com", "error": "Purelymail API error: [userLimitReached] no room for carol"}]
+	assert failed["retry_scope"] == {"patterns": ["carol@example.com"]}
+	assert twin.client().list_users().users == [f"{name}@example.com" for name in ("alice", "bob", "dave")]
+
+	monkeypatch.undo()
+	retried, _ = runner(params=params | {"scope": failed["retry_scope"]})
+
+	assert [(op["method"], op["target"]) for op in retried["operations"]] == [("create_user", "carol@example.com")]
+	assert sorted(twin.client().list_users().users) == [f"{name}@example.com" for name in ("alice", "bob", "carol", "dave")]
+
+
+@pytest.mark.parametrize(("refresh", "reads"), [("touched", ["getUser"]), ("all", ["listUser", "getUser", "getUser"])])
+def test_refresh_after_apply(make_runner, monkeypatch, refresh, reads):  # noqa: F811
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	handle = twin.handle
+
+	def server_defaults(endpoint, payload):
+		# the server fills something the prediction can't know about
+		result = handle(endpoint, payload)
+		if endpoint == "createUser":
+			twin.users[f"{payload['userName']}@{payload['domainName']}"]["enableSpamFiltering"] = False
+		return result
+
+	monkeypatch.setattr(twin, "handle", server_defaults)
+	params = {"refresh_after_apply": refresh, "users": [{"name": "alice@example.com"}, {"name": "bob@example.com", "password": "hunter2", "password_mode": "ignore-if-exists"}]}
+	data, _ = runner(params=params)
+
+	assert twin.calls[twin.calls.index("createUser") + 1 :] == reads
+	client = twin.client()
+	assert data["users"] == [client.get_user(GetUserRequest(name)).as_display(name) for name in ("alice@example.com", "bob@example.com")]
+
+
+def test_call_budget(make_runner):  # noqa: F811
+	twin = PurelymailTwin.seeded(users={"alice@example.com": None, "bob@example.com": None}, enforce_domains=False)
+	runner = make_runner(users, (), twin=twin)
+	params = {"canonical": True, "users": [{"name": "alice@example.com"}, {"name": "carol@example.com", "password": "hunter2"}]}
+
+	planned, _ = runner(params=params, check_mode=True)
+	assert planned["stats"]["api_calls"] == {
+		"read": {"getUser": 1, "listUser": 1},
+		"write": {"createUser": 1, "deleteUser": 1},
+		"total": 4,
+		"estimated_write_seconds": ANY,
+	}
+
+	data, _ = runner(params={**params, "max_api_calls": 3}, expect=AnsibleFailJson)
+	assert data["msg"] == "The run needs 4 API calls (2 made reading, 2 planned writes), over max_api_calls=3, no change was made"
+	assert twin.client().list_users().users == ["alice@example.com", "bob@example.com"]
+
+	applied, _ = runner(params={**params, "max_api_calls": 4})
+	assert applied["changed"]
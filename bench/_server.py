@@ -0,0 +1,112 @@
+"""
+Local stand-in for the Purelymail API, used by the benchmarks in this directory.
+
+It speaks HTTP/1.1 with keep-alive so connection reuse on the client side is
+actually observable, and answers every endpoint through a pluggable `responder`: canned answers or a `PurelymailTwin`.
+"""
+
+import json
+import socket
+import threading
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.twin import PurelymailTwin
+
+Responder = Callable[[str, dict[str, Any]], tuple[int, bytes]]
+
+USER = {"enableSearchIndexing": True, "recoveryEnabled": True, "requireTwoFactorAuthentication": False, "enableSpamFiltering": True, "resetMethods": []}
+
+
+def success(result: Any) -> tuple[int, bytes]:
+	return 200, json.dumps({"type": "success", "result": result}).encode()
+
+
+def canned(endpoint: str, _body: dict[str, Any]) -> tuple[int, bytes]:
+	match endpoint:
+		case "listUser":
+			return success({"users": [f"user{i}@example.com" for i in range(10)]})
+		case "getUser":
+			return success(USER)
+		case "listDomains":
+			return success({"domains": []})
+		case "listRoutingRules":
+			return success({"rules": []})
+		case "checkAccountCredit":
+			return success({"credit": "1.0"})
+		case _:
+			return success({})
+
+
+def twin_responder(twin: PurelymailTwin) -> Responder:
+	"""Answers from an in-memory account: writes are visible to the following reads."""
+
+	def respond(endpoint: str, body: dict[str, Any]) -> tuple[int, bytes]:
+		resp = twin.respond(endpoint, body)
+		return resp.status_code, resp.content
+
+	return respond
+
+
+class _HTTPServer(ThreadingHTTPServer):
+	daemon_threads = True
+	# the default backlog of 5 resets connections as soon as a client opens a real pool
+	request_queue_size = 1024
+	# Accepted TCP connections: the whole point of pooling is to keep it low.
+	connections = 0
+
+	def get_request(self) -> tuple[socket.socket, Any]:
+		self.connections += 1
+		return super().get_request()
+
+
+class StandInServer:
+	def __init__(self, responder: Responder = canned, latency: float = 0.0):
+		outer = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = "HTTP/1.1"
+
+			def setup(self):
+				super().setup()
+				# Headers and body go out in two writes, without this Nagle + delayed ACK adds ~40ms per keep-alive call.
+				self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+			def do_POST(self):
+				length = int(self.headers.get("Content-Length", 0))
+				body = json.loads(self.rfile.read(length) or b"{}")
+				if outer.latency:
+					threading.Event().wait(outer.latency)
+				status, payload = outer.responder(self.path.rsplit("/", 1)[-1], body)
+				self.send_response(status)
+				self.send_header("Content-Type", "application/json")
+				self.send_header("Content-Length", str(len(payload)))
+				self.end_headers()
+				self.wfile.write(payload)
+				outer.requests += 1
+
+			def log_message(self, format: str, *args: Any) -> None:
+				pass
+
+		self.responder = responder
+		self.latency = latency
+		self.requests = 0
+		self.httpd = _HTTPServer(("127.0.0.1", 0), Handler)
+
+	@property
+	def connections(self) -> int:
+		return self.httpd.connections
+
+	@property
+	def base_url(self) -> str:
+		host, port = self.httpd.server_address[:2]
+		return f"http://{host}:{port}/api"
+
+	def __enter__(self) -> "StandInServer":
+		threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+		return self
+
+	def __exit__(self, *_) -> None:
+		self.httpd.shutdown()
+		self.httpd.server_close()
@@ -0,0 +1,53 @@
+"""
+End-to-end time of a `getUser` fan-out, sequential sync client versus the asyncio
+client with every call in flight at once (bounded by the httpx pool).
+
+The stand-in server adds a fixed per-call latency to mimic the real API round trip.
+
+Run from the repository root: `python -m bench.async_clients [calls] [latency_ms]`
+"""
+
+import asyncio
+import sys
+import time
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import AsyncPurelymailAPI, PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import GetUserRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import GetUserResponse
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.user_client import AsyncUserClient, UserClient
+from bench._server import StandInServer
+
+
+def run_sync(base_url: str, names: list[str]) -> float:
+	with PurelymailAPI("bench", base_url=base_url) as api:
+		api.warm_up((GetUserRequest, GetUserResponse))
+		client = UserClient(api)
+		start = time.perf_counter()
+		for name in names:
+			_ = client.get_user(GetUserRequest(name))
+		return time.perf_counter() - start
+
+
+async def run_async(base_url: str, names: list[str], pool_size: int) -> float:
+	async with AsyncPurelymailAPI("bench", base_url=base_url, pool_size=pool_size) as api:
+		api.warm_up((GetUserRequest, GetUserResponse))
+		client = AsyncUserClient(api)
+		start = time.perf_counter()
+		_ = await asyncio.gather(*(client.get_user(GetUserRequest(name)) for name in names))
+		return time.perf_counter() - start
+
+
+def main(calls: int = 200, latency_ms: int = 100, pool_size: int = 100) -> None:
+	names = [f"user{i}@example.com" for i in range(calls)]
+	with StandInServer(latency=latency_ms / 1000) as server:
+		sync_time = run_sync(server.base_url, names)
+		async_time = asyncio.run(run_async(server.base_url, names, pool_size))
+
+	print(f"{calls} getUser, {latency_ms}ms server latency")
+	print(f"  sync, sequential         {sync_time:7.2f}s  ({sync_time / calls * 1e3:6.2f}ms/call)")
+	print(f"  async, pool={pool_size:<4}         {async_time:7.2f}s  ({async_time / calls * 1e3:6.2f}ms/call)")
+	print(f"  speedup: x{sync_time / async_time:.1f}")
+
+
+if __name__ == "__main__":
+	main(*map(int, sys.argv[1:]))
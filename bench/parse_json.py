@@ -0,0 +1,97 @@
+"""
+Parse time and peak memory of a 50k-entry response, `resp.json()` + `validate_python`
+(previous path) versus `validate_json` on the raw bytes.
+
+Each variant runs in a forked child so peak RSS isn't shared between them;
+tracemalloc only sees Python allocations, RSS also accounts for pydantic-core.
+
+Run from the repository root: `python -m bench.parse_json [entries]`
+"""
+
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.response_wrapper import parse_api_response, parse_api_response_json, warm_api_responses
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.responses import ListRoutingResponse, ListUsersResponse
+
+
+def list_user_body(entries: int) -> bytes:
+	return json.dumps({"type": "success", "result": {"users": [f"user{i}@example{i % 50}.com" for i in range(entries)]}}).encode()
+
+
+def list_routing_body(entries: int) -> bytes:
+	rules = [
+		{
+			"prefix": i % 2 == 0,
+			"catchall": False,
+			"domainName": f"example{i % 50}.com",
+			"matchUser": f"user{i}",
+			"targetAddresses": [f"t{i}@example.org", f"u{i}@example.org"],
+			"id": i + 1,
+		}
+		for i in range(entries)
+	]
+	return json.dumps({"type": "success", "result": {"rules": rules}}).encode()
+
+
+def via_python(raw: bytes, model: type) -> object:
+	return parse_api_response(json.loads(raw), model)
+
+
+def via_json(raw: bytes, model: type) -> object:
+	return parse_api_response_json(raw, model)
+
+
+def measure(parse, raw: bytes, model: type, out: multiprocessing.Queue) -> None:
+	warm_api_responses(model)
+	# memory first: ru_maxrss only ever grows
+	rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	tracemalloc.start()
+	_ = parse(raw, model)
+	_, py_peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+	del _
+
+	# then time, without tracemalloc overhead, best of 5
+	timings = []
+	for _ in range(5):
+		start = time.perf_counter()
+		parse(raw, model)
+		timings.append(time.perf_counter() - start)
+	out.put((min(timings), py_peak, rss_peak * 1024))
+
+
+def run(parse, raw: bytes, model: type) -> tuple[float, int, int]:
+	ctx = multiprocessing.get_context("fork")
+	out = ctx.Queue()
+	child = ctx.Process(target=measure, args=(parse, raw, model, out))
+	child.start()
+	res = out.get()
+	child.join()
+	return res
+
+
+def main(entries: int = 50_000) -> None:
+	for name, model, raw in (
+		("listUser", ListUsersResponse, list_user_body(entries)),
+		("listRoutingRules", ListRoutingResponse, list_routing_body(entries)),
+	):
+		print(f"{name} ({entries} entries, {len(raw) / 2**20:.1f} MiB body)")
+		results = {}
+		for label, parse in (("json.loads + validate_python", via_python), ("validate_json", via_json)):
+			elapsed, py_peak, rss_peak = results[label] = run(parse, raw, model)
+			print(f"  {label:<30} time={elapsed * 1e3:8.1f}ms  python_peak={py_peak / 2**20:7.1f}MiB  rss_growth={rss_peak / 2**20:7.1f}MiB")
+		(old_t, old_py, old_rss), (new_t, new_py, new_rss) = results.values()
+		print(
+			f"  delta: time {(new_t - old_t) * 1e3:+.1f}ms ({old_t / new_t:.2f}x), "
+			f"python_peak {(new_py - old_py) / 2**20:+.1f}MiB, rss_growth {(new_rss - old_rss) / 2**20:+.1f}MiB"
+		)
+
+
+if __name__ == "__main__":
+	main(*map(int, sys.argv[1:]))
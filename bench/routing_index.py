@@ -0,0 +1,87 @@
+"""
+`routing_rules` inferred-safety checks and preset reads on 20k rules: the previous
+nested scans and per-read `PRESET_MAP` walk versus `RoutingRuleIndex` buckets.
+
+Run from the repository root: `python -m bench.routing_index [rules]`
+"""
+
+import sys
+import time
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.api_types import PRESET_MAP, RoutingRule
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.routing_index import EXCLUSIVE_PRESETS, RoutingRuleIndex
+
+DOMAINS = 200
+
+
+def make_rules(count: int, first_id: int) -> list[RoutingRule]:
+	# one `any_address` rule per domain, the rest are exact / prefix matches
+	return [
+		RoutingRule(
+			prefix=i < DOMAINS or i % 2 == 0,
+			catchall=False,
+			domain_name=f"example{i % DOMAINS}.com",
+			match_user="" if i < DOMAINS else f"user{i}",
+			target_addresses=[f"t{i}@example.org"],
+			id=first_id + i,
+		)
+		for i in range(count)
+	]
+
+
+def walk_preset(rule: RoutingRule):
+	for preset, values in PRESET_MAP.items():
+		if all(getattr(rule, field) == expected for field, expected in values.items()):
+			return preset
+	return None
+
+
+def naive(rules: list[RoutingRule], existing: list[RoutingRule], canonical: set[str]) -> int:
+	conflicts = 0
+	for idx, rule in enumerate(rules):
+		if walk_preset(rule) in EXCLUSIVE_PRESETS:
+			in_rules = any(
+				i != idx and walk_preset(r) in EXCLUSIVE_PRESETS and r.domainName == rule.domainName and r.targetAddresses == rule.targetAddresses for i, r in enumerate(rules)
+			)
+			in_existing = rule.domainName not in canonical and any(walk_preset(er) in EXCLUSIVE_PRESETS and er.domainName == rule.domainName for er in existing)
+			conflicts += in_rules or in_existing
+	return conflicts
+
+
+def indexed(rules: list[RoutingRule], existing: list[RoutingRule], canonical: set[str]) -> int:
+	desired_index, existing_index = RoutingRuleIndex(rules), RoutingRuleIndex(existing)
+	conflicts = 0
+	for idx, rule in enumerate(rules):
+		if desired_index.presets[idx] in EXCLUSIVE_PRESETS:
+			in_rules = any(i != idx and rules[i].targetAddresses == rule.targetAddresses for i in desired_index.exclusive(rule.domainName))
+			in_existing = rule.domainName not in canonical and bool(existing_index.exclusive(rule.domainName))
+			conflicts += in_rules or in_existing
+	return conflicts
+
+
+def timed(fn, *args) -> tuple[float, object]:
+	start = time.perf_counter()
+	res = fn(*args)
+	return time.perf_counter() - start, res
+
+
+def main(count: int = 20_000) -> None:
+	rules, existing = make_rules(count, 1), make_rules(count, count + 1)
+	canonical = {f"example{i}.com" for i in range(0, DOMAINS, 2)}  # half the domains aren't canonical: existing rules conflict
+
+	naive_s, naive_res = timed(naive, rules, existing, canonical)
+	indexed_s, indexed_res = timed(indexed, rules, existing, canonical)
+	assert naive_res == indexed_res, (naive_res, indexed_res)
+	print(f"safety checks, {count} rules x {DOMAINS} domains ({indexed_res} conflicts)")
+	print(f"  nested scans : {naive_s * 1000:9.1f} ms")
+	print(f"  index        : {indexed_s * 1000:9.1f} ms  ({naive_s / indexed_s:.0f}x)")
+
+	walk_s, _ = timed(lambda: [walk_preset(r) for r in rules])
+	lookup_s, _ = timed(lambda: [r.preset for r in rules])
+	print(f"preset reads, {count} rules")
+	print(f"  PRESET_MAP walk : {walk_s * 1000:9.1f} ms")
+	print(f"  shape lookup    : {lookup_s * 1000:9.1f} ms  ({walk_s / lookup_s:.1f}x)")
+
+
+if __name__ == "__main__":
+	main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,56 @@
+"""
+Per-call latency of `getUser` with a fresh connection per call (the previous
+`requests.post` behaviour) versus the pooled keep-alive session of `PurelymailAPI`.
+
+Run from the repository root: `python -m bench.session_pool [calls]`
+"""
+
+import statistics
+import sys
+import time
+
+import requests
+
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.base_client import PurelymailAPI
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.types.requests import GetUserRequest
+from ansible_collections.bofzilla.purelymail.plugins.module_utils.clients.user_client import UserClient
+from bench._server import StandInServer
+
+
+class FreshConnectionSession(requests.Session):
+	"""Previous behaviour: module-level `requests.post`, i.e. a new TCP connection per call."""
+
+	def post(self, url, data=None, json=None, **kwargs):
+		return requests.post(url, data=data, json=json, headers=self.headers, verify=self.verify, **kwargs)
+
+
+def timed(calls: int, fn) -> list[float]:
+	samples = []
+	for i in range(calls):
+		start = time.perf_counter()
+		fn(i)
+		samples.append(time.perf_counter() - start)
+	return samples
+
+
+def report(name: str, samples: list[float], connections: int) -> None:
+	print(
+		f"{name:<16} mean={statistics.mean(samples) * 1e3:7.3f}ms  p50={statistics.median(samples) * 1e3:7.3f}ms  "
+		f"p99={statistics.quantiles(samples, n=100)[98] * 1e3:7.3f}ms  tcp_connections={connections}"
+	)
+
+
+def main(calls: int = 2000) -> None:
+	results = {}
+	for name, session in (("fresh connection", FreshConnectionSession()), ("pooled session", requests.Session())):
+		with StandInServer() as server, PurelymailAPI("bench", base_url=server.base_url, session=session) as api:
+			client = UserClient(api)
+			results[name] = timed(calls, lambda i, client=client: client.get_user(GetUserRequest(f"user{i}@example.com")))
+			report(name, results[name], server.connections)
+	fresh, pooled = results.values()
+
+	print(f"speedup: x{statistics.mean(fresh) / statistics.mean(pooled):.2f} (plain HTTP on loopback, TLS handshakes make the gap larger)")
+
+
+if __name__ == "__main__":
+	main(*map(int, sys.argv[1:]))